@@ -0,0 +1,198 @@
+"""
+BenchmarkHarness.py
+Benchmarks the geovalidation and duplicate removal hot paths (get_validated_shelters, validate_entry_locations,
+    validate_shelters, and remove_duplicates) on synthetic data. Reports throughput, p50/p99 latency, and peak RSS,
+    saves the results as json, and compares them against a stored baseline.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import multiprocessing
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'DataManipulation')))
+from HikerValidator2 import HikerValidator, get_validated_shelters
+from ShelterDuplicateRemover import remove_duplicates
+from SyntheticData import make_shelters, make_hikers, write_shelters_csv, to_validated_shelters
+try:
+    import resource
+except ImportError:
+    # Peak RSS isn't reported on platforms without the resource module (Windows).
+    resource = None
+
+BENCHMARKS = ['get_validated_shelters', 'validate_entry_locations', 'validate_shelters', 'remove_duplicates']
+
+"""
+peak_rss_mib -The peak resident set size of this process in MiB (None if it can't be measured).
+"""
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / float(1 << 20) if sys.platform == 'darwin' else peak / 1024.0
+
+"""
+summarize -Builds the result of a benchmark from the latency of each timed operation.
+:param latencies: The wall clock time of each timed operation in seconds.
+:param num_items: The number of items (entries, shelters) processed by all of the operations.
+:param item: The name of an item.
+:param operation: The name of a timed operation.
+"""
+def summarize(latencies, num_items, item, operation):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    seconds = float(latencies.sum())
+    return {
+        'item': item,
+        'items': num_items,
+        'seconds': seconds,
+        'items_per_sec': num_items / seconds if seconds > 0 else None,
+        'operation': operation,
+        'operations': int(len(latencies)),
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p99_ms': float(np.percentile(latencies, 99)) * 1000,
+        'peak_rss_mib': peak_rss_mib()
+    }
+
+def benchmark_get_validated_shelters(config):
+    shelters = make_shelters(config['shelters'], seed=config['seed'])
+    latencies = []
+    with tempfile.TemporaryDirectory() as storage_dir:
+        shelters_path = os.path.join(storage_dir, "newShelters.csv")
+        write_shelters_csv(shelters_path, shelters)
+        for repeat in range(config['repeats']):
+            start = time.perf_counter()
+            get_validated_shelters(validated_shelters_path=shelters_path)
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, config['shelters'] * config['repeats'], 'shelter', 'parse')
+
+def benchmark_validate_entry_locations(config):
+    validator, hikers = make_validator_and_hikers(config)
+    latencies = []
+    for hiker in hikers:
+        for entry_num, entry in hiker['journal'].items():
+            start = time.perf_counter()
+            validator.validate_entry_locations(entry['start_loc'], entry['dest'])
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, len(latencies), 'entry', 'entry')
+
+def benchmark_validate_shelters(config):
+    validator, hikers = make_validator_and_hikers(config)
+    latencies = []
+    for hiker in hikers:
+        start = time.perf_counter()
+        validator.validate_shelters(hiker)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, config['hikers'] * config['entries'], 'entry', 'hiker')
+
+def benchmark_remove_duplicates(config):
+    latencies = []
+    for repeat in range(config['repeats']):
+        shelters = make_shelters(config['dedup_shelters'], duplicate_fraction=0.2, seed=config['seed'])
+        start = time.perf_counter()
+        remove_duplicates(shelters)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, config['dedup_shelters'] * config['repeats'], 'shelter', 'run')
+
+def make_validator_and_hikers(config):
+    shelters = make_shelters(config['shelters'], seed=config['seed'])
+    validator = HikerValidator(validated_shelters=to_validated_shelters(shelters), validated_hostels=None,
+                               validated_places=None, statistics=True)
+    hikers = make_hikers(shelters, config['hikers'], config['entries'], seed=config['seed'])
+    return (validator, hikers)
+
+"""
+run_benchmark -Runs one benchmark. Each benchmark runs in its own process so that its peak RSS is its own.
+"""
+def run_benchmark(name, config):
+    return globals()['benchmark_' + name](config)
+
+"""
+compare -Compares benchmark results against a baseline. A benchmark regresses if its throughput drops, or its p99
+    latency or peak RSS grows, by more than the tolerance.
+:param results: The benchmark results of this run.
+:param baseline: The benchmark results of the baseline run.
+:param tolerance: The allowed relative change (0.1 is 10%).
+:return regressions: A list of descriptions of the regressions.
+"""
+def compare(results, baseline, tolerance=0.1):
+    regressions = []
+    print("%-26s %14s %14s %14s" % ("benchmark", "items/sec", "p99 ms", "peak RSS MiB"))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        changes = []
+        for metric, higher_is_better in (('items_per_sec', True), ('p99_ms', False), ('peak_rss_mib', False)):
+            current, previous = result.get(metric), baseline[name].get(metric)
+            if not current or not previous:
+                changes.append("n/a")
+                continue
+            change = (current - previous) / previous
+            changes.append("%+.1f%%" % (change * 100))
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append("%s %s: %.3f -> %.3f (%+.1f%%)" % (name, metric, previous, current, change * 100))
+        print("%-26s %14s %14s %14s" % (name, changes[0], changes[1], changes[2]))
+    return regressions
+
+def main(config, benchmarks=BENCHMARKS, output_path=None, baseline_path=None, tolerance=0.1):
+    results = {}
+    for name in benchmarks:
+        pool = multiprocessing.Pool(processes=1, maxtasksperchild=1)
+        results[name] = pool.apply(run_benchmark, (name, config))
+        pool.close()
+        pool.join()
+        result = results[name]
+        print("%-26s %12.1f %s/sec  p50 %9.3f ms  p99 %9.3f ms per %s  peak RSS %s MiB"
+              % (name, result['items_per_sec'] or 0.0, result['item'], result['p50_ms'], result['p99_ms'],
+                 result['operation'], "n/a" if result['peak_rss_mib'] is None else "%.1f" % result['peak_rss_mib']))
+    report = {
+        'config': config,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': results
+    }
+    if output_path is not None:
+        with open(output_path, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    regressions = []
+    if baseline_path is not None:
+        with open(baseline_path, 'r') as fp:
+            baseline = json.load(fp)
+        if baseline['config'] != config:
+            print("Warning: the baseline was run with a different configuration: %r" % baseline['config'])
+        regressions = compare(results, baseline['benchmarks'], tolerance=tolerance)
+        for regression in regressions:
+            print("Regression: " + regression)
+    return (report, regressions)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the geovalidation and duplicate removal hot paths.")
+    parser.add_argument('--shelters', type=int, default=500, help="Number of shelters in the validated shelters table.")
+    parser.add_argument('--hikers', type=int, default=20, help="Number of synthetic hikers.")
+    parser.add_argument('--entries', type=int, default=200, help="Number of journal entries per hiker.")
+    parser.add_argument('--dedup-shelters', type=int, default=20000,
+                        help="Number of shelters (including duplicates) given to remove_duplicates.")
+    parser.add_argument('--repeats', type=int, default=5,
+                        help="Number of times get_validated_shelters and remove_duplicates are run.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data generator.")
+    parser.add_argument('--only', choices=BENCHMARKS, action='append', help="Run only this benchmark (repeatable).")
+    parser.add_argument('--output', help="Save the results to this json file.")
+    parser.add_argument('--baseline', help="Compare the results against this json file (saved with --output).")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Relative change allowed before a baseline comparison is a regression (default: 0.1).")
+    args = parser.parse_args()
+    config = {
+        'shelters': args.shelters, 'hikers': args.hikers, 'entries': args.entries,
+        'dedup_shelters': args.dedup_shelters, 'repeats': args.repeats, 'seed': args.seed
+    }
+    report, regressions = main(config, benchmarks=args.only or BENCHMARKS, output_path=args.output,
+                               baseline_path=args.baseline, tolerance=args.tolerance)
+    sys.exit(1 if regressions else 0)
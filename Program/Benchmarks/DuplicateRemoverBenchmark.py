@@ -0,0 +1,77 @@
+"""
+DuplicateRemoverBenchmark.py
+Measures ShelterDuplicateRemover.remove_duplicates on a large synthetic shelter data set, and checks the blocked
+    comparison against comparing every pair of shelters on a smaller sample.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'DataManipulation')))
+from ShelterDuplicateRemover import score_pairs, resolve_duplicates, remove_duplicates
+from SpatialIndex import EARTH_RADIUS_MILES
+from NameNormalizer import normalize_name
+from SyntheticData import make_shelters
+
+"""
+distance_miles -The haversine distance in miles between two shelters.
+"""
+def distance_miles(shelter1, shelter2):
+    lat1, lat2 = math.radians(shelter1['lat']), math.radians(shelter2['lat'])
+    a = math.sin((lat2 - lat1) / 2.0) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(shelter2['lon'] - shelter1['lon']) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_MILES * math.asin(math.sqrt(min(a, 1.0)))
+
+"""
+remove_duplicates_exhaustive -remove_duplicates without any blocking: every pair of shelters is a candidate.
+:return keys: The keys of the kept shelters.
+"""
+def remove_duplicates_exhaustive(shelters, comparison_threshold=90, distance_tolerance=0.25):
+    values = list(shelters.values())
+    pairs = [(index1, index2) for index2 in range(len(values)) for index1 in range(index2)
+             if distance_tolerance is None or distance_miles(values[index1], values[index2]) <= distance_tolerance]
+    matches = score_pairs([normalize_name(value['name']) for value in values], pairs,
+                          comparison_threshold=comparison_threshold)
+    duplicate_of = resolve_duplicates(len(values), matches)
+    return [key for index, key in enumerate(shelters.keys()) if index not in duplicate_of]
+
+def main(num_shelters=100000, sample_size=2000, comparison_threshold=90, distance_tolerance=0.25, jobs=1):
+    shelters = make_shelters(num_shelters, duplicate_fraction=0.2)
+    for block_on_tokens in (False, True):
+        start = time.perf_counter()
+        shelters_no_duplicates = remove_duplicates(shelters, comparison_threshold=comparison_threshold,
+                                                   distance_tolerance=distance_tolerance,
+                                                   block_on_tokens=block_on_tokens, jobs=jobs)
+        elapsed = time.perf_counter() - start
+        print("%d shelters (block_on_tokens=%s): %d kept in %.2f s"
+              % (num_shelters, block_on_tokens, len(shelters_no_duplicates), elapsed))
+
+    # Compare against every pair of shelters on a sample small enough for the quadratic comparison.
+    sample = make_shelters(sample_size, duplicate_fraction=0.2)
+    start = time.perf_counter()
+    exhaustive = remove_duplicates_exhaustive(sample, comparison_threshold, distance_tolerance)
+    elapsed = time.perf_counter() - start
+    print("%d shelters (every pair): %d kept in %.2f s" % (sample_size, len(exhaustive), elapsed))
+    for block_on_tokens in (False, True):
+        blocked = list(remove_duplicates(sample, comparison_threshold=comparison_threshold,
+                                         distance_tolerance=distance_tolerance,
+                                         block_on_tokens=block_on_tokens).keys())
+        print("%d shelters (block_on_tokens=%s): same result as every pair: %s"
+              % (sample_size, block_on_tokens, blocked == exhaustive))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks shelter duplicate removal on synthetic data.")
+    parser.add_argument('--shelters', type=int, default=100000, help="Number of synthetic shelters.")
+    parser.add_argument('--sample', type=int, default=2000,
+                        help="Number of synthetic shelters compared against the exhaustive (every pair) comparison.")
+    parser.add_argument('--threshold', type=int, default=90, help="Fuzzy string comparison threshold.")
+    parser.add_argument('--distance', type=float, default=0.25, help="Distance tolerance in miles.")
+    parser.add_argument('--jobs', type=int, default=1, help="Number of processes used to score candidate pairs.")
+    args = parser.parse_args()
+    main(num_shelters=args.shelters, sample_size=args.sample, comparison_threshold=args.threshold,
+         distance_tolerance=args.distance, jobs=args.jobs)
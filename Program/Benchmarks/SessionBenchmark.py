@@ -0,0 +1,46 @@
+"""
+SessionBenchmark.py
+Measures the per-hiker overhead of hiker validation when the shelter data set is re-parsed for every hiker (the old
+    main() loop) versus when a single ValidationSession is reused for every hiker.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import time
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+from HikerValidator2 import HikerValidator, ValidationSession, get_validated_shelters
+from SyntheticData import make_shelters, make_hikers, write_shelters_csv
+
+def main(num_hikers=50, num_entries=5, num_shelters=300):
+    with tempfile.TemporaryDirectory() as storage_dir:
+        shelters = make_shelters(num_shelters)
+        write_shelters_csv(storage_dir + "/newShelters.csv", shelters)
+        hikers = make_hikers(shelters, num_hikers, num_entries)
+
+        # Before: the shelter CSV is parsed and a new validator (and index) is built for every hiker.
+        start = time.perf_counter()
+        for hiker in hikers:
+            validated_shelters = get_validated_shelters(validated_shelters_path=storage_dir + "/newShelters.csv")
+            validator = HikerValidator(validated_shelters=validated_shelters,
+                                       validated_hostels=None, validated_places=None, statistics=True)
+            validator.validate_shelters(hiker)
+        per_hiker_before = (time.perf_counter() - start) / num_hikers
+
+        # After: a single session owns the reference data for every hiker.
+        start = time.perf_counter()
+        session = ValidationSession(storage_dir, statistics=True, use_cache=False)
+        for validated_hiker in session.validate_many(hikers):
+            pass
+        session.close()
+        per_hiker_after = (time.perf_counter() - start) / num_hikers
+
+    print("Shelters: %d, Hikers: %d, Journal entries per hiker: %d" % (num_shelters, num_hikers, num_entries))
+    print("Per-hiker time (reload per hiker): %.2f ms" % (per_hiker_before * 1000))
+    print("Per-hiker time (ValidationSession): %.2f ms" % (per_hiker_after * 1000))
+    print("Per-hiker overhead removed: %.2f ms" % ((per_hiker_before - per_hiker_after) * 1000))
+
+if __name__ == '__main__':
+    main()
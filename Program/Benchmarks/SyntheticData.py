@@ -0,0 +1,194 @@
+"""
+SyntheticData.py
+Generates synthetic shelter data sets and hiker journals for the benchmarks. Shelters are spread along the length of the
+    trail (from Springer Mountain to Katahdin) and hikers walk north through them, entering shelter names with the typos
+    and abbreviations ("Mtn", "Mt.", "Shltr", "Gap" for "Gap Shelter") seen in real trail journals.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import json
+import random
+import collections
+
+# Approximate (lat, lon) waypoints of the trail from Springer Mountain, GA to Katahdin, ME.
+TRAIL_WAYPOINTS = [(34.6266, -84.1936), (35.5628, -83.4985), (36.6357, -81.7845), (37.3533, -80.8670),
+                   (38.5870, -78.4000), (39.7330, -77.5870), (40.8565, -75.2000), (41.3500, -73.8000),
+                   (42.7500, -73.1000), (43.6500, -72.3200), (44.2706, -71.3034), (45.1000, -70.5000),
+                   (45.9044, -68.9216)]
+
+NAME_WORDS = ['Cow', 'Camp', 'Peru', 'Peak', 'Cooper', 'Brook', 'Falls', 'Big', 'Bald', 'Deep', 'Spring', 'Laurel',
+              'Fork', 'Hawk', 'Rock', 'Pine', 'Creek', 'Ridge', 'Knob', 'Hollow', 'Bear', 'Stony', 'Blue', 'Hemlock',
+              'Wolf', 'Lake', 'Notch', 'Pond', 'Birch', 'Cedar', 'Iron', 'Silver', 'Rocky', 'Overmountain', 'Tray',
+              'Mountain', 'Gooch', 'Blood', 'Neels', 'Muskrat', 'Moreland', 'Springer', 'Tom', 'Leroy', 'Punchbowl']
+NAME_SUFFIXES = ['Shelter', 'Shelter', 'Shelter', 'Lean-to', 'Gap Shelter', 'Mountain Shelter', 'Hut', 'Campsite']
+SHELTER_TYPES = ['Shelter', 'Lean-to', 'Log/Lumber', 'Stone', 'Hut']
+# Places hikers write in their journals that aren't shelters.
+OFF_TRAIL_LOCATIONS = ['Damascus', 'Hot Springs', 'Hiker Hostel', 'Home', 'Zero day in town', 'Motel', 'Gatlinburg']
+# Abbreviations hikers use, applied to the shelter names they enter.
+ABBREVIATIONS = [('Mountain', 'Mtn'), ('Mountain', 'Mt.'), ('Mountain', 'Mtn.'), ('Shelter', 'Shltr'),
+                 ('Shelter', 'shelter'), ('Gap Shelter', 'Gap'), (' Shelter', ''), ('Lean-to', 'Leanto')]
+
+"""
+trail_position -Returns the (lat, lon) of the point a fraction of the way along the trail.
+"""
+def trail_position(fraction):
+    segment = min(int(fraction * (len(TRAIL_WAYPOINTS) - 1)), len(TRAIL_WAYPOINTS) - 2)
+    offset = fraction * (len(TRAIL_WAYPOINTS) - 1) - segment
+    (lat1, lon1), (lat2, lon2) = TRAIL_WAYPOINTS[segment], TRAIL_WAYPOINTS[segment + 1]
+    return (lat1 + (lat2 - lat1) * offset, lon1 + (lon2 - lon1) * offset)
+
+"""
+make_shelters -Creates a synthetic shelter data set ordered from south to north. A fraction of the shelters are
+    re-listed (as another data set would list them) with a slightly different name and location.
+:param num_shelters: The number of shelters to create (including the re-listed duplicates).
+:param duplicate_fraction: The fraction of the shelters that are duplicates of an earlier shelter.
+:param seed: The seed of the random number generator.
+:return shelters: An OrderedDict of SID -> {'SID', 'name', 'data_set', 'lat', 'lon', 'shelter_type'} (the format read
+    by ShelterDuplicateRemover.main).
+"""
+def make_shelters(num_shelters, duplicate_fraction=0.0, seed=0):
+    rng = random.Random(seed)
+    shelters = collections.OrderedDict()
+    originals = []
+    for sid in range(1, num_shelters + 1):
+        if originals and rng.random() < duplicate_fraction:
+            original = rng.choice(originals)
+            name = original['name']
+            if name.endswith(' Shelter'):
+                name = name[:-len(' Shelter')]
+            else:
+                name = name + ' Shelter'
+            shelters[sid] = {
+                'SID': sid, 'name': name, 'data_set': 'ATC',
+                'lat': original['lat'] + rng.uniform(-0.001, 0.001),
+                'lon': original['lon'] + rng.uniform(-0.001, 0.001),
+                'shelter_type': original['shelter_type']
+            }
+            continue
+        lat, lon = trail_position(rng.random())
+        name = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 2)) + [rng.choice(NAME_SUFFIXES)])
+        shelters[sid] = {
+            'SID': sid, 'name': name, 'data_set': 'TNL',
+            'lat': lat + rng.uniform(-0.05, 0.05), 'lon': lon + rng.uniform(-0.05, 0.05),
+            'shelter_type': rng.choice(SHELTER_TYPES)
+        }
+        originals.append(shelters[sid])
+    # Order the shelters as a northbound hiker would reach them (the SIDs keep their creation order).
+    return collections.OrderedDict(sorted(shelters.items(), key=lambda item: (item[1]['lat'], item[0])))
+
+"""
+write_shelters_csv -Writes shelters in the newShelters.csv format (SID,name,data_set,lat,lon,shelter_type).
+:param path: The path of the CSV file.
+:param shelters: The shelters returned by make_shelters.
+"""
+def write_shelters_csv(path, shelters):
+    with open(path, 'w') as fp:
+        fp.write("SID,name,data_set,lat,lon,shelter_type\n")
+        for sid, shelter in shelters.items():
+            fp.write("%s,%s,%s,%r,%r,%s\n" % (sid, shelter['name'], shelter['data_set'], shelter['lat'],
+                                              shelter['lon'], shelter['shelter_type']))
+
+"""
+misspell -Returns the name of a location as a hiker might enter it: abbreviated, in a different case, and/or with a
+    typo (a dropped, doubled, or transposed character).
+:param name: The name of the location.
+:param rng: The random.Random instance to draw from.
+:param typo_rate: The probability of each kind of corruption.
+"""
+def misspell(name, rng, typo_rate=0.3):
+    if rng.random() < typo_rate:
+        applicable = [(full, short) for full, short in ABBREVIATIONS if full in name]
+        if applicable:
+            full, short = rng.choice(applicable)
+            name = name.replace(full, short, 1)
+    if rng.random() < typo_rate and len(name) > 3:
+        position = rng.randrange(1, len(name) - 1)
+        kind = rng.randrange(3)
+        if kind == 0:
+            name = name[:position] + name[position + 1:]
+        elif kind == 1:
+            name = name[:position] + name[position] + name[position:]
+        else:
+            name = name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+    if rng.random() < typo_rate / 3.0:
+        name = name.lower()
+    return name
+
+"""
+to_validated_shelters -Converts shelters returned by make_shelters to the {SID: {'name', 'dataset', 'type', 'lat',
+    'lon'}} dictionary returned by get_validated_shelters.
+"""
+def to_validated_shelters(shelters):
+    validated_shelters = collections.OrderedDict()
+    for sid, shelter in shelters.items():
+        validated_shelters[str(sid)] = {
+            'name': shelter['name'], 'dataset': shelter['data_set'], 'type': shelter['shelter_type'],
+            'lat': shelter['lat'], 'lon': shelter['lon']
+        }
+    return validated_shelters
+
+"""
+walk_journal -Creates the journal of one hiker walking north through the shelters. Each journal entry starts where the
+    previous entry ended; a fraction of the entries are written from towns and other places that aren't shelters.
+:param shelters: The shelters returned by make_shelters.
+:param num_entries: The number of journal entries.
+:param rng: The random.Random instance to draw from.
+:param off_trail_rate: The fraction of journal locations that aren't shelters.
+:return: A list of (entry_num, entry, start SID, dest SID) tuples; the SIDs are the shelters the hiker actually
+    meant (None for places that aren't shelters).
+"""
+def walk_journal(shelters, num_entries, rng, off_trail_rate=0.1):
+    sids = list(shelters)
+    position = rng.randrange(len(sids))
+    start_loc = misspell(shelters[sids[position]]['name'], rng)
+    start_sid = sids[position]
+    journal = []
+    for entry_num in range(num_entries):
+        position = min(position + rng.randint(1, 3), len(sids) - 1)
+        if rng.random() < off_trail_rate:
+            dest = rng.choice(OFF_TRAIL_LOCATIONS)
+            dest_sid = None
+        else:
+            dest = misspell(shelters[sids[position]]['name'], rng)
+            dest_sid = sids[position]
+        journal.append((str(entry_num), {
+            'start_loc': start_loc,
+            'dest': dest,
+            'date': 'Monday, March 7, 2016',
+            'trip_miles': '%.2f' % rng.uniform(5.0, 25.0),
+            'entry': ''
+        }, start_sid, dest_sid))
+        start_loc = dest
+        start_sid = dest_sid
+        if position == len(sids) - 1:
+            position = 0
+    return journal
+
+"""
+make_hikers -Creates hikers walking north through the shelters (see walk_journal).
+:param shelters: The shelters returned by make_shelters.
+:param num_hikers: The number of hikers to create.
+:param num_entries: The number of journal entries per hiker.
+:param seed: The seed of the random number generator.
+:param off_trail_rate: The fraction of journal locations that aren't shelters.
+:return hikers: A list of hiker dictionaries ({'identifier': ..., 'journal': {entry_num: entry}}).
+"""
+def make_hikers(shelters, num_hikers, num_entries, seed=0, off_trail_rate=0.1):
+    rng = random.Random(seed)
+    hikers = []
+    for hiker_id in range(num_hikers):
+        journal = collections.OrderedDict(
+            (entry_num, entry) for entry_num, entry, start_sid, dest_sid in
+            walk_journal(shelters, num_entries, rng, off_trail_rate))
+        hikers.append({'identifier': str(hiker_id), 'journal': journal})
+    return hikers
+
+"""
+write_hikers -Writes hikers as json files (one per hiker, named by identifier) in the unvalidated hikers format.
+"""
+def write_hikers(storage_dir, hikers):
+    for hiker in hikers:
+        with open(os.path.join(storage_dir, hiker['identifier'] + ".json"), 'w') as fp:
+            json.dump(hiker, fp)
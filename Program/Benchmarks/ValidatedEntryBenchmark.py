@@ -0,0 +1,77 @@
+"""
+ValidatedEntryBenchmark.py
+Compares the memory and time cost of building a validated journal by deep copying every entry and embedding the
+    shelter data (the old validate_shelters) against referencing the original entries with ValidatedEntry records.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+from HikerValidator2 import HikerValidator
+from SyntheticData import make_shelters, walk_journal, to_validated_shelters
+
+"""
+make_corpus -Creates a synthetic shelter data set and a journal whose entries have already been resolved to SIDs (see
+    SyntheticData.walk_journal).
+:param num_entries: The number of journal entries.
+:param num_shelters: The number of shelters.
+:returns (validated_shelters, resolved_entries): The shelters and a list of (entry_num, entry, usl_sid, udl_sid).
+"""
+def make_corpus(num_entries, num_shelters=500):
+    shelters = make_shelters(num_shelters)
+    resolved_entries = []
+    for entry_num, entry, start_sid, dest_sid in walk_journal(shelters, num_entries, random.Random(0)):
+        resolved_entries.append((entry_num, entry, None if start_sid is None else str(start_sid),
+                                 None if dest_sid is None else str(dest_sid)))
+    return (to_validated_shelters(shelters), resolved_entries)
+
+"""
+deepcopy_journal -The validated journal as it was built before ValidatedEntry: a deep copy of every entry with copies of
+    the shelter data embedded for start_loc and dest.
+"""
+def deepcopy_journal(validator, resolved_entries):
+    validated_journal = {}
+    for entry_num, entry, usl_assoc_sid, udl_assoc_sid in resolved_entries:
+        validated_journal[entry_num] = copy.deepcopy(entry)
+        validated_journal[entry_num]['start_loc'] = validator.get_validated_location(usl_assoc_sid)
+        validated_journal[entry_num]['dest'] = validator.get_validated_location(udl_assoc_sid)
+    return validated_journal
+
+def validated_entry_journal(validator, resolved_entries):
+    return dict(validator.validate_journal_entries(resolved_entries, {}, {}))
+
+"""
+measure -Returns the wall clock time and the peak memory allocated while building a validated journal.
+"""
+def measure(build_journal, validator, resolved_entries):
+    tracemalloc.start()
+    start = time.perf_counter()
+    validated_journal = build_journal(validator, resolved_entries)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del validated_journal
+    return (elapsed, peak)
+
+def main(num_entries=1000000):
+    validated_shelters, resolved_entries = make_corpus(num_entries)
+    validator = HikerValidator(validated_shelters=validated_shelters,
+                               validated_hostels=None, validated_places=None, statistics=False)
+    print("Synthetic journal entries: %d" % num_entries)
+    for label, build_journal in (("deepcopy + embedded shelters", deepcopy_journal),
+                                 ("ValidatedEntry records", validated_entry_journal)):
+        elapsed, peak = measure(build_journal, validator, resolved_entries)
+        print("%-30s %8.2f s %10.1f MiB peak" % (label, elapsed, peak / float(1 << 20)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks validated journal entry representations.")
+    parser.add_argument('--entries', type=int, default=1000000, help="Number of synthetic journal entries.")
+    args = parser.parse_args()
+    main(num_entries=args.entries)
@@ -0,0 +1,339 @@
+"""
+ElevationClient.py
+Asynchronous, batched client for an elevation web service (the Google Maps Elevation API json format). Points are split
+    into provider sized batches which are requested concurrently under a rate limit, retried when the provider fails,
+    and recorded in a local cache file so that re-runs only request the points that haven't been fetched yet. The client
+    is checked against a local stand-in server by check_client (CartesianConverter.py --check).
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import collections
+import http.server
+import urllib.error
+import urllib.parse
+import urllib.request
+import concurrent.futures
+
+GOOGLE_ELEVATION_URL = "https://maps.googleapis.com/maps/api/elevation/json"
+# The provider rejects requests with more locations than this (and URLs much longer than ~8k characters).
+MAX_LOCATIONS_PER_REQUEST = 256
+# Provider statuses and HTTP status codes that are worth retrying.
+RETRY_STATUSES = frozenset(['OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'])
+RETRY_HTTP_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class ElevationError(Exception):
+    """
+    ElevationError(Exception) -Raised when the elevation provider rejects a request, or keeps failing after every retry.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+    pass
+
+
+class RateLimiter(object):
+    """
+    RateLimiter(object) -Spaces the start of requests at least 1 / requests_per_second seconds apart.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            delay = self.next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_start = max(loop.time(), self.next_start) + self.interval
+
+
+class ElevationCache(object):
+    """
+    ElevationCache(object) -Append only json lines file of {"location": "lat,lon", "elevation": meters} records. A run
+        that is interrupted loses at most the batch being written; a partially written last line is ignored.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.elevations = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, 'r') as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.elevations[record['location']] = record['elevation']
+
+    def __contains__(self, location):
+        return location in self.elevations
+
+    def __getitem__(self, location):
+        return self.elevations[location]
+
+    """
+    put_many -Records the elevations of a batch of locations.
+    :param elevations: A dictionary of "lat,lon" location -> elevation in meters.
+    """
+    def put_many(self, elevations):
+        self.elevations.update(elevations)
+        if self.cache_path is None:
+            return
+        with open(self.cache_path, 'a') as fp:
+            for location, elevation in elevations.items():
+                fp.write(json.dumps({'location': location, 'elevation': elevation}) + "\n")
+
+
+class ElevationClient(object):
+    """
+    ElevationClient(object) -Fetches the elevation of many points with concurrent, rate limited, retried batch requests.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ElevationClient.
+    :param api_key: The provider's API key (None to send no key, e.g. to a local stand-in server).
+    :param base_url: The URL of the elevation service.
+    :param cache_path: The path of the elevation cache file (None to not cache between runs).
+    :param batch_size: The number of locations per request (at most MAX_LOCATIONS_PER_REQUEST).
+    :param max_concurrency: The maximum number of requests in flight at once.
+    :param requests_per_second: The maximum rate requests are started at (None for no limit).
+    :param max_retries: The number of times a failed request is retried before giving up.
+    :param backoff: The delay in seconds before the first retry; doubled for every further retry.
+    :param timeout: The timeout in seconds of a single request.
+    """
+    def __init__(self, api_key=None, base_url=GOOGLE_ELEVATION_URL, cache_path=None,
+                 batch_size=MAX_LOCATIONS_PER_REQUEST, max_concurrency=4, requests_per_second=10.0, max_retries=4,
+                 backoff=0.5, timeout=30.0):
+        if not 0 < batch_size <= MAX_LOCATIONS_PER_REQUEST:
+            raise ValueError("batch_size must be between 1 and %d." % MAX_LOCATIONS_PER_REQUEST)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = ElevationCache(cache_path)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.num_requests = 0
+
+    """
+    get_elevations -Fetches the elevation of every point that isn't cached yet (blocking; see fetch_elevations).
+    """
+    def get_elevations(self, points):
+        return asyncio.run(self.fetch_elevations(points))
+
+    """
+    fetch_elevations -Fetches the elevation of every point that isn't cached yet, and sets each point's 'alt'.
+    :param points: A dictionary of key -> {'lat', 'lon', 'alt'} points (see CartesianConverter.main).
+    :return elevations: A dictionary of key -> elevation in meters.
+    """
+    async def fetch_elevations(self, points):
+        locations = {}
+        for key, point in points.items():
+            locations[key] = location_string(point['lat'], point['lon'])
+        # Points repeated along the centerline are only requested once.
+        missing = list(collections.OrderedDict.fromkeys(
+            location for location in locations.values() if location not in self.cache))
+        batches = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        rate_limiter = RateLimiter(self.requests_per_second)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            await asyncio.gather(*[self.fetch_batch(batch, rate_limiter, semaphore, executor) for batch in batches])
+        elevations = {}
+        for key, location in locations.items():
+            elevations[key] = self.cache[location]
+            points[key]['alt'] = elevations[key]
+        return elevations
+
+    """
+    fetch_batch -Requests the elevations of one batch of locations (retrying failures) and caches them.
+    """
+    async def fetch_batch(self, batch, rate_limiter, semaphore, executor):
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await rate_limiter.acquire()
+                self.num_requests += 1
+                try:
+                    response = await loop.run_in_executor(executor, self.request, batch)
+                except (urllib.error.URLError, OSError, ValueError) as error:
+                    if isinstance(error, urllib.error.HTTPError) and error.code not in RETRY_HTTP_CODES:
+                        raise ElevationError("The elevation request failed with HTTP %d." % error.code)
+                    failure = str(error)
+                else:
+                    status = response.get('status')
+                    if status == 'OK':
+                        self.cache.put_many(parse_elevations(batch, response))
+                        return
+                    if status not in RETRY_STATUSES:
+                        raise ElevationError("The elevation request failed with status %s: %s"
+                                             % (status, response.get('error_message', '')))
+                    failure = status
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+        raise ElevationError("The elevation request failed after %d retries: %s" % (self.max_retries, failure))
+
+    """
+    request -Performs a single (blocking) elevation request; run in the executor's threads.
+    :return response: The decoded json response.
+    """
+    def request(self, batch):
+        query = {'locations': "|".join(batch)}
+        if self.api_key is not None:
+            query['key'] = self.api_key
+        request_url = self.base_url + "?" + urllib.parse.urlencode(query, safe=",|")
+        with urllib.request.urlopen(request_url, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+"""
+location_string -Formats a point as the "lat,lon" string used in requests and as the cache key.
+"""
+def location_string(lat, lon):
+    return "%s,%s" % (str(lat).strip(), str(lon).strip())
+
+"""
+parse_elevations -Pairs the results of a response with the locations of its batch (results are in request order).
+:return elevations: A dictionary of "lat,lon" location -> elevation in meters.
+"""
+def parse_elevations(batch, response):
+    results = response.get('results', [])
+    if len(results) != len(batch):
+        raise ElevationError("Requested %d elevations but received %d." % (len(batch), len(results)))
+    return dict((location, result['elevation']) for location, result in zip(batch, results))
+
+
+class StandInElevationHandler(http.server.BaseHTTPRequestHandler):
+    """
+    StandInElevationHandler(BaseHTTPRequestHandler) -Serves the Elevation API json format from a local http.server so
+        that the client can be checked without the provider (see check_client). The elevation of a location is
+        stand_in_elevation(lat, lon). Requests with the wrong key are denied, and a repeating pattern of requests fails
+        (an HTTP 503 and an OVER_QUERY_LIMIT status) to exercise the retries.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+    # The response to each request, repeating: None for a successful response.
+    FAILURES = (None, 503, 'OVER_QUERY_LIMIT', None)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            failure = self.FAILURES[server.num_requests % len(self.FAILURES)]
+            server.num_requests += 1
+            server.num_in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.num_in_flight)
+        try:
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            if failure == 503:
+                self.send_error(503)
+                return
+            if query.get('key', [None])[0] != server.api_key:
+                body = {'status': 'REQUEST_DENIED', 'error_message': "The provided API key is invalid.", 'results': []}
+            elif failure is not None:
+                body = {'status': failure, 'results': []}
+            else:
+                results = []
+                for location in query['locations'][0].split("|"):
+                    lat, lon = location.split(",")
+                    results.append({'elevation': stand_in_elevation(float(lat), float(lon)),
+                                    'location': {'lat': float(lat), 'lng': float(lon)}})
+                body = {'status': 'OK', 'results': results}
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.num_in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+"""
+stand_in_elevation -The elevation served by the stand-in server for a location.
+"""
+def stand_in_elevation(lat, lon):
+    return round(lat * 10.0 + lon, 3)
+
+"""
+start_stand_in_server -Starts a stand-in elevation server on a free local port, on a background thread.
+:param api_key: The key the server accepts (None to accept requests without a key).
+:return server: The http.server; its URL is "http://127.0.0.1:%d/elevation/json" % server.server_port. Call
+    server.shutdown() to stop it.
+"""
+def start_stand_in_server(api_key=None):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInElevationHandler)
+    server.api_key = api_key
+    server.lock = threading.Lock()
+    server.num_requests = 0
+    server.num_in_flight = 0
+    server.max_in_flight = 0
+    threading.Thread(target=server.serve_forever, name="StandInElevationServer", daemon=True).start()
+    return server
+
+"""
+check_client -Fetches the elevations of synthetic points from a stand-in server: checks every elevation, that failed
+    requests are retried, that the concurrency limit is kept, that cached points aren't requested again, and that a
+    denied request raises an ElevationError.
+:param num_points: The number of points fetched.
+:return errors: A list of descriptions of the checks that failed.
+"""
+def check_client(num_points=1000):
+    errors = []
+    server = start_stand_in_server(api_key="stand-in-key")
+    base_url = "http://127.0.0.1:%d/elevation/json" % server.server_port
+    points = collections.OrderedDict()
+    for point_num in range(num_points):
+        # Every tenth point repeats an earlier one, as points do along the centerline.
+        source_num = point_num - 5 if point_num % 10 == 9 else point_num
+        points[point_num] = {'lat': 34.6 + source_num * 1e-3, 'lon': -84.2 + source_num * 1e-3, 'alt': 0}
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, "elevation_cache.jsonl")
+            client = ElevationClient(api_key="stand-in-key", base_url=base_url, cache_path=cache_path, batch_size=64,
+                                     max_concurrency=3, requests_per_second=None, backoff=0.01)
+            try:
+                client.get_elevations(points)
+            except ElevationError as error:
+                return ["Fetching from the stand-in server failed: %s" % error]
+            for point_num, point in points.items():
+                if point['alt'] != stand_in_elevation(point['lat'], point['lon']):
+                    errors.append("Point %d has elevation %r, expected %r"
+                                  % (point_num, point['alt'], stand_in_elevation(point['lat'], point['lon'])))
+            num_batches = -(-len(set(location_string(point['lat'], point['lon']) for point in points.values())) // 64)
+            if client.num_requests <= num_batches:
+                errors.append("%d requests for %d batches: the failed requests weren't retried"
+                              % (client.num_requests, num_batches))
+            if server.max_in_flight > 3:
+                errors.append("%d requests were in flight at once (limit 3)" % server.max_in_flight)
+            cached_client = ElevationClient(api_key="stand-in-key", base_url=base_url, cache_path=cache_path)
+            cached_client.get_elevations(points)
+            if cached_client.num_requests != 0:
+                errors.append("%d requests were made for cached points" % cached_client.num_requests)
+        try:
+            ElevationClient(api_key="wrong-key", base_url=base_url, backoff=0.01).get_elevations(
+                {0: {'lat': 35.0, 'lon': -83.0, 'alt': 0}})
+            errors.append("A denied request didn't raise an ElevationError")
+        except ElevationError:
+            pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return errors
@@ -6,14 +6,27 @@ Takes the combined AT Shelters data set and removes duplicates, then exports to
 """
 
 import os
+import sys
+import math
+import time
+import argparse
+import functools
 import collections
+import multiprocessing
 from fuzzywuzzy import fuzz
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+from NameNormalizer import NameNormalizer, normalize_name
+from SpatialIndex import to_unit_sphere, miles_to_chord
+
+# Words too common in shelter names to be used as name-token blocking keys.
+GENERIC_NAME_TOKENS = frozenset(['shelter', 'lean', 'to', 'hut', 'camp', 'campsite', 'site', 'the', 'of', 'and', 'at'])
 
 """
 main -Goes through every shelter in the AT_Shelters_Combined dataset and removes duplicate shelters. Then the new
     dataset (with duplicates removed) is written to the hard drive.
+:param jobs: The number of processes used to fuzzy compare the candidate pairs.
 """
-def main():
+def main(jobs=1):
     filename = "AT Shelters Combined.csv"
     storage_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/TrailShelters/'))
     cwd = os.getcwd()
@@ -25,65 +38,247 @@ def main():
                 read_data = line.split(",")
                 shelters[line_num] = {
                     'SID': line_num,
-                    'name': mt_to_mount(read_data[0]),
+                    'name': read_data[0],
                     'data_set': read_data[1],
                     'lat': float(read_data[2]),
                     'lon': float(read_data[3]),
                     'shelter_type': read_data[4]
                 }
             line_num += 1
-    shelters_no_duplicates = remove_duplicates(shelters=shelters)
+    shelters_no_duplicates = remove_duplicates(shelters=shelters, jobs=jobs)
     write_data(shelters_no_duplicates)
 
-def mt_to_mountain(original_name):
-    if "Mt." in original_name:
-        new_name = original_name.replace("Mt.", "Mountain")
-    return new_name
+"""
+name_tokens -Returns the distinctive words of a normalized shelter name (the name-token blocking keys).
+"""
+def name_tokens(name):
+    return set(token for token in normalize_name(name).split() if token not in GENERIC_NAME_TOKENS)
+
+class CandidateBlocker(object):
+    """
+    CandidateBlocker(object) -Incremental blocking index over shelters, so that only plausible duplicates are compared.
+        Two shelters are candidates only if they are within distance_tolerance miles of each other (found through a
+        grid over the shelters' unit sphere coordinates whose cells are distance_tolerance wide) and, if block_on_tokens
+        is set, their names share a distinctive word (see name_tokens). Names without a distinctive word are candidates
+        for every nearby shelter. The spatial blocking never misses a pair within distance_tolerance; token blocking can
+        miss names that are the same by fuzzy string comparison without sharing a whole word (e.g. "Rock" and "Rocky"),
+        in exchange for far fewer comparisons when distance_tolerance is large or None.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type CandidateBlocker.
+    :param distance_tolerance: The maximum distance in miles between duplicates (None to ignore location).
+    :param block_on_tokens: A boolean flag; if True then only names that share a distinctive word are compared.
+    """
+    def __init__(self, distance_tolerance=0.25, block_on_tokens=False):
+        self.distance_tolerance = distance_tolerance
+        self.block_on_tokens = block_on_tokens
+        if distance_tolerance is not None:
+            # Chord length on the unit sphere equivalent to the distance tolerance (and the width of a grid cell).
+            self.max_chord = float(miles_to_chord(distance_tolerance))
+            self.cell_size = max(self.max_chord, 1e-9)
+        # Every shelter added so far: grid cell -> name token -> shelter indices. The '*' token holds the names without
+        # a distinctive word and the None token holds every shelter in the cell.
+        self.grid = {}
+        self.points = []
+
+    """
+    candidates -Returns the indices of the added shelters that are candidate duplicates of the provided shelter.
+    :param shelter: A shelter dictionary (with 'name', 'lat', and 'lon').
+    :return candidates: The sorted indices of the candidate shelters.
+    """
+    def candidates(self, shelter):
+        point, cell = self._locate(shelter)
+        if cell is None:
+            neighbor_cells = [None]
+        else:
+            neighbor_cells = [(cell[0] + dx, cell[1] + dy, cell[2] + dz)
+                              for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+        tokens = name_tokens(shelter['name']) if self.block_on_tokens else set()
+        if tokens:
+            block_keys = list(tokens) + ['*']
+        else:
+            block_keys = [None]
+        candidates = set()
+        for neighbor_cell in neighbor_cells:
+            blocks = self.grid.get(neighbor_cell)
+            if blocks is not None:
+                for block_key in block_keys:
+                    candidates.update(blocks.get(block_key, ()))
+        if point is None:
+            return sorted(candidates)
+        nearby = []
+        for candidate in sorted(candidates):
+            other = self.points[candidate]
+            chord = math.sqrt((point[0] - other[0]) ** 2 + (point[1] - other[1]) ** 2 + (point[2] - other[2]) ** 2)
+            if chord <= self.max_chord:
+                nearby.append(candidate)
+        return nearby
 
+    """
+    add -Adds a shelter to the index.
+    :return index: The index of the shelter (the number of shelters added before it).
+    """
+    def add(self, shelter):
+        index = len(self.points)
+        point, cell = self._locate(shelter)
+        self.points.append(point)
+        blocks = self.grid.setdefault(cell, collections.defaultdict(list))
+        blocks[None].append(index)
+        if self.block_on_tokens:
+            for token in (name_tokens(shelter['name']) or ['*']):
+                blocks[token].append(index)
+        return index
+
+    def _locate(self, shelter):
+        if self.distance_tolerance is None:
+            return (None, None)
+        point = tuple(to_unit_sphere(shelter['lat'], shelter['lon']).tolist())
+        return (point, tuple(int(math.floor(coordinate / self.cell_size)) for coordinate in point))
+
+"""
+candidate_pairs -Blocks the shelters so that only plausible duplicates are compared (see CandidateBlocker).
+:param shelters: A list of shelter dictionaries (with 'name', 'lat', and 'lon') in data set order.
+:param distance_tolerance: The maximum distance in miles between duplicates (None to ignore location).
+:param block_on_tokens: A boolean flag; if True then only names that share a distinctive word are compared.
+:return pairs: A list of (earlier_index, later_index) candidate pairs, ordered by later_index then earlier_index.
+"""
+def candidate_pairs(shelters, distance_tolerance=0.25, block_on_tokens=False):
+    blocker = CandidateBlocker(distance_tolerance=distance_tolerance, block_on_tokens=block_on_tokens)
+    pairs = []
+    for shelter in shelters:
+        candidates = blocker.candidates(shelter)
+        index = blocker.add(shelter)
+        pairs.extend((candidate, index) for candidate in candidates)
+    return pairs
+
+"""
+names_can_match -Returns False if two names can't reach the comparison threshold: fuzz.partial_ratio is at most
+    2C / (m + C) where C is the number of characters the names have in common and m is the length of the shorter name.
+:param name_counts1: The collections.Counter of the first name's characters.
+:param name_counts2: The collections.Counter of the second name's characters.
+"""
+def names_can_match(name1, name2, comparison_threshold, name_counts1=None, name_counts2=None):
+    if not name1 or not name2:
+        return True
+    if name_counts1 is None:
+        name_counts1 = collections.Counter(name1)
+    if name_counts2 is None:
+        name_counts2 = collections.Counter(name2)
+    overlap = sum((name_counts1 & name_counts2).values())
+    shorter = min(len(name1), len(name2))
+    return int(round(100.0 * 2 * overlap / (shorter + overlap))) >= comparison_threshold
+
+"""
+score_pairs -Fuzzy compares the names of each candidate pair. A pair whose names can't reach the comparison threshold
+    (see names_can_match) is discarded without being compared. With more than one job the pairs are split into chunks
+    scored by a process pool; the chunks are merged back in order, so the result is identical to scoring serially.
+:param names: The name of every shelter.
+:param pairs: The candidate pairs returned by candidate_pairs.
+:param comparison_threshold: The minimum fuzz.partial_ratio for two names to be considered the same.
+:param jobs: The number of processes used to score the pairs.
+:param chunk_size: The number of pairs sent to a worker process at a time.
+:param pool: An optional multiprocessing.Pool to score the pairs with (instead of starting one for the call).
+:return matches: The candidate pairs whose names are the same by fuzzy string comparison (in the order of pairs).
+"""
+def score_pairs(names, pairs, comparison_threshold=90, jobs=1, chunk_size=5000, pool=None):
+    if pool is None and (jobs <= 1 or len(pairs) <= chunk_size):
+        name_counts = {}
+        matches = []
+        for index1, index2 in pairs:
+            name1 = names[index1]
+            name2 = names[index2]
+            for index, name in ((index1, name1), (index2, name2)):
+                if index not in name_counts:
+                    name_counts[index] = collections.Counter(name)
+            if not names_can_match(name1, name2, comparison_threshold, name_counts[index1], name_counts[index2]):
+                continue
+            if fuzz.partial_ratio(name1, name2) >= comparison_threshold:
+                matches.append((index1, index2))
+        return matches
+
+    # Each task carries the names of its pairs, so the workers don't need a copy of every name.
+    chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+    tasks = ([(names[index1], names[index2]) for index1, index2 in chunk] for chunk in chunks)
+    owns_pool = pool is None
+    if owns_pool:
+        pool = multiprocessing.Pool(processes=jobs)
+    matches = []
+    try:
+        # imap returns the chunks in submission order, whichever worker finishes first.
+        for chunk, matching_positions in zip(chunks, pool.imap(functools.partial(
+                score_name_pairs, comparison_threshold=comparison_threshold), tasks)):
+            matches.extend(chunk[position] for position in matching_positions)
+    finally:
+        if owns_pool:
+            pool.close()
+            pool.join()
+    return matches
+
+"""
+score_name_pairs -Pool task; fuzzy compares a chunk of (name1, name2) pairs.
+:return matching_positions: The positions within the chunk of the pairs that are the same by fuzzy string comparison.
+"""
+def score_name_pairs(name_pairs, comparison_threshold=90):
+    matching_positions = []
+    for position, (name1, name2) in enumerate(name_pairs):
+        if names_can_match(name1, name2, comparison_threshold) and \
+                fuzz.partial_ratio(name1, name2) >= comparison_threshold:
+            matching_positions.append(position)
+    return matching_positions
+
+"""
+resolve_duplicates -Greedily keeps the shelters in data set order, dropping a shelter if it matches a shelter that has
+    already been kept.
+:param num_shelters: The number of shelters.
+:param matches: The matching (earlier_index, later_index) pairs returned by score_pairs.
+:return duplicate_of: A dictionary of dropped shelter index -> the index of the kept shelter it duplicates.
+"""
+def resolve_duplicates(num_shelters, matches):
+    matches_of = collections.defaultdict(list)
+    for index1, index2 in matches:
+        matches_of[index2].append(index1)
+    duplicate_of = {}
+    for index in range(num_shelters):
+        for other in sorted(matches_of.get(index, ())):
+            if other not in duplicate_of:
+                duplicate_of[index] = other
+                break
+    return duplicate_of
 
 """
-remove_duplicates -Finds and removes duplicate shelters in the dataset by utilizing two comparisions for equality:
-    1. A fuzzy string comparison between the duplicate in question and every entry in the unique shelter dataset,
-        with a comparison threshold of 90/100 or greater.
-    2. A latitude and longitude comparison between the duplicate shelter in question and every entry in the unique
-        shelter dataset. Latitude and longitude are rounded to the 3rd decimal place and then compared for equality.
+remove_duplicates -Finds and removes duplicate shelters in the dataset. Two shelters are duplicates if:
+    1. A fuzzy string comparison of their normalized names (see NameNormalizer.normalize_name) has a ratio of
+        comparison_threshold or greater.
+    2. They are within distance_tolerance miles of each other.
+    Only the shelters in the same spatial and name-token blocks are compared (see candidate_pairs), so the cost grows
+    with the number of nearby, similarly named shelters rather than the square of the data set size.
 :param shelters -A dictionary representing the entire Combined_Shelter_Dataset with duplicates to be removed included.
+:param comparison_threshold: The minimum fuzz.partial_ratio for two names to be considered the same.
+:param distance_tolerance: The maximum distance in miles between duplicates (None to ignore location).
+:param block_on_tokens: A boolean flag; if True then only names that share a distinctive word are compared.
+:param jobs: The number of processes used to fuzzy compare the candidate pairs (see score_pairs).
+:return shelters_no_duplicates: The shelters (in their original order) with the duplicates removed.
 """
-def remove_duplicates(shelters):
+def remove_duplicates(shelters, comparison_threshold=90, distance_tolerance=0.25, block_on_tokens=False, jobs=1):
+    keys = list(shelters.keys())
+    values = list(shelters.values())
+    pairs = candidate_pairs(values, distance_tolerance=distance_tolerance, block_on_tokens=block_on_tokens)
+    start = time.perf_counter()
+    # Names are compared in their normalized form; each unique name is normalized once.
+    normalizer = NameNormalizer()
+    matches = score_pairs([normalizer.normalize(value['name']) for value in values], pairs,
+                          comparison_threshold=comparison_threshold, jobs=jobs)
+    elapsed = time.perf_counter() - start
+    print("Scored %d candidate pairs in %.2f s (%.0f pairs/sec, %d jobs)."
+          % (len(pairs), elapsed, len(pairs) / elapsed if elapsed > 0 else 0.0, jobs))
+    duplicate_of = resolve_duplicates(len(values), matches)
     shelters_no_duplicates = collections.OrderedDict()
-    # Add the first shelter to the list of no duplicates.
-    shelters_no_duplicates[1] = shelters[1]
-    comparison_threshold = 90
-
-    for key1, value1 in shelters.items():
-        same_shelter_by_string = False
-        same_shelter_by_gis = False
-        for key2,value2 in shelters_no_duplicates.items():
-            # Shelter fuzzy string comparison.
-            comparison_ratio = fuzz.partial_ratio(value1['name'], value2['name'])
-            if comparison_ratio >= comparison_threshold:
-                # The shelters are the same by fuzzy string comparison.
-                print("Comparing Names: %s and %s" %(value1['name'], value2['name']))
-                print("Comparison Ratio: %d" %comparison_ratio)
-                same_shelter_by_string = True
-
-                # Compare the shelters by latitude and longitude (rounded to 100ths place)
-                value1_lat = value1['lat']
-                value1_lon = value1['lon']
-                value2_lat = value2['lat']
-                value2_lon = value2['lon']
-                value1_lat = float("{0:.3f}".format(value1_lat))
-                value1_lon = float("{0:.3f}".format(value1_lon))
-                value2_lat = float("{0:.3f}".format(value2_lat))
-                value2_lon = float("{0:.3f}".format(value2_lon))
-                if value1_lat == value2_lat or value1_lon == value2_lon:
-                    # The shelters are the same by latitude comparison.
-                    same_shelter_by_gis = True
-            else:
-                same_shelter_by_string = False
-        if not same_shelter_by_string:
-            if not same_shelter_by_gis:
-                shelters_no_duplicates[key1] = value1
+    for index, key in enumerate(keys):
+        if index not in duplicate_of:
+            shelters_no_duplicates[key] = values[index]
     return shelters_no_duplicates
 
 def write_data(shelters_no_duplicates):
@@ -98,4 +293,8 @@ def write_data(shelters_no_duplicates):
     new_shelters_csv.close()
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Removes duplicate shelters from the combined AT shelters data set.")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of processes used to fuzzy compare the candidate pairs (default: 1).")
+    args = parser.parse_args()
+    main(jobs=args.jobs)
@@ -0,0 +1,316 @@
+"""
+ShelterMergePipeline.py
+Merges any number of shelter source CSV files (TNL, ATC, hostels, places, ...) into newShelters.csv. Records are
+    streamed from each source with a CSV reader and clustered with the records of every previously merged source using
+    a union-find, so merging a new source only compares that source's records.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import multiprocessing
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Geovalidation')))
+from ShelterDuplicateRemover import CandidateBlocker, score_pairs
+from NameNormalizer import NameNormalizer, NORMALIZER_VERSION
+
+# The accepted (lower case) column names of each field in a source CSV file.
+FIELD_ALIASES = {
+    'name': ('name', 'shelter', 'shelter_name'),
+    'data_set': ('data_set', 'dataset'),
+    'lat': ('lat', 'latitude'),
+    'lon': ('lon', 'lng', 'long', 'longitude'),
+    'shelter_type': ('shelter_type', 'type')
+}
+
+"""
+source_checksum -Computes a checksum of a source CSV file; a source is only merged again if its contents change.
+"""
+def source_checksum(source_path):
+    digest = hashlib.sha1()
+    with open(source_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+"""
+read_source -Streams the shelter records of a source CSV file.
+:param source_path: The path to the source CSV file. The header must name the name, lat, and lon columns (see
+    FIELD_ALIASES); the data set defaults to the file name and the shelter type to ''.
+:return: A generator of {'name', 'data_set', 'lat', 'lon', 'shelter_type'} records.
+"""
+def read_source(source_path):
+    default_data_set = os.path.splitext(os.path.basename(source_path))[0]
+    with open(source_path, 'r', newline='') as fp:
+        reader = csv.DictReader(fp)
+        columns = {}
+        for field, aliases in FIELD_ALIASES.items():
+            for column in (reader.fieldnames or []):
+                if column.strip().lower() in aliases:
+                    columns[field] = column
+                    break
+        for field in ('name', 'lat', 'lon'):
+            if field not in columns:
+                raise ValueError("Source %s has no %s column (expected one of %s)."
+                                 % (source_path, field, ", ".join(FIELD_ALIASES[field])))
+        for row in reader:
+            try:
+                lat = float(row[columns['lat']])
+                lon = float(row[columns['lon']])
+            except (TypeError, ValueError):
+                print("Skipping line %d of %s: invalid latitude or longitude." % (reader.line_num, source_path))
+                continue
+            yield {
+                'name': row[columns['name']].strip(),
+                'data_set': row[columns['data_set']].strip() if 'data_set' in columns else default_data_set,
+                'lat': lat,
+                'lon': lon,
+                'shelter_type': row[columns['shelter_type']].strip() if 'shelter_type' in columns else ''
+            }
+
+
+class ShelterMergePipeline(object):
+    """
+    ShelterMergePipeline(object) -Clusters the shelter records of every merged source. Two records are in the same
+        cluster if a chain of duplicate pairs (the same by fuzzy string comparison and within distance_tolerance miles,
+        see ShelterDuplicateRemover) connects them. The earliest merged record of each cluster is its canonical record.
+        The records and the union-find are saved in state_dir so that later runs only process new sources.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ShelterMergePipeline; loads the saved state (if any).
+    :param state_dir: The directory the merged records and the union-find are saved in.
+    :param comparison_threshold: The minimum fuzz.partial_ratio for two names to be considered the same.
+    :param distance_tolerance: The maximum distance in miles between duplicates (None to ignore location).
+    :param block_on_tokens: A boolean flag; if True then only names that share a distinctive word are compared.
+    :param batch_size: The number of source records compared and merged at a time.
+    :param jobs: The number of processes used to fuzzy compare the candidate pairs (see score_pairs).
+    """
+    def __init__(self, state_dir, comparison_threshold=90, distance_tolerance=0.25, block_on_tokens=False,
+                 batch_size=10000, jobs=1):
+        self.state_dir = state_dir
+        self.records_path = os.path.join(state_dir, "records.jsonl")
+        self.state_path = os.path.join(state_dir, "merge_state.json")
+        self.settings = {
+            'comparison_threshold': comparison_threshold,
+            'distance_tolerance': distance_tolerance,
+            'block_on_tokens': block_on_tokens,
+            'normalizer_version': NORMALIZER_VERSION
+        }
+        self.batch_size = batch_size
+        self.jobs = jobs
+        # The scoring pool and the pairs scored while merging the current source.
+        self.pool = None
+        self.num_pairs_scored = 0
+        self.scoring_time = 0.0
+        self.blocker = CandidateBlocker(distance_tolerance=distance_tolerance, block_on_tokens=block_on_tokens)
+        self.records = []
+        self.parent = []
+        self.sources = {}
+        if not os.path.isdir(state_dir):
+            os.makedirs(state_dir)
+        if os.path.exists(self.state_path):
+            self._load()
+        elif os.path.exists(self.records_path):
+            # Records of an interrupted first run.
+            os.remove(self.records_path)
+
+    def _load(self):
+        with open(self.state_path, 'r') as fp:
+            state = json.load(fp)
+        if state['settings'] != self.settings:
+            raise ValueError("The merge state in %s was built with %r; rebuild it to merge with %r."
+                             % (self.state_dir, state['settings'], self.settings))
+        self.parent = state['parent']
+        self.sources = state['sources']
+        with open(self.records_path, 'r+') as fp:
+            while len(self.records) < len(self.parent):
+                record = json.loads(fp.readline())
+                self.records.append(record)
+                self.blocker.add(record)
+            # Drop any records appended after the state was last saved (by an interrupted run).
+            fp.truncate(fp.tell())
+
+    """
+    find -Returns the root (the earliest record) of a record's cluster.
+    """
+    def find(self, record_id):
+        root = record_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression.
+        while self.parent[record_id] != root:
+            self.parent[record_id], record_id = root, self.parent[record_id]
+        return root
+
+    """
+    union -Merges the clusters of two records; the earlier root stays the root so canonical records are stable.
+    """
+    def union(self, record_id1, record_id2):
+        root1 = self.find(record_id1)
+        root2 = self.find(record_id2)
+        if root1 != root2:
+            self.parent[max(root1, root2)] = min(root1, root2)
+
+    """
+    add_source -Merges the records of a source CSV file. A source that has already been merged (with the same contents)
+        is skipped.
+    :param source_path: The path to the source CSV file (see read_source).
+    :return num_records: The number of records merged.
+    """
+    def add_source(self, source_path):
+        source_key = os.path.abspath(source_path)
+        checksum = source_checksum(source_path)
+        if source_key in self.sources:
+            if self.sources[source_key] == checksum:
+                return 0
+            raise ValueError("Source %s changed since it was merged; rebuild the merge state." % source_path)
+        num_records = 0
+        batch = []
+        self.num_pairs_scored = 0
+        self.scoring_time = 0.0
+        if self.jobs > 1:
+            self.pool = multiprocessing.Pool(processes=self.jobs)
+        try:
+            with open(self.records_path, 'a') as records_fp:
+                for record in read_source(source_path):
+                    record['source'] = os.path.basename(source_path)
+                    batch.append(record)
+                    if len(batch) == self.batch_size:
+                        num_records += self._merge_batch(batch, records_fp)
+                        batch = []
+                if batch:
+                    num_records += self._merge_batch(batch, records_fp)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+        print("Scored %d candidate pairs from %s in %.2f s (%.0f pairs/sec, %d jobs)."
+              % (self.num_pairs_scored, source_path, self.scoring_time,
+                 self.num_pairs_scored / self.scoring_time if self.scoring_time > 0 else 0.0, self.jobs))
+        self.sources[source_key] = checksum
+        self.save()
+        return num_records
+
+    def _merge_batch(self, batch, records_fp):
+        pairs = []
+        for record in batch:
+            candidates = self.blocker.candidates(record)
+            record_id = self.blocker.add(record)
+            self.records.append(record)
+            self.parent.append(record_id)
+            pairs.extend((candidate, record_id) for candidate in candidates)
+            records_fp.write(json.dumps(record) + "\n")
+        start = time.perf_counter()
+        matches = score_pairs(_RecordNames(self.records), pairs,
+                              comparison_threshold=self.settings['comparison_threshold'], pool=self.pool)
+        self.scoring_time += time.perf_counter() - start
+        self.num_pairs_scored += len(pairs)
+        for record_id1, record_id2 in matches:
+            self.union(record_id1, record_id2)
+        return len(batch)
+
+    """
+    save -Saves the union-find and the merged sources (the records are appended as they are merged).
+    """
+    def save(self):
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, 'w') as fp:
+            json.dump({'settings': self.settings, 'sources': self.sources, 'parent': self.parent}, fp)
+        os.replace(temp_path, self.state_path)
+
+    """
+    clusters -Groups the merged records by cluster.
+    :return clusters: A list of (canonical record id, [member record ids]) in canonical record order.
+    """
+    def clusters(self):
+        members = {}
+        for record_id in range(len(self.records)):
+            members.setdefault(self.find(record_id), []).append(record_id)
+        return sorted(members.items())
+
+    """
+    write_outputs -Writes the canonical shelter file (one shelter per cluster, in the newShelters.csv format) and the
+        cluster membership file (the SID of the cluster every merged record belongs to), creating their directories if
+        needed.
+    :param shelters_path: The path of the canonical shelter file (newShelters.csv).
+    :param clusters_path: The path of the cluster membership file.
+    :return num_shelters: The number of canonical shelters.
+    """
+    def write_outputs(self, shelters_path, clusters_path):
+        clusters = self.clusters()
+        for output_path in (shelters_path, clusters_path):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(shelters_path + ".tmp", 'w', newline='') as shelters_fp, \
+                open(clusters_path + ".tmp", 'w', newline='') as clusters_fp:
+            shelters_writer = csv.writer(shelters_fp, lineterminator="\n")
+            clusters_writer = csv.writer(clusters_fp, lineterminator="\n")
+            shelters_writer.writerow(['SID', 'name', 'data_set', 'lat', 'lon', 'shelter_type'])
+            clusters_writer.writerow(['SID', 'record_id', 'source', 'name', 'data_set', 'lat', 'lon', 'shelter_type'])
+            for sid, (canonical_id, member_ids) in enumerate(clusters, start=1):
+                canonical = self.records[canonical_id]
+                shelters_writer.writerow([sid, canonical['name'], canonical['data_set'], canonical['lat'],
+                                          canonical['lon'], canonical['shelter_type']])
+                for record_id in member_ids:
+                    record = self.records[record_id]
+                    clusters_writer.writerow([sid, record_id, record['source'], record['name'], record['data_set'],
+                                              record['lat'], record['lon'], record['shelter_type']])
+        os.replace(shelters_path + ".tmp", shelters_path)
+        os.replace(clusters_path + ".tmp", clusters_path)
+        return len(clusters)
+
+
+class _RecordNames(object):
+    # Read-only view of the normalized record names for score_pairs, so a name list isn't rebuilt for every batch.
+    def __init__(self, records):
+        self.records = records
+        self.normalizer = NameNormalizer()
+
+    def __getitem__(self, record_id):
+        return self.normalizer.normalize(self.records[record_id]['name'])
+
+"""
+main -Merges the provided source CSV files into newShelters.csv and shelterClusters.csv.
+"""
+def main(source_paths, state_dir, output_dir, comparison_threshold=90, distance_tolerance=0.25,
+         block_on_tokens=False, rebuild=False, jobs=1):
+    if rebuild:
+        for filename in ("records.jsonl", "merge_state.json"):
+            if os.path.exists(os.path.join(state_dir, filename)):
+                os.remove(os.path.join(state_dir, filename))
+    pipeline = ShelterMergePipeline(state_dir, comparison_threshold=comparison_threshold,
+                                    distance_tolerance=distance_tolerance, block_on_tokens=block_on_tokens,
+                                    jobs=jobs)
+    for source_path in source_paths:
+        num_records = pipeline.add_source(source_path)
+        print("Merged %d records from %s." % (num_records, source_path))
+    num_shelters = pipeline.write_outputs(os.path.join(output_dir, "newShelters.csv"),
+                                          os.path.join(output_dir, "shelterClusters.csv"))
+    print("Wrote %d shelters (from %d records)." % (num_shelters, len(pipeline.records)))
+
+if __name__ == '__main__':
+    storage_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/TrailShelters/'))
+    parser = argparse.ArgumentParser(description="Merges shelter source CSV files into newShelters.csv.")
+    parser.add_argument('sources', nargs='*', default=[os.path.join(storage_dir, "AT Shelters Combined.csv")],
+                        help="Source CSV files, merged in order (default: AT Shelters Combined.csv).")
+    parser.add_argument('--state-dir', default=os.path.join(storage_dir, "merge_state"),
+                        help="Directory the merge state is saved in.")
+    parser.add_argument('--output-dir', default=storage_dir, help="Directory the output files are written to.")
+    parser.add_argument('--threshold', type=int, default=90, help="Fuzzy string comparison threshold.")
+    parser.add_argument('--distance', type=float, default=0.25, help="Distance tolerance in miles.")
+    parser.add_argument('--block-on-tokens', action='store_true',
+                        help="Only compare names that share a distinctive word.")
+    parser.add_argument('--rebuild', action='store_true', help="Discard the merge state and merge every source again.")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of processes used to fuzzy compare the candidate pairs (default: 1).")
+    args = parser.parse_args()
+    main(args.sources, args.state_dir, args.output_dir, comparison_threshold=args.threshold,
+         distance_tolerance=args.distance, block_on_tokens=args.block_on_tokens, rebuild=args.rebuild, jobs=args.jobs)
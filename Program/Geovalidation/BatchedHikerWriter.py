@@ -0,0 +1,208 @@
+"""
+BatchedHikerWriter.py
+Atomic, batched writing of validated hiker json files.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import json
+import queue
+import threading
+from collections import deque
+from ValidatedEntry import serialize_validated_entry
+from Instrumentation import instrumentation
+
+"""
+validated_hiker_path -Returns the path of a validated hiker's json file.
+:param validated_hikers_data_path: The validated hikers directory.
+:param hiker_id: The hiker's identifier.
+:param extension: The extension of the file.
+"""
+def validated_hiker_path(validated_hikers_data_path, hiker_id, extension=".json"):
+    return os.path.join(validated_hikers_data_path, str(hiker_id) + extension)
+
+"""
+temp_path_for -Returns the temporary file a hiker is written to before it is renamed into place. The process ID keeps
+    concurrent writers of the same hiker apart; the name never matches an unvalidated hiker's file name, so a temporary
+    file left by a crash is never mistaken for a validated hiker.
+"""
+def temp_path_for(output_path):
+    return "%s.%d.tmp" % (output_path, os.getpid())
+
+"""
+write_json_atomically -Writes a hiker to a temporary file and renames it over the output path, so the output path only
+    ever holds a complete json file.
+:param output_path: The path of the json file.
+:param hiker: The hiker object (validated journal entries are materialized as they are written).
+:param fsync: A boolean flag; if True then the file's contents are flushed to disk before it is renamed. Otherwise the
+    file is only protected against the process crashing: after a power loss the output path may hold an empty file
+    (see BatchedHikerWriter to sync the files a batch at a time).
+"""
+def write_json_atomically(output_path, hiker, fsync=False):
+    temp_path = write_temp_file(output_path, hiker)
+    if fsync:
+        sync_files([temp_path])
+    os.replace(temp_path, output_path)
+
+"""
+write_temp_file -Writes a hiker to its temporary file (see temp_path_for); the temporary file is removed if the hiker
+    can't be written.
+:return temp_path: The path of the temporary file.
+"""
+def write_temp_file(output_path, hiker):
+    temp_path = temp_path_for(output_path)
+    try:
+        with open(temp_path, 'w') as fp:
+            # Validated journal entries are materialized as they are written.
+            json.dump(hiker, fp=fp, default=serialize_validated_entry)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return temp_path
+
+"""
+sync_files -Flushes the contents of the written files to disk (only these files, not every dirty buffer on the
+    machine).
+:param paths: The paths of the files.
+"""
+def sync_files(paths):
+    for path in paths:
+        with open(path, 'rb+') as fp:
+            os.fsync(fp.fileno())
+
+"""
+sync_directory -Flushes a directory's entries (the renames into it) to disk; not supported on every platform.
+"""
+def sync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BatchedHikerWriter(object):
+    """
+    BatchedHikerWriter(object) -Buffers validated hikers and writes them to the validated hikers directory a batch at a
+        time. Every hiker of a batch is written to a temporary file and synced to disk, the files are then renamed into
+        place, and the directory is synced once per batch; a crash or power loss at any point leaves either a hiker's
+        complete json file or no file at all.
+        Batches can be written by a background thread so that validating the next hikers overlaps with the disk I/O of
+        the previous ones.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type BatchedHikerWriter.
+    :param validated_hikers_data_path: The validated hikers directory.
+    :param batch_size: The number of hikers written (and synced) together.
+    :param background: A boolean flag; if True then batches are written by a background thread.
+    :param fsync: A boolean flag; if True then each batch is synced to disk before it is renamed into place.
+    :param max_queued_batches: The number of batches that may wait for the background thread before submit blocks
+        (bounds the memory held by hikers that haven't been written yet).
+    """
+    def __init__(self, validated_hikers_data_path, batch_size=32, background=False, fsync=True, max_queued_batches=4):
+        self.validated_hikers_data_path = validated_hikers_data_path
+        self.batch_size = max(1, batch_size)
+        self.fsync = fsync
+        self.pending = []
+        # The output paths of the hikers whose batch has been written, until they are collected by pop_written.
+        self.written = deque()
+        self.error = None
+        self.queue = None
+        self.thread = None
+        if background:
+            self.queue = queue.Queue(maxsize=max_queued_batches)
+            self.thread = threading.Thread(target=self._run, name="BatchedHikerWriter", daemon=True)
+            self.thread.start()
+
+    """
+    submit -Adds a validated hiker to the current batch. The hiker must not be modified after it is submitted.
+    :param hiker: The hiker object with its journal replaced by the validated journal.
+    :return output_path: The path the hiker will be written to.
+    """
+    def submit(self, hiker):
+        self._raise_error()
+        output_path = validated_hiker_path(self.validated_hikers_data_path, hiker['identifier'])
+        self.pending.append((output_path, hiker))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return output_path
+
+    """
+    flush -Writes the current batch (or hands it to the background thread).
+    """
+    def flush(self):
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []
+        if self.queue is not None:
+            self.queue.put(batch)
+        else:
+            self._write_batch(batch)
+
+    """
+    pop_written -Returns the output paths of every hiker written to disk since the last call.
+    """
+    def pop_written(self):
+        written = []
+        while self.written:
+            written.append(self.written.popleft())
+        return written
+
+    """
+    close -Writes the remaining hikers and stops the background thread.
+    """
+    def close(self):
+        self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                # Once a batch has failed the remaining batches are dropped; the error is raised by submit or close.
+                continue
+            try:
+                self._write_batch(batch)
+            except Exception as error:
+                self.error = error
+
+    def _write_batch(self, batch):
+        with instrumentation.stage('json_write'):
+            temp_paths = []
+            try:
+                for output_path, hiker in batch:
+                    temp_paths.append(write_temp_file(output_path, hiker))
+            except BaseException:
+                # Nothing of a failed batch is renamed into place.
+                for temp_path in temp_paths:
+                    os.remove(temp_path)
+                raise
+            if self.fsync:
+                sync_files(temp_paths)
+            for temp_path, (output_path, hiker) in zip(temp_paths, batch):
+                os.replace(temp_path, output_path)
+            if self.fsync:
+                sync_directory(self.validated_hikers_data_path)
+        instrumentation.count('write_batches')
+        self.written.extend(output_path for output_path, hiker in batch)
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,128 @@
+"""
+Gazetteer.py
+Unified reference set of every validated location a hiker can enter: shelters, hostels, and other places, each tagged
+    with the layer it came from.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+from ResolutionCache import shelter_dataset_checksum
+from ShelterTable import load_shelter_table
+
+# The layers in increasing order of precedence. Matching resolves ties to the last location with the maximum comparison
+# ratio, so a hostel or place that ties with a shelter never wins over the shelter.
+LAYERS = ('place', 'hostel', 'shelter')
+# The CSV file of each layer within the validated shelter data directory. Every file has the newShelters.csv layout
+# (ID,name,data_set,lat,lon,type).
+LAYER_FILENAMES = {
+    'shelter': "newShelters.csv",
+    'hostel': "validated_hostels.csv",
+    'place': "validated_places.csv"
+}
+
+"""
+layer_key -Returns the gazetteer key of a location. Shelters keep their SID, so validated shelters (and every cached
+    resolution) are unchanged by the other layers; hostel and place IDs are prefixed with their layer ("hostel:12").
+"""
+def layer_key(layer, location_id):
+    if layer == 'shelter':
+        return location_id
+    return "%s:%s" % (layer, location_id)
+
+
+class Gazetteer(object):
+    """
+    Gazetteer(object) -The shelters, hostels, and places in a single SID -> location mapping that behaves like the
+        {SID: {'name', 'dataset', 'type', 'lat', 'lon'}} dictionary of shelters, so the ShelterMatcherIndex and
+        ShelterSpatialIndex built over it search every layer in a single pass. Locations are ordered by layer (see
+        LAYERS).
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type Gazetteer.
+    :param validated_shelters: The shelters returned by get_validated_shelters (a ShelterTable or SID -> shelter dict).
+    :param validated_hostels: The hostels returned by get_validated_hostels (None if there are none).
+    :param validated_places: The places returned by get_validated_places (None if there are none).
+    """
+    def __init__(self, validated_shelters, validated_hostels=None, validated_places=None):
+        self.layers = {'shelter': validated_shelters, 'hostel': validated_hostels, 'place': validated_places}
+        self.keys_in_order = []
+        # Gazetteer key -> (layer, the location's ID within its layer).
+        self.location_of_key = {}
+        for layer in LAYERS:
+            locations = self.layers[layer]
+            if locations is None:
+                continue
+            for location_id in locations:
+                key = layer_key(layer, location_id)
+                self.keys_in_order.append(key)
+                self.location_of_key[key] = (layer, location_id)
+
+    """
+    layer_of -Returns the layer ('shelter', 'hostel', or 'place') of the location with the provided key.
+    """
+    def layer_of(self, key):
+        return self.location_of_key[key][0]
+
+    """
+    layer_sizes -Returns the number of locations in each layer.
+    """
+    def layer_sizes(self):
+        return dict((layer, 0 if self.layers[layer] is None else len(self.layers[layer])) for layer in LAYERS)
+
+    def __getitem__(self, key):
+        layer, location_id = self.location_of_key[key]
+        return self.layers[layer][location_id]
+
+    def __contains__(self, key):
+        return key in self.location_of_key
+
+    def __iter__(self):
+        return iter(self.keys_in_order)
+
+    def __len__(self):
+        return len(self.keys_in_order)
+
+    def keys(self):
+        return list(self.keys_in_order)
+
+    def items(self):
+        for layer in LAYERS:
+            locations = self.layers[layer]
+            if locations is None:
+                continue
+            for location_id, location in locations.items():
+                yield (layer_key(layer, location_id), location)
+
+"""
+load_gazetteer -Loads every layer whose CSV file exists in the validated shelter data directory (see LAYER_FILENAMES).
+    Each layer is loaded through its binary copy when it is up to date (see ShelterTable.load_shelter_table).
+:param validated_shelter_data_path: The directory containing newShelters.csv.
+:return gazetteer: The Gazetteer of the shelters and the available hostels and places.
+"""
+def load_gazetteer(validated_shelter_data_path):
+    tables = {}
+    for layer in LAYERS:
+        layer_path = os.path.join(validated_shelter_data_path, LAYER_FILENAMES[layer])
+        if layer == 'shelter' or os.path.exists(layer_path):
+            tables[layer] = load_shelter_table(layer_path)
+    return Gazetteer(tables['shelter'], validated_hostels=tables.get('hostel'), validated_places=tables.get('place'))
+
+"""
+gazetteer_checksum -Returns a checksum of every layer file in the validated shelter data directory. Without hostel or
+    places files it is the checksum of newShelters.csv, so resolutions cached before the other layers existed stay
+    valid.
+:param validated_shelter_data_path: The directory containing newShelters.csv.
+:return checksum: The shelters' checksum (see shelter_dataset_checksum) followed by ":layer=checksum" for each other
+    available layer.
+"""
+def gazetteer_checksum(validated_shelter_data_path):
+    checksum = shelter_dataset_checksum(os.path.join(validated_shelter_data_path, LAYER_FILENAMES['shelter']))
+    for layer in ('hostel', 'place'):
+        layer_path = os.path.join(validated_shelter_data_path, LAYER_FILENAMES[layer])
+        if os.path.exists(layer_path):
+            checksum += ":%s=%s" % (layer, shelter_dataset_checksum(layer_path))
+    return checksum
@@ -6,11 +6,12 @@ Handles the mapping between user entered text and GPS coordinates for shelters.
 """
 
 import os
+import csv
 import json
-from fuzzywuzzy import fuzz
 from collections import OrderedDict
 import numpy as np
 import copy
+from ShelterMatcherIndex import ShelterMatcherIndex
 
 class HikerValidator(object):
     """
@@ -31,6 +32,7 @@ class HikerValidator(object):
     """
     def __init__(self, validated_shelters, validated_hostels, validated_places, statistics=False):
         self.validated_shelters = validated_shelters
+        self.matcher_index = ShelterMatcherIndex(validated_shelters)
         self.validated_hostels = validated_hostels
         self.validated_places = validated_places
         self.storage_location = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/'))
@@ -68,53 +70,14 @@ class HikerValidator(object):
         if unvalidated_start_loc is None and unvalidated_dest is None:
             return (comp_ratios_usl, comp_ratios_ud)
 
-        for shelter_id, shelter_data in self.validated_shelters.items():
-            # Create a comparison ratio for the hiker's entered start_loc and the validated shelter's name.
-            comparison_ratio_usl = fuzz.partial_ratio(unvalidated_start_loc, shelter_data['name'])
-            # Create a comparison ratio for the hiker's entered destination and the validated shelter's name.
-            comparison_ratio_ud = fuzz.partial_ratio(unvalidated_dest, shelter_data['name'])
-
-            # Perform comparison threshold check:
-            if comparison_ratio_usl >= comparison_threshold:
-                # Iterate through the comparison ratios and find the right place to store the comparison ratio.
-                if comparison_ratio_usl >= comp_ratios_usl['third']['comp_ratio']:
-                    if comparison_ratio_usl >= comp_ratios_usl['second']['comp_ratio']:
-                        if comparison_ratio_usl >= comp_ratios_usl['first']['comp_ratio']:
-                            # Comparison ratio is the new first highest.
-                            comp_ratios_usl['first']['assoc_sid'] = shelter_id
-                            comp_ratios_usl['first']['s_name'] = shelter_data['name']
-                            comp_ratios_usl['first']['comp_ratio'] = comparison_ratio_usl
-                        else:
-                            # Comparison ratio is the new second highest.
-                            comp_ratios_usl['second']['assoc_sid'] = shelter_id
-                            comp_ratios_usl['second']['s_name'] = shelter_data['name']
-                            comp_ratios_usl['second']['comp_ratio'] = comparison_ratio_usl
-                    else:
-                        # Comparison ratio is the new third highest.
-                        comp_ratios_usl['third']['assoc_sid'] = shelter_id
-                        comp_ratios_usl['third']['s_name'] = shelter_data['name']
-                        comp_ratios_usl['third']['comp_ratio'] = comparison_ratio_usl
-
-            # Perform comparison threshold check:
-            if comparison_ratio_ud >= comparison_threshold:
-                # Iterate through the comparison ratios and find the right place to store entry.
-                if comparison_ratio_ud >= comp_ratios_ud['third']['comp_ratio']:
-                    if comparison_ratio_ud >= comp_ratios_ud['second']['comp_ratio']:
-                        if comparison_ratio_ud >= comp_ratios_ud['first']['comp_ratio']:
-                            # Comparison ratio is the new first highest.
-                            comp_ratios_ud['first']['assoc_sid'] = shelter_id
-                            comp_ratios_ud['first']['s_name'] = shelter_data['name']
-                            comp_ratios_ud['first']['comp_ratio'] = comparison_ratio_ud
-                        else:
-                            # Comparison ratio is the new second highest.
-                            comp_ratios_ud['second']['assoc_sid'] = shelter_id
-                            comp_ratios_ud['second']['s_name'] = shelter_data['name']
-                            comp_ratios_ud['second']['comp_ratio'] = comparison_ratio_ud
-                    else:
-                        # Comparison ratio is the new third highest.
-                        comp_ratios_ud['third']['assoc_sid'] = shelter_id
-                        comp_ratios_ud['third']['s_name'] = shelter_data['name']
-                        comp_ratios_ud['third']['comp_ratio'] = comparison_ratio_ud
+        # Rank the shelters with a bounded heap; shelters that can't reach the threshold are never scored.
+        for comp_ratios, user_location in ((comp_ratios_usl, unvalidated_start_loc),
+                                           (comp_ratios_ud, unvalidated_dest)):
+            top_three = self.matcher_index.match_topk(user_location, k=3, comparison_threshold=comparison_threshold)
+            for rank, (shelter_id, comparison_ratio) in zip(('first', 'second', 'third'), top_three):
+                comp_ratios[rank]['assoc_sid'] = shelter_id
+                comp_ratios[rank]['s_name'] = self.validated_shelters[shelter_id]['name']
+                comp_ratios[rank]['comp_ratio'] = comparison_ratio
         return (comp_ratios_usl, comp_ratios_ud)
 
     """
@@ -235,10 +198,10 @@ get_validated_shelters -Returns a dictionary of the shelters validated using the
 def get_validated_shelters(validated_shelters_path):
     validated_shelters = {}
     line_num = 0
-    with open(validated_shelters_path, 'r') as fp:
-        for line in iter(fp):
-            if not line_num == 0:
-                split_string = str.split(line, sep=",")
+    with open(validated_shelters_path, 'r', newline='') as fp:
+        # Names may contain commas; csv.writer quotes them (see ShelterMergePipeline.write_outputs).
+        for split_string in csv.reader(fp):
+            if not line_num == 0 and split_string:
                 shelter_id = split_string[0]
                 shelter_name = split_string[1]
                 data_set = split_string[2]
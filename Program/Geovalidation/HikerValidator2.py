@@ -7,15 +7,30 @@ Handles the mapping between user entered text and GPS coordinates for shelters.
 
 import os
 import json
-from fuzzywuzzy import fuzz
-from collections import OrderedDict
-import numpy as np
-import copy
+import time
+import argparse
+import multiprocessing
+from collections import Counter
+from ShelterMatcherIndex import ShelterMatcherIndex
+from NameNormalizer import NORMALIZER_VERSION
+from ResolutionCache import ResolutionCache
+from ValidationManifest import ValidationManifest
+from JournalStream import open_journal_reader, open_journal_writer
+from SpatialIndex import ShelterSpatialIndex
+from ShelterTable import ShelterTable
+from Gazetteer import Gazetteer, load_gazetteer, gazetteer_checksum
+from TrailMileage import load_mileage_index, CENTERLINE_PATH
+from RouteResolver import RouteResolver
+from BatchedHikerWriter import BatchedHikerWriter, validated_hiker_path, write_json_atomically
+from ValidatedHikerStore import ValidatedHikerStore, VALIDATED_HIKERS_DB_FILENAME
+from ValidatedEntry import ValidatedEntry, get_validated_location, serialize_validated_entry
+from Instrumentation import instrumentation
 
 class HikerValidator(object):
     """
     HikerValidator(object) -Wrapper for ShelterValidator, HostelValidator, and GeoValidator. Maps a hiker's entered
-        locations to validated GPS coordinates in the appropriate data sets.
+        locations to validated GPS coordinates in the appropriate data sets. The shelters, hostels, and places are
+        searched together as the layers of a single Gazetteer.
     :Author: Chris Campell
     :Version: 9/14/2016
     """
@@ -28,9 +43,42 @@ class HikerValidator(object):
     :param validated_places: The AT_Places data set loaded into memory from json file.
     :param statistics: A boolean flag; if True then statistics regarding the geocoding success of hiker's journals
         will be recorded.
+    :param matcher_index: An optional ShelterMatcherIndex built from the gazetteer; built here if not provided so that
+        an index can be shared between many validators.
+    :param resolution_cache: An optional ResolutionCache consulted before (and filled after) fuzzy string matching.
+    :param search_radius: An optional distance in miles; if provided, fuzzy string matching of each journal location is
+        first restricted to the shelters within this distance of the hiker's previously resolved location.
+    :param spatial_index: An optional ShelterSpatialIndex built from the gazetteer; built here if a search_radius is
+        provided and no index is.
+    :param top_k: The number of ranked candidate shelters recorded in the geocoding statistics for each journal
+        location (0 to record none). Ranking is opt-in since it is a second search for every unique location.
+    :param top_k_threshold: The comparison threshold of the ranked candidates; lower than the matching threshold so that
+        the near misses of ambiguous and unmapped locations are recorded for review.
+    :param gazetteer: An optional Gazetteer of validated_shelters, validated_hostels, and validated_places; built here
+        if not provided. Locations are mapped to gazetteer keys (a shelter's key is its SID).
+    :param route_resolver: An optional RouteResolver; if provided each journal is resolved as a route along the trail
+        (see RouteResolver) instead of entry by entry. Takes precedence over search_radius.
     """
-    def __init__(self, validated_shelters, validated_hostels, validated_places, statistics=False):
+    def __init__(self, validated_shelters, validated_hostels, validated_places, statistics=False, matcher_index=None,
+                 resolution_cache=None, search_radius=None, spatial_index=None, top_k=0, top_k_threshold=70,
+                 gazetteer=None, route_resolver=None):
         self.validated_shelters = validated_shelters
+        if gazetteer is None:
+            gazetteer = Gazetteer(validated_shelters, validated_hostels, validated_places)
+        self.gazetteer = gazetteer
+        if matcher_index is None:
+            matcher_index = ShelterMatcherIndex(gazetteer)
+        self.matcher_index = matcher_index
+        self.resolution_cache = resolution_cache
+        self.search_radius = search_radius
+        if spatial_index is None and search_radius is not None:
+            spatial_index = ShelterSpatialIndex(gazetteer)
+        self.spatial_index = spatial_index
+        self.route_resolver = route_resolver
+        self.top_k = top_k
+        self.top_k_threshold = top_k_threshold
+        # The ranked candidates of every location seen by the validator (across hikers).
+        self.ranked_locations = {}
         self.validated_hostels = validated_hostels
         self.validated_places = validated_places
         self.storage_location = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/'))
@@ -44,6 +92,9 @@ class HikerValidator(object):
     :param unvalidated_start_loc: The user entered string for their starting location.
     :param unvalidated_dest: The user entered string for their destination location.
     :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param previous_location: An optional (lat, lon) of the hiker's previously resolved location; used to restrict the
+        candidate shelters when the validator has a search_radius (see match_near).
+    :param tier_counts: An optional Counter of the resolution tier of each location (see ShelterMatcherIndex.resolve).
     :returns (comp_ratios_usl, comp_ratios_ud): The top three fuzzy string comparisons greater than the
             comparsion_threshold for both start_location and destination.
         :return comp_ratios_usl: The top three matching shelter strings for start_location as determined by
@@ -51,34 +102,65 @@ class HikerValidator(object):
         :return comp_ratios_ud: The top three matching shelter strings for destination as determined by
                 fuzzy string comparison.
     """
-    def validate_entry_locations(self, unvalidated_start_loc, unvalidated_dest, comparison_threshold=90):
+    def validate_entry_locations(self, unvalidated_start_loc, unvalidated_dest, comparison_threshold=90,
+                                 previous_location=None, tier_counts=None):
         # If the user didn't enter any text then there can be no geovalidation.
         if unvalidated_start_loc is None and unvalidated_dest is None:
             return (None, None)
 
-        max_comp_ratio_usl = -1
-        usl_assoc_sid = None
-        max_comp_ratio_udl = -1
-        udl_assoc_sid = None
-        for shelter_id, shelter_data in self.validated_shelters.items():
-            # Create a comparison ratio for the hiker's entered start_loc and the validated shelter's name.
-            comparison_ratio_usl = fuzz.partial_ratio(unvalidated_start_loc, shelter_data['name'])
-            # Create a comparison ratio for the hiker's entered destination and the validated shelter's name.
-            comparison_ratio_udl = fuzz.partial_ratio(unvalidated_dest, shelter_data['name'])
-
-            # Perform comparison threshold check:
-            if comparison_ratio_usl >= comparison_threshold:
-                if comparison_ratio_usl >= max_comp_ratio_usl:
-                    max_comp_ratio_usl = comparison_ratio_usl
-                    usl_assoc_sid = shelter_id
-
-            # Perform comparison threshold check:
-            if comparison_ratio_udl >= comparison_threshold:
-                if comparison_ratio_udl >= max_comp_ratio_udl:
-                    max_comp_ratio_udl = comparison_ratio_udl
-                    udl_assoc_sid = shelter_id
+        with instrumentation.stage('validate_entry_locations'):
+            # Only the shelters that can reach the comparison threshold are scored (see ShelterMatcherIndex.candidates).
+            usl_assoc_sid = self.match_near(unvalidated_start_loc, comparison_threshold, previous_location, tier_counts)
+            # The hiker's destination is searched for near where they started (if the start location was resolved).
+            if usl_assoc_sid is not None:
+                previous_location = (self.gazetteer[usl_assoc_sid]['lat'], self.gazetteer[usl_assoc_sid]['lon'])
+            udl_assoc_sid = self.match_near(unvalidated_dest, comparison_threshold, previous_location, tier_counts)
         return (usl_assoc_sid, udl_assoc_sid)
 
+    """
+    match_near -Maps a user entered location to a shelter, preferring the shelters near a previously resolved location.
+        If the validator has a search_radius and a near_location is provided, only the shelters within search_radius
+        miles of near_location are considered first; if none of them match, every shelter is considered.
+    :param user_location: The user entered string.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param near_location: An optional (lat, lon) of the hiker's previously resolved location.
+    :param tier_counts: An optional Counter that the tier which resolved the location is counted in (a missing location
+        isn't counted).
+    :return assoc_sid: The SID of the best matching shelter (None if no shelter matched).
+    """
+    def match_near(self, user_location, comparison_threshold, near_location=None, tier_counts=None):
+        assoc_sid = None
+        if near_location is not None and self.search_radius is not None:
+            nearby_sids = self.spatial_index.sids_within(near_location[0], near_location[1], self.search_radius)
+            assoc_sid, comp_ratio, tier = self.matcher_index.resolve(
+                user_location, comparison_threshold=comparison_threshold, allowed_sids=nearby_sids)
+        if assoc_sid is None:
+            assoc_sid, comp_ratio, tier = self.matcher_index.resolve(
+                user_location, comparison_threshold=comparison_threshold)
+        if tier_counts is not None and user_location is not None:
+            tier_counts[tier] += 1
+        return assoc_sid
+
+    """
+    resolve_entries_near_previous -Resolves journal entries in order, restricting each entry's candidate shelters to
+        those near the hiker's previously resolved location (see match_near).
+    :param journal_entries: An iterable of (entry_num, entry) pairs in journal order.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param tier_counts: An optional Counter of the resolution tier of each location.
+    :return: A generator of (entry_num, entry, usl_assoc_sid, udl_assoc_sid) tuples.
+    """
+    def resolve_entries_near_previous(self, journal_entries, comparison_threshold=90, tier_counts=None):
+        previous_location = None
+        for entry_num, entry in journal_entries:
+            usl_assoc_sid, udl_assoc_sid = self.validate_entry_locations(
+                entry['start_loc'], entry['dest'], comparison_threshold=comparison_threshold,
+                previous_location=previous_location, tier_counts=tier_counts)
+            # The hiker was last seen at their destination (or their start location if the destination is unknown).
+            for assoc_sid in (usl_assoc_sid, udl_assoc_sid):
+                if assoc_sid is not None:
+                    previous_location = (self.gazetteer[assoc_sid]['lat'], self.gazetteer[assoc_sid]['lon'])
+            yield (entry_num, entry, usl_assoc_sid, udl_assoc_sid)
+
     """
     validate_entry -Maps an unvalidated hiker's trail journal entry to a validated entry in one of the data sets.
     :param user_start_loc: The start location from the trail journal entry to be mapped to a GPS location.
@@ -86,43 +168,87 @@ class HikerValidator(object):
     :returns (validated_entry, comp_ratios_start_loc, comp_ratios_dest_loc):
         :return validated_entry: The now mapped/validated user_start_location and user_destination_location; returns
             None for key 'start_loc' if not mappable, and None for key 'dest' if not mappable.
-        :return comp_ratios_start_loc: The top three results and their associated comparision ratios from the geocoding
-            fuzzy string comparision process for the user's starting location.
-        :return comp_ratios_dest_loc: The top three results and their associated comparision ratios fromt he geocoding
-            fuzzy string comparison process for the user's destination location.
+        :return comp_ratios_start_loc: The top three (SID, comparison ratio) results from the geocoding fuzzy string
+            comparision process for the user's starting location (see ShelterMatcherIndex.match_topk_batch).
+        :return comp_ratios_dest_loc: The top three (SID, comparison ratio) results from the geocoding fuzzy string
+            comparison process for the user's destination location.
     """
     def validate_entry(self, user_start_loc, user_dest_loc, comparison_threshold=90):
         validated_entry = {}
         # Get the three best results for geocoded solutions for both start_loc and destination.
-        usl_assoc_sid, udl_assoc_sid = self.validate_entry_locations(
-            unvalidated_start_loc=user_start_loc, unvalidated_dest=user_dest_loc, comparison_threshold=comparison_threshold)
-
-        # Determine if geovalidation was successful for the start_location
-        if usl_assoc_sid is not None and usl_assoc_sid != -1:
-            validated_entry['start_loc'] = {
-                'shelter_name': self.validated_shelters[usl_assoc_sid]['name'],
-                'SID': usl_assoc_sid,
-                'lat': self.validated_shelters[usl_assoc_sid]['lat'],
-                'lon': self.validated_shelters[usl_assoc_sid]['lon'],
-                'type': self.validated_shelters[usl_assoc_sid]['type']
-            }
-        else:
-            # Geovalidation for the provided start_location was unsuccessful.
-            validated_entry['start_loc'] = None
-
-        # Determine if geovalidation was successful for the destination.
-        if udl_assoc_sid is not None and udl_assoc_sid != -1:
-            validated_entry['dest'] = {
-                'shelter_name': self.validated_shelters[udl_assoc_sid]['name'],
-                'SID': udl_assoc_sid,
-                'lat': self.validated_shelters[udl_assoc_sid]['lat'],
-                'lon': self.validated_shelters[udl_assoc_sid]['lon'],
-                'type': self.validated_shelters[udl_assoc_sid]['type']
-            }
-        else:
-            # Geovalidation for the provided dest_location was unsuccessful.
-            validated_entry['dest'] = None
-        return validated_entry
+        comp_ratios_start_loc, comp_ratios_dest_loc = self.matcher_index.match_topk_batch(
+            [user_start_loc, user_dest_loc], k=3, comparison_threshold=comparison_threshold)
+
+        # Determine if geovalidation was successful for the start_location (None if it was not).
+        validated_entry['start_loc'] = self.get_validated_location(
+            comp_ratios_start_loc[0][0] if comp_ratios_start_loc else None)
+        # Determine if geovalidation was successful for the destination (None if it was not).
+        validated_entry['dest'] = self.get_validated_location(
+            comp_ratios_dest_loc[0][0] if comp_ratios_dest_loc else None)
+        return (validated_entry, comp_ratios_start_loc, comp_ratios_dest_loc)
+
+    """
+    get_validated_location -Builds the validated location stored in a validated journal entry for the provided shelter.
+    :param assoc_sid: The SID of the shelter the user entered location was mapped to.
+    :return validated_location: The shelter's name, SID, lat, lon, and type; None if the location wasn't mapped.
+    """
+    def get_validated_location(self, assoc_sid):
+        return get_validated_location(self.gazetteer, assoc_sid)
+
+    """
+    validate_entries_batch -Maps many user entered location strings to shelters in one pass. The strings are
+        deduplicated first (hiker journals repeat the same place names constantly) and the unique strings are scored
+        against the shelter names with a single score matrix (see ShelterMatcherIndex.best_matches).
+    :param strings: An iterable of user entered start_loc/dest strings; may span many journals or hikers.
+    :param threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param tier_counts: An optional Counter that the tier which resolved each (non-missing) string is counted in, once
+        per string: 'cache' for ResolutionCache hits, otherwise the ShelterMatcherIndex tier (see
+        ShelterMatcherIndex.resolve).
+    :param journal_tiers: An optional dictionary of string -> tier shared by the calls that validate a single journal; a
+        string that repeats within the journal is counted under the tier of its first occurrence, so a journal validated
+        an entry at a time is counted the same as a journal validated in one call.
+    :return assoc_sids: A list parallel to strings of the SID each string was mapped to (None if it wasn't mappable).
+    """
+    def validate_entries_batch(self, strings, threshold=90, tier_counts=None, journal_tiers=None):
+        strings = list(strings)
+        # Map each unique string to its position in the score matrix.
+        unique_positions = {}
+        for string in strings:
+            if string not in unique_positions:
+                unique_positions[string] = len(unique_positions)
+        unique_sids = [None] * len(unique_positions)
+        unique_tiers = [None] * len(unique_positions)
+        unresolved = []
+        for string, position in unique_positions.items():
+            if self.resolution_cache is not None:
+                cached_sid = self.resolution_cache.get(string, threshold)
+                if cached_sid is not ResolutionCache.MISS:
+                    unique_sids[position] = cached_sid
+                    unique_tiers[position] = 'cache'
+                    continue
+            unresolved.append(string)
+        instrumentation.count('unique_locations', len(unique_positions))
+        if self.resolution_cache is not None:
+            instrumentation.count('cache_hits', len(unique_positions) - len(unresolved))
+            instrumentation.count('cache_misses', len(unresolved))
+        # Only the strings that have never been resolved before go through fuzzy string matching.
+        resolved_tiers = []
+        with instrumentation.stage('fuzzy_match'):
+            resolved_sids = self.matcher_index.best_matches(unresolved, comparison_threshold=threshold,
+                                                            tiers=resolved_tiers)
+        for string, assoc_sid, tier in zip(unresolved, resolved_sids, resolved_tiers):
+            unique_sids[unique_positions[string]] = assoc_sid
+            unique_tiers[unique_positions[string]] = tier
+        if self.resolution_cache is not None and unresolved:
+            self.resolution_cache.put_many(dict(zip(unresolved, resolved_sids)), threshold)
+        if tier_counts is not None:
+            # Every location is counted, not every unique string, so the counts don't depend on how strings are batched.
+            journal_tiers = {} if journal_tiers is None else journal_tiers
+            for string in strings:
+                if string is not None:
+                    tier_counts[journal_tiers.setdefault(string, unique_tiers[unique_positions[string]])] += 1
+        # Scatter the results for the unique strings back to every string.
+        return [unique_sids[unique_positions[string]] for string in strings]
 
     """
     validate_shelters -Goes through the hiker's journal entries: geocoding each starting location and destination. If
@@ -135,92 +261,331 @@ class HikerValidator(object):
         unvalidated_journal = hiker['journal']
         validated_journal = {}
 
-        for entry_num, entry in unvalidated_journal.items():
-            validated_entry = self.validate_entry(
-                user_start_loc=entry['start_loc'], user_dest_loc=entry['dest'], comparison_threshold=90)
+        tier_counts = Counter() if self.stats else None
+        if self.route_resolver is not None:
+            resolved_entries = self.route_resolver.resolve_journal(unvalidated_journal.items(), tier_counts=tier_counts)
+        elif self.search_radius is not None:
+            # Each entry's candidates depend on where the hiker was previously, so resolve the entries in order.
+            resolved_entries = self.resolve_entries_near_previous(unvalidated_journal.items(), comparison_threshold=90,
+                                                                  tier_counts=tier_counts)
+        else:
+            # Geocode every start_loc and dest in the journal with one batched pass.
+            user_locations = []
+            for entry_num, entry in unvalidated_journal.items():
+                user_locations.append(entry['start_loc'])
+                user_locations.append(entry['dest'])
+            assoc_sids = self.validate_entries_batch(user_locations, threshold=90, tier_counts=tier_counts)
+            resolved_entries = (
+                (entry_num, entry, assoc_sids[2 * entry_position], assoc_sids[2 * entry_position + 1])
+                for entry_position, (entry_num, entry) in enumerate(unvalidated_journal.items()))
+        top_k_matches = {} if self.stats and self.top_k > 0 else None
+        if top_k_matches is not None:
+            # Rank every location of the journal in one batch (see rank_locations).
+            self.rank_locations(user_location for entry in unvalidated_journal.values()
+                                for user_location in (entry['start_loc'], entry['dest']))
+        with instrumentation.stage('validate_shelters'):
+            for entry_num, validated_entry in self.validate_journal_entries(
+                    resolved_entries, failed_mappings_start_loc, failed_mappings_dest_loc, top_k_matches):
+                validated_journal[entry_num] = validated_entry
+        instrumentation.count('journal_entries', len(validated_journal))
+
+        geocode_stats = self.get_geocode_stats(hiker['identifier'], failed_mappings_start_loc,
+                                               failed_mappings_dest_loc, len(validated_journal), top_k_matches,
+                                               tier_counts)
+        return (validated_journal, geocode_stats)
 
-            validated_journal[entry_num] = copy.deepcopy(entry)
-            if validated_entry['start_loc'] is None:
+    """
+    validate_shelters_stream -Streaming counterpart of validate_shelters; geocodes and yields one journal entry at a
+        time so that only the current entry needs to be held in memory.
+    :param journal_entries: An iterable of (entry_num, entry) pairs (see JournalStream.JournalReader).
+    :param failed_mappings_start_loc: A dictionary that the unmappable start locations are recorded in.
+    :param failed_mappings_dest_loc: A dictionary that the unmappable destinations are recorded in.
+    :param top_k_matches: An optional dictionary that the ranked candidates of each entry are recorded in.
+    :param tier_counts: An optional Counter of the resolution tier of each location (see validate_entries_batch).
+    :return: A generator of (entry_num, validated_entry) pairs.
+    """
+    def validate_shelters_stream(self, journal_entries, failed_mappings_start_loc, failed_mappings_dest_loc,
+                                 top_k_matches=None, tier_counts=None):
+        if self.route_resolver is not None:
+            # The route is decoded a window of entries at a time (see RouteResolver).
+            resolved_entries = self.route_resolver.resolve_journal(journal_entries, tier_counts=tier_counts)
+        elif self.search_radius is not None:
+            resolved_entries = self.resolve_entries_near_previous(journal_entries, comparison_threshold=90,
+                                                                  tier_counts=tier_counts)
+        else:
+            # Repeated strings are counted as they are in validate_shelters (see validate_entries_batch).
+            journal_tiers = {}
+            resolved_entries = (
+                (entry_num, entry) + tuple(self.validate_entries_batch([entry['start_loc'], entry['dest']],
+                                                                       threshold=90, tier_counts=tier_counts,
+                                                                       journal_tiers=journal_tiers))
+                for entry_num, entry in journal_entries)
+        return self.validate_journal_entries(resolved_entries, failed_mappings_start_loc, failed_mappings_dest_loc,
+                                             top_k_matches)
+
+    """
+    validate_journal_entries -Pairs each journal entry with the validated locations its user entered start_loc and dest
+        were mapped to, recording the locations that couldn't be mapped. The validated entries reference the original
+        entries rather than copying them (see ValidatedEntry).
+    :param resolved_entries: An iterable of (entry_num, entry, usl_assoc_sid, udl_assoc_sid) tuples.
+    :param failed_mappings_start_loc: A dictionary that the unmappable start locations are recorded in.
+    :param failed_mappings_dest_loc: A dictionary that the unmappable destinations are recorded in.
+    :param top_k_matches: An optional dictionary that the ranked candidates (see ShelterMatcherIndex.match_topk) of each
+        entry's start_loc and dest are recorded in.
+    :return: A generator of (entry_num, validated_entry) pairs.
+    """
+    def validate_journal_entries(self, resolved_entries, failed_mappings_start_loc, failed_mappings_dest_loc,
+                                 top_k_matches=None):
+        for entry_num, entry, usl_assoc_sid, udl_assoc_sid in resolved_entries:
+            if usl_assoc_sid is None:
                 # The user entered start_location could not be mapped.
                 # TODO: Record any other information that may be pertinent to analyzing Fuzzy string comparison.
                 failed_mappings_start_loc[entry_num] = {
                     'start_loc': entry['start_loc']
                 }
-                validated_journal[entry_num]['start_loc'] = None
-            else:
-                # The user entered start_location was mapped.
-                validated_journal[entry_num]['start_loc'] = validated_entry['start_loc']
-
-            if validated_entry['dest'] is None:
+            if udl_assoc_sid is None:
                 # The user entered destination location could not be mapped.
                 # TODO: Record any other information that may be pertinent to analyzing Fuzzy string comparison.
                 failed_mappings_dest_loc[entry_num] = {
                     'dest': entry['dest']
                 }
-                validated_journal[entry_num]['dest'] = None
-            else:
-                # The user entered destination location was mapped.
-                validated_journal[entry_num]['dest'] = validated_entry['dest']
+            if top_k_matches is not None:
+                start_matches, dest_matches = self.rank_locations((entry['start_loc'], entry['dest']))
+                top_k_matches[entry_num] = {
+                    'start_loc': start_matches,
+                    'dest': dest_matches
+                }
+            yield (entry_num, ValidatedEntry(entry, usl_assoc_sid, udl_assoc_sid, self.gazetteer))
+
+    """
+    rank_locations -Returns the ranked candidates of user entered locations (see ShelterMatcherIndex.match_topk_batch).
+        Journals repeat the same locations, so each location is only ranked once by the validator.
+    :param user_locations: An iterable of user entered strings.
+    :return matches: A list parallel to user_locations of at most top_k (SID, comparison ratio) pairs at
+        top_k_threshold, best match first.
+    """
+    def rank_locations(self, user_locations):
+        user_locations = list(user_locations)
+        unranked = list(dict.fromkeys(user_location for user_location in user_locations
+                                      if user_location not in self.ranked_locations))
+        if unranked:
+            self.ranked_locations.update(zip(unranked, self.matcher_index.match_topk_batch(
+                unranked, k=self.top_k, comparison_threshold=self.top_k_threshold)))
+        return [self.ranked_locations[user_location] for user_location in user_locations]
 
+    """
+    get_geocode_stats -Builds the geocoding statistics of a validated hiker (None if self.stats is False).
+    :param hiker_id: The hiker's identifier.
+    :param failed_mappings_start_loc: The start locations that couldn't be mapped.
+    :param failed_mappings_dest_loc: The destinations that couldn't be mapped.
+    :param num_validated: The number of journal entries in the validated journal.
+    :param top_k_matches: The ranked candidates of each journal entry (see validate_journal_entries), if recorded.
+    :param tier_counts: The number of locations resolved by each tier (see validate_entries_batch), if recorded.
+    """
+    def get_geocode_stats(self, hiker_id, failed_mappings_start_loc, failed_mappings_dest_loc, num_validated,
+                          top_k_matches=None, tier_counts=None):
         if self.stats:
             # TODO: Compute additional hiker statistics.
             geocode_stats = {
-                'hiker_id': hiker['identifier'],
+                'hiker_id': hiker_id,
                 'USLS': failed_mappings_start_loc,
                 'UDLS': failed_mappings_dest_loc,
                 'num_unvalidated': len(failed_mappings_start_loc) + len(failed_mappings_dest_loc),
-                'num_validated': len(validated_journal),
+                'num_validated': num_validated,
+                'top_k': top_k_matches,
+                'resolution_tiers': None if tier_counts is None else dict(tier_counts)
             }
         else:
             geocode_stats = None
-        return (validated_journal, geocode_stats)
+        return geocode_stats
 
     """
-    write_validated_hiker -Writes a geocoded hiker to the specified storage directory in json format.
+    write_validated_hiker -Writes a geocoded hiker to the specified storage directory in json format. The hiker is
+        written to a temporary file which is then renamed into place, so an interrupted process never leaves a truncated
+        json file behind. The file isn't synced to disk, so a power loss may still leave an empty one (see
+        BatchedHikerWriter to batch the writes and sync each batch).
     :param hiker -The deserialized hiker object read from the json file and mapped.
+    :return output_path -The path the hiker was written to.
     """
     def write_validated_hiker(self, hiker):
-        validated_hikers_data_path = self.storage_location + "/HikerData/ValidatedHikers/"
+        validated_hikers_data_path = os.path.join(self.storage_location, "HikerData", "ValidatedHikers")
         # validated_hikers_data_path = "C:/Users/Chris/Documents/GitHub/AppalachianTrailGuide/Data/HikerData/ValidatedHikers"
-        hiker_id = hiker['identifier']
-        with open(validated_hikers_data_path + str(hiker_id) + ".json", 'w') as fp:
-            json.dump(hiker, fp=fp)
+        output_path = validated_hiker_path(validated_hikers_data_path, hiker['identifier'])
+        with instrumentation.stage('json_write'):
+            write_json_atomically(output_path, hiker)
+        return output_path
 
 """
-get_validated_shelters -Returns a dictionary of the shelters validated using the combined TNL and ATC data sets.
+get_validated_shelters -Returns the shelters validated using the combined TNL and ATC data sets.
 @param validated_shelters_path -The path to the CSV file containing the validated shelters.
-@return validated_shelters -A dictionary containing the geocoded shelters.
+@return validated_shelters -A ShelterTable containing the geocoded shelters; it can be indexed like the
+    {SID: {'name', 'dataset', 'type', 'lat', 'lon'}} dictionary this function used to return.
 """
 def get_validated_shelters(validated_shelters_path):
-    validated_shelters = {}
-    line_num = 0
-    with open(validated_shelters_path, 'r') as fp:
-        for line in iter(fp):
-            if not line_num == 0:
-                split_string = str.split(line, sep=",")
-                shelter_id = split_string[0]
-                shelter_name = split_string[1]
-                data_set = split_string[2]
-                lat = float(split_string[3])
-                lon = float(split_string[4])
-                type = split_string[5]
-                validated_shelters[shelter_id] = {
-                    'name': shelter_name, 'dataset': data_set,
-                    'type': type, 'lat': lat, 'lon': lon
-                }
-            line_num += 1
-    return validated_shelters
+    return ShelterTable.from_csv(validated_shelters_path)
 
 """
+get_validated_hostels -Returns the validated hostels.
+@param validated_hostels_path -The path to the CSV file containing the validated hostels (in the newShelters.csv
+    layout: HID,name,data_set,lat,lon,type).
+@return validated_hostels -A ShelterTable containing the geocoded hostels, indexed by HID.
 """
 def get_validated_hostels(validated_hostels_path):
-    pass
+    return ShelterTable.from_csv(validated_hostels_path)
 
 """
+get_validated_places -Returns the validated places that are not recognized shelters or hostels (towns, road crossings,
+    summits, ...).
+@param validated_places_path -The path to the CSV file containing the validated places (in the newShelters.csv layout:
+    PID,name,data_set,lat,lon,type).
+@return validated_places -A ShelterTable containing the geocoded places, indexed by PID.
 """
 def get_validated_places(validated_places_path):
-    pass
+    return ShelterTable.from_csv(validated_places_path)
+
+class ValidationSession(object):
+    """
+    ValidationSession(object) -Long-lived owner of the reference data used during hiker validation. The shelter, hostel,
+        and places data sets are parsed once into a Gazetteer, along with every index derived from it, and then reused
+        to validate any number of hikers.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
 
+    """
+    __init__ -Constructor for objects of type ValidationSession.
+    :param validated_shelter_data_path: The directory containing newShelters.csv (and validated_hostels.csv and
+        validated_places.csv, if they are available).
+    :param statistics: A boolean flag; if True then geocoding statistics are recorded for every validated hiker.
+    :param use_cache: A boolean flag; if True then resolutions are memoized in the on-disk ResolutionCache.
+    :param search_radius: An optional distance in miles used to restrict matching to the shelters near the hiker's
+        previously resolved location (see HikerValidator.match_near).
+    :param route_aware: A boolean flag; if True then every location is placed on the trail centerline and journals are
+        resolved as routes (see RouteResolver).
+    :param centerline_path: The centerline CSV file used when route_aware is True.
+    :param output_format: 'json' to write each validated hiker to its own json file, or 'sqlite' to write every
+        validated hiker as rows of the ValidatedHikerStore in the HikerData directory.
+    :param write_batch_size: An optional number of json files written (and synced to disk) together by a
+        BatchedHikerWriter; if None then each hiker is written as soon as it is validated.
+    :param background_writes: A boolean flag; if True then the BatchedHikerWriter writes on a background thread.
+    :param top_k: The number of ranked candidate shelters recorded for each journal location in the geocoding
+        statistics (see HikerValidator).
+    """
+    def __init__(self, validated_shelter_data_path, statistics=False, use_cache=True, search_radius=None,
+                 route_aware=False, centerline_path=CENTERLINE_PATH, output_format='json', write_batch_size=None,
+                 background_writes=False, top_k=0):
+        # Load the validated AT shelters, hostels, and places into memory (from the binary copies of the CSV files when
+        # they are up to date):
+        with instrumentation.stage('load_shelters'):
+            self.gazetteer = load_gazetteer(validated_shelter_data_path)
+        self.validated_shelters = self.gazetteer.layers['shelter']
+        self.validated_hostels = self.gazetteer.layers['hostel']
+        self.validated_places = self.gazetteer.layers['place']
+        # A single index over every layer, so each location is matched against shelters, hostels, and places at once.
+        with instrumentation.stage('build_indexes'):
+            self.matcher_index = ShelterMatcherIndex(self.gazetteer)
+            self.spatial_index = None
+            if search_radius is not None:
+                self.spatial_index = ShelterSpatialIndex(self.gazetteer)
+            self.mileage_index = None
+            self.route_resolver = None
+            if route_aware:
+                # The trail miles of the locations are read from their lookup file (built on first use).
+                self.mileage_index = load_mileage_index(validated_shelter_data_path, centerline_path,
+                                                        gazetteer=self.gazetteer)
+                self.route_resolver = RouteResolver(self.matcher_index, self.mileage_index)
+        self.resolution_cache = None
+        if use_cache:
+            # Resolutions made with a different name normalization are stale even if the shelters haven't changed.
+            self.resolution_cache = ResolutionCache(
+                cache_path=validated_shelter_data_path + "/resolution_cache.sqlite",
+                dataset_checksum="%s:normalizer=%d" % (gazetteer_checksum(validated_shelter_data_path),
+                                                       NORMALIZER_VERSION))
+            # Every string resolved by a previous run is an alias of its shelter.
+            self.matcher_index.learn_resolutions(self.resolution_cache.successful_resolutions())
+        self.validator = HikerValidator(validated_shelters=self.validated_shelters,
+                                        validated_hostels=self.validated_hostels,
+                                        validated_places=self.validated_places, statistics=statistics,
+                                        matcher_index=self.matcher_index, resolution_cache=self.resolution_cache,
+                                        search_radius=search_radius, spatial_index=self.spatial_index,
+                                        gazetteer=self.gazetteer, route_resolver=self.route_resolver, top_k=top_k)
+        self.output_store = None
+        if output_format == 'sqlite':
+            self.output_store = ValidatedHikerStore(
+                self.validator.storage_location + "/HikerData/" + VALIDATED_HIKERS_DB_FILENAME)
+            # The locations are stored once and joined to the entries by SID.
+            self.output_store.write_locations(self.gazetteer)
+        self.hiker_writer = None
+        if self.output_store is None and (write_batch_size is not None or background_writes):
+            self.hiker_writer = BatchedHikerWriter(
+                os.path.join(self.validator.storage_location, "HikerData", "ValidatedHikers"),
+                batch_size=write_batch_size or 1, background=background_writes)
+
+    """
+    validate -Validates a single hiker against the session's reference data.
+    :param hiker: The deserialized hiker object read from the json file.
+    :returns (validated_journal, geovalidation_stats): See HikerValidator.validate_shelters.
+    """
+    def validate(self, hiker):
+        return self.validator.validate_shelters(hiker)
+
+    """
+    validate_many -Validates every hiker produced by the provided iterable.
+    :param hikers: An iterable of deserialized hiker objects.
+    :return: A generator of (hiker, validated_journal, geovalidation_stats) tuples.
+    """
+    def validate_many(self, hikers):
+        for hiker in hikers:
+            validated_journal, geovalidation_stats = self.validate(hiker)
+            yield (hiker, validated_journal, geovalidation_stats)
+
+    """
+    validate_stream -Validates a stream of journal entries (see HikerValidator.validate_shelters_stream).
+    """
+    def validate_stream(self, journal_entries, failed_mappings_start_loc, failed_mappings_dest_loc, top_k_matches=None,
+                        tier_counts=None):
+        return self.validator.validate_shelters_stream(
+            journal_entries, failed_mappings_start_loc, failed_mappings_dest_loc, top_k_matches, tier_counts)
+
+    """
+    write_validated_hiker -Writes a geocoded hiker to the validated hikers directory (see HikerValidator), or to the
+        output store if the session writes sqlite output. With a BatchedHikerWriter the hiker is only queued for
+        writing; see pop_written.
+    :param filename: The name of the unvalidated file the hiker was read from.
+    """
+    def write_validated_hiker(self, hiker, filename=None):
+        if self.output_store is not None:
+            return self.output_store.write_hiker(hiker, filename)
+        if self.hiker_writer is not None:
+            return self.hiker_writer.submit(hiker)
+        return self.validator.write_validated_hiker(hiker)
+
+    """
+    pop_written -Returns the output paths of the hikers queued by write_validated_hiker that have since been written to
+        disk (None if hikers are written as soon as they are validated).
+    """
+    def pop_written(self):
+        if self.hiker_writer is None:
+            return None
+        return self.hiker_writer.pop_written()
+
+    def close(self):
+        if self.hiker_writer is not None:
+            self.hiker_writer.close()
+        if self.resolution_cache is not None:
+            self.resolution_cache.close()
+        if self.output_store is not None:
+            self.output_store.close()
+
+"""
+compute_geocoding_stats -Aggregates the geocoding statistics of every validated hiker.
+:param validated_journals: A dictionary of hiker identifier -> validated journal.
+:param geocoding_statistics: A dictionary of hiker identifier -> geocoding statistics (see get_geocode_stats), or None.
+:return statistics: The number of valid and unvalid locations, the frequency of each unmappable location, and the
+    number (and rate) of locations resolved by each tier. The tier counts are counted once per location in every mode,
+    but aren't deterministic across runs with workers: which tier resolves a location depends on the strings the
+    resolving process had resolved before it (its ResolutionCache and learned aliases).
+"""
 def compute_geocoding_stats(validated_journals, geocoding_statistics):
     statistics = {
         'num_valid_sl': 0,
@@ -228,7 +593,9 @@ def compute_geocoding_stats(validated_journals, geocoding_statistics):
         'frequency_usl': {},
         'num_valid_udl': 0,
         'num_unvalid_udl': 0,
-        'frequency_udl': {}
+        'frequency_udl': {},
+        'resolution_tiers': {},
+        'resolution_tier_rates': {}
     }
 
     for hiker_id, journal in validated_journals.items():
@@ -239,6 +606,8 @@ def compute_geocoding_stats(validated_journals, geocoding_statistics):
                 statistics['num_valid_udl'] += 1
     if geocoding_statistics is not None:
         for hiker_id,geo_stats in geocoding_statistics.items():
+            for tier, num_resolved in (geo_stats.get('resolution_tiers') or {}).items():
+                statistics['resolution_tiers'][tier] = statistics['resolution_tiers'].get(tier, 0) + num_resolved
             if geo_stats['UDLS']:
                 for entry_num,USL in geo_stats['USLS'].items():
                     if USL['start_loc'] not in statistics['frequency_usl']:
@@ -255,13 +624,217 @@ def compute_geocoding_stats(validated_journals, geocoding_statistics):
                 statistics['num_unvalid_udl'] += len(geo_stats['UDLS'])
             else:
                 pass
+    # The fraction of the (per hiker unique) locations resolved by each tier.
+    num_resolved = sum(statistics['resolution_tiers'].values())
+    for tier, num_resolved_by_tier in statistics['resolution_tiers'].items():
+        statistics['resolution_tier_rates'][tier] = num_resolved_by_tier / float(num_resolved)
     return statistics
 
+"""
+validate_hiker_file -Loads a single unvalidated hiker, validates their journal, and writes the hiker to the validated
+    hikers directory if any journal entries were validated.
+:param session: The ValidationSession used to validate the hiker.
+:param unvalidated_hikers_data_path: The directory containing the unvalidated hiker json files.
+:param filename: The name of the hiker's json file.
+:returns (hiker_id, validated_journal, geovalidation_stats, output_path): The hiker's identifier, validated journal,
+    geocoding statistics (None if the session isn't recording statistics), and the path the validated hiker was written
+    to (None if nothing was written).
+"""
+def validate_hiker_file(session, unvalidated_hikers_data_path, filename):
+    # Load the unvalidated json file into memory.
+    with instrumentation.stage('json_load'), open(unvalidated_hikers_data_path + "/" + filename, 'r') as fp:
+        hiker = json.load(fp=fp)
+    # Execute shelter validation.
+    validated_journal, geovalidation_stats = session.validate(hiker)
+    # If there are any successfully mapped journal entries, write them to validated hikers.
+    output_path = None
+    if len(validated_journal) > 0:
+        hiker['journal'] = validated_journal
+        output_path = session.write_validated_hiker(hiker, filename)
+    return (hiker['identifier'], validated_journal, geovalidation_stats, output_path)
+
+"""
+validate_hiker_file_streaming -Streaming counterpart of validate_hiker_file. The hiker file is read a journal entry at
+    a time and each validated entry is written out as soon as it is produced, so peak memory is bounded by a single
+    journal entry rather than the whole journal. Files ending in .jsonl are read and written in the json-lines journal
+    format (see JournalStream).
+:param session: The ValidationSession used to validate the hiker.
+:param unvalidated_hikers_data_path: The directory containing the unvalidated hiker json files.
+:param filename: The name of the hiker's json file.
+:returns (hiker_id, journal_summary, geovalidation_stats, output_path): As validate_hiker_file, except the validated
+    journal is summarized as {entry_num: {'start_loc': SID, 'dest': SID}} (None for unmapped locations).
+"""
+def validate_hiker_file_streaming(session, unvalidated_hikers_data_path, filename):
+    validated_hikers_data_path = session.validator.storage_location + "/HikerData/ValidatedHikers/"
+    # The hiker's identifier may follow the journal, so write to a temporary file and rename it once it is known. As
+    # with write_validated_hiker the rename protects against the process crashing, not against a power loss.
+    temp_path = validated_hikers_data_path + filename + ".partial"
+    failed_mappings_start_loc = {}
+    failed_mappings_dest_loc = {}
+    top_k_matches = {} if session.validator.stats and session.validator.top_k > 0 else None
+    tier_counts = Counter() if session.validator.stats else None
+    journal_summary = {}
+    hiker_id = None
+
+    def summarize(validated_entries):
+        for entry_num, validated_entry in validated_entries:
+            journal_summary[entry_num] = {
+                'start_loc': validated_entry.start_sid,
+                'dest': validated_entry.dest_sid
+            }
+            yield (entry_num, validated_entry)
+
+    def copy_hiker(in_fp, writer):
+        nonlocal hiker_id
+        reader = open_journal_reader(in_fp, filename)
+        for key, value in reader.items():
+            if key == 'journal':
+                writer.write_journal(summarize(session.validate_stream(
+                    value, failed_mappings_start_loc, failed_mappings_dest_loc, top_k_matches, tier_counts)))
+            else:
+                if key == 'identifier':
+                    hiker_id = value
+                writer.write_field(key, value)
+
+    # Reading, validating, and writing are interleaved, so the whole hiker is timed as a single stage.
+    output_path = None
+    with instrumentation.stage('validate_hiker_streaming'), \
+            open(unvalidated_hikers_data_path + "/" + filename, 'r') as in_fp:
+        if session.output_store is not None:
+            # The store's writer only commits the hiker's rows once it is closed (nothing if no entry was validated).
+            writer = session.output_store.open_writer(filename)
+            copy_hiker(in_fp, writer)
+            writer.close()
+            if len(journal_summary) > 0:
+                output_path = session.output_store.db_path
+        else:
+            with open(temp_path, 'w') as out_fp:
+                writer = open_journal_writer(out_fp, filename, default=serialize_validated_entry)
+                copy_hiker(in_fp, writer)
+                writer.close()
+
+    # If there are any successfully mapped journal entries, keep them in validated hikers.
+    if session.output_store is None:
+        if len(journal_summary) > 0:
+            output_path = validated_hiker_path(validated_hikers_data_path, hiker_id, os.path.splitext(filename)[1])
+            os.replace(temp_path, output_path)
+        else:
+            os.remove(temp_path)
+    geovalidation_stats = session.validator.get_geocode_stats(
+        hiker_id, failed_mappings_start_loc, failed_mappings_dest_loc, len(journal_summary), top_k_matches,
+        tier_counts)
+    return (hiker_id, journal_summary, geovalidation_stats, output_path)
+
+"""
+record_written -Records the hikers whose queued output has been written to disk in the manifest.
+:param unwritten_filenames: A dictionary of output path -> the filenames of the hikers queued for that path.
+:param written_paths: The output paths written since the last call (see ValidationSession.pop_written).
+"""
+def record_written(manifest, fingerprints, shelter_version, unwritten_filenames, written_paths):
+    for output_path in written_paths or ():
+        for filename in unwritten_filenames.pop(output_path, ()):
+            manifest.record(filename, fingerprints[filename], shelter_version, output_path=output_path)
+
+# The ValidationSession owned by a worker process of the multiprocess pipeline (see init_validation_worker).
+worker_session = None
+worker_unvalidated_hikers_data_path = None
+worker_validate_hiker_file = validate_hiker_file
+
+"""
+init_validation_worker -Pool initializer; opens a ValidationSession (loading the validated shelters and building the
+    matcher index) once per worker process instead of shipping them with every task.
+:param validated_shelter_data_path: The directory containing newShelters.csv.
+:param unvalidated_hikers_data_path: The directory containing the unvalidated hiker json files.
+:param stats: A boolean flag; if True then geocoding statistics are recorded.
+:param use_cache: A boolean flag; if True then the worker opens its own connection to the ResolutionCache.
+:param streaming: A boolean flag; if True then hikers are validated with validate_hiker_file_streaming.
+:param search_radius: An optional distance in miles (see ValidationSession).
+:param instrument: A boolean flag; if True then the worker collects instrumentation (see Instrumentation).
+:param route_aware: A boolean flag; if True then journals are resolved as routes (see ValidationSession).
+:param output_format: 'json' or 'sqlite' (see ValidationSession).
+:param top_k: The number of ranked candidates recorded for each journal location (see ValidationSession).
+"""
+def init_validation_worker(validated_shelter_data_path, unvalidated_hikers_data_path, stats, use_cache, streaming=False,
+                           search_radius=None, instrument=False, route_aware=False, output_format='json', top_k=0):
+    global worker_session, worker_unvalidated_hikers_data_path, worker_validate_hiker_file
+    if instrument:
+        instrumentation.enable()
+    worker_session = ValidationSession(validated_shelter_data_path, statistics=stats, use_cache=use_cache,
+                                       search_radius=search_radius, route_aware=route_aware,
+                                       output_format=output_format, top_k=top_k)
+    worker_unvalidated_hikers_data_path = unvalidated_hikers_data_path
+    if streaming:
+        worker_validate_hiker_file = validate_hiker_file_streaming
+
+"""
+summarize_validated_journal -Summarizes a validated journal as the SIDs of its locations. ValidatedEntry objects refer
+    to the worker's gazetteer, which would be pickled along with every result sent back to the parent process.
+:param validated_journal: A dictionary of entry_num -> ValidatedEntry (or an already summarized journal).
+:return journal_summary: A dictionary of entry_num -> {'start_loc': SID, 'dest': SID} (None for unmapped locations).
+"""
+def summarize_validated_journal(validated_journal):
+    journal_summary = {}
+    for entry_num, validated_entry in validated_journal.items():
+        if isinstance(validated_entry, ValidatedEntry):
+            validated_entry = {'start_loc': validated_entry.start_sid, 'dest': validated_entry.dest_sid}
+        journal_summary[entry_num] = validated_entry
+    return journal_summary
+
+"""
+validate_hiker_in_worker -Pool task; validates one hiker file with the worker's ValidationSession.
+:param filename: The name of the hiker's json file.
+:returns (filename, (hiker_id, journal_summary, geovalidation_stats, output_path), instrumentation_snapshot): See
+    validate_hiker_file_streaming; the validated journal is returned as its summary (see summarize_validated_journal)
+    and the snapshot holds the instrumentation collected by the task (None if it is disabled).
+"""
+def validate_hiker_in_worker(filename):
+    hiker_id, validated_journal, geovalidation_stats, output_path = worker_validate_hiker_file(
+        worker_session, worker_unvalidated_hikers_data_path, filename)
+    hiker_result = (hiker_id, summarize_validated_journal(validated_journal), geovalidation_stats, output_path)
+    instrumentation_snapshot = instrumentation.snapshot(reset=True) if instrumentation.enabled else None
+    return (filename, hiker_result, instrumentation_snapshot)
+
 """
 main -Main method for hiker validation. Goes through every unvalidated hiker and maps their location to an entry in the
     AT Shelters database.
+:param stats: A boolean flag; if True then geocoding statistics are computed.
+:param num_hikers_to_map: The maximum number of hikers to validate (all of them if None).
+:param use_cache: A boolean flag; if True then resolutions are memoized in the on-disk ResolutionCache so that re-runs
+    only fuzzy match strings that haven't been seen with the current version of newShelters.csv.
+:param workers: The number of worker processes; if greater than one each hiker file is validated as a separate task
+    in a process pool. The output files and statistics are identical to a serial run, except for the resolution tier
+    counts: a worker's ResolutionCache and learned aliases only hold the strings that worker has resolved, so which
+    tier resolves a location depends on how the hikers were divided among the workers (see compute_geocoding_stats).
+:param incremental: A boolean flag; if True then only hikers that are new, have changed, or were validated against a
+    different version of newShelters.csv are validated, as recorded in the ValidationManifest. Any change to the
+    location data sets re-validates every hiker (see ValidationManifest). Each validated hiker is recorded as soon as it
+    is done so an interrupted run resumes where it stopped.
+:param streaming: A boolean flag; if True then each hiker's journal is read, validated, and written one entry at a time
+    (see validate_hiker_file_streaming).
+:param search_radius: An optional distance in miles; if provided, each journal location is first matched against the
+    shelters within this distance of the hiker's previously resolved location (see HikerValidator.match_near).
+:param instrument: A boolean flag; if True then per-stage timings and counters are collected (in every worker process)
+    and a summary is printed at the end of the run.
+:param profile_path: An optional path; if provided then the run (the parent process) is profiled with cProfile and the
+    statistics are written to this path.
+:param route_aware: A boolean flag; if True then each journal is resolved as a route along the trail centerline (see
+    RouteResolver).
+:param output_format: 'json' to write each validated hiker to its own json file in the validated hikers directory, or
+    'sqlite' to write every validated journal entry as a row of Data/HikerData/validated_hikers.sqlite (see
+    ValidatedHikerStore).
+:param write_batch_size: An optional number of validated hikers written (and synced to disk) together in serial json
+    runs (see BatchedHikerWriter); incremental runs only record a hiker in the manifest once its batch is on disk.
+:param background_writes: A boolean flag; if True then serial json runs write the batches on a background thread.
+:param top_k: The number of ranked candidate shelters recorded in the geocoding statistics for each journal location,
+    mapped or not (0 to record none). Off by default: ranking costs an additional search for every unique location.
+:return statistics: The aggregate geocoding statistics (None if stats is False).
 """
-def main(stats=False, num_hikers_to_map=None):
+def main(stats=False, num_hikers_to_map=None, use_cache=True, workers=1, incremental=False, streaming=False,
+         search_radius=None, instrument=False, profile_path=None, route_aware=False, output_format='json',
+         write_batch_size=None, background_writes=False, top_k=0):
+    if instrument or profile_path is not None:
+        instrumentation.enable(profile=profile_path is not None)
+    run_start = time.perf_counter()
     unvalidated_hikers_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/HikerData/UnvalidatedHikers/'))
     validated_hikers_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/HikerData/ValidatedHikers/'))
     validated_shelter_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'Data/TrailShelters/'))
@@ -269,45 +842,147 @@ def main(stats=False, num_hikers_to_map=None):
     # validated_shelter_data_path = "C:/Users/Chris/Documents/GitHub/AppalachianTrailGuide/Data/TrailShelters/"
     geocoding_stats = {}
     validated_journals = {}
-    num_hikers = 0
+    statistics = None
+
+    manifest = None
+    shelter_version = None
+    fingerprints = {}
+    if incremental:
+        manifest = ValidationManifest(os.path.abspath(os.path.join(
+            os.path.dirname(__file__), '../..', 'Data/HikerData/validation_manifest.jsonl')))
+        shelter_version = "%s:normalizer=%d" % (gazetteer_checksum(validated_shelter_data_path), NORMALIZER_VERSION)
+        if search_radius is not None:
+            # Hikers validated with a different search radius may have been mapped to different shelters.
+            shelter_version += ":radius=%r" % search_radius
+        if route_aware:
+            shelter_version += ":route"
+        if output_format != 'json':
+            # Hikers validated into the other output format haven't been written to this one.
+            shelter_version += ":output=%s" % output_format
+    elif output_format == 'sqlite':
+        # The hikers already in the store, by the name of the file they were read from.
+        output_store = ValidatedHikerStore(os.path.join(os.path.dirname(validated_hikers_data_path),
+                                                        VALIDATED_HIKERS_DB_FILENAME))
+        validated_filenames = output_store.hiker_filenames()
+        output_store.close()
+    else:
+        # List the validated hikers once so that checking a hiker is a set lookup rather than a directory listing.
+        validated_filenames = set(os.listdir(validated_hikers_data_path))
 
-    # Go through the list of unvalidated hikers and validate.
+    # Go through the list of unvalidated hikers and determine which need to be validated.
+    filenames_to_validate = []
     for filename in os.listdir(unvalidated_hikers_data_path):
         if num_hikers_to_map:
-            if num_hikers > num_hikers_to_map:
+            if len(filenames_to_validate) > num_hikers_to_map:
                 break
+        if manifest is not None:
+            # Only validate the hiker if it is new, changed, or was validated against a different shelter data set.
+            fingerprint = manifest.fingerprint(filename, unvalidated_hikers_data_path + "/" + filename)
+            if manifest.needs_validation(filename, fingerprint, shelter_version):
+                fingerprints[filename] = fingerprint
+                filenames_to_validate.append(filename)
+            else:
+                print("Hiker %s Has Already been Validated." % filename)
         # If the hiker has already been validated, don't re-validate.
-        if filename not in os.listdir(validated_hikers_data_path):
-            # Load the unvalidated json file into memory.
-            with open(unvalidated_hikers_data_path + "/" + filename, 'r') as fp:
-                hiker = json.load(fp=fp)
-            # Load the validated AT shelters into memory:
-            validated_shelters = get_validated_shelters(validated_shelters_path=validated_shelter_data_path + "/newShelters.csv")
-            # TODO: Load validated hostels into memory:
-            # validated_hostels = get_validated_hostels(validated_hostels_path=validated_shelter_data_path + "/validated_hostels.csv")
-            # TODO: Load validated places (that are not recognized shelters or hostels) into memory:
-            # validated_places = get_validated_places(validated_places_path=validated_shelter_data_path + "/validated_places.csv")
-
-            # TODO: Validate using hostels, shelters, and places; not just shelters.
-            # Instantiate validator object.
-            validator = HikerValidator(validated_shelters=validated_shelters,
-                                       validated_hostels=None, validated_places=None, statistics=stats)
-            # Execute shelter validation.
-            validated_journal, geovalidation_stats = validator.validate_shelters(hiker)
-            # If the statistics flag was set to true during instantiation, retrieve the computed statistics:
-            if stats:
-                geocoding_stats[hiker['identifier']] = geovalidation_stats
-            # If there are any successfully mapped journal entries, write them to validated hikers.
-            if len(validated_journal) > 0:
-                validated_journals[hiker['identifier']] = validated_journal
-                validator.write_validated_hiker(hiker)
-            num_hikers += 1
+        elif filename not in validated_filenames:
+            filenames_to_validate.append(filename)
         else:
             print("Hiker %s Has Already been Validated." % filename)
 
+    hiker_results = {}
+    if workers > 1:
+        # Each hiker file is a task; results stream back in completion order.
+        pool = multiprocessing.Pool(processes=workers, initializer=init_validation_worker,
+                                    initargs=(validated_shelter_data_path, unvalidated_hikers_data_path, stats,
+                                              use_cache, streaming, search_radius, instrumentation.enabled,
+                                              route_aware, output_format, top_k))
+        for filename, hiker_result, instrumentation_snapshot in pool.imap_unordered(validate_hiker_in_worker,
+                                                                                   filenames_to_validate):
+            hiker_results[filename] = hiker_result
+            if instrumentation_snapshot is not None:
+                instrumentation.merge(instrumentation_snapshot)
+            if manifest is not None:
+                manifest.record(filename, fingerprints[filename], shelter_version, output_path=hiker_result[3])
+        pool.close()
+        pool.join()
+    else:
+        # The reference data is loaded once for the whole run rather than once per hiker.
+        session = ValidationSession(validated_shelter_data_path, statistics=stats, use_cache=use_cache,
+                                    search_radius=search_radius, route_aware=route_aware,
+                                    output_format=output_format, write_batch_size=write_batch_size,
+                                    background_writes=background_writes, top_k=top_k)
+        validate_file = validate_hiker_file_streaming if streaming else validate_hiker_file
+        # Hikers queued by a BatchedHikerWriter are recorded in the manifest once they are on disk: output path ->
+        # filenames.
+        unwritten_filenames = {}
+        for filename in filenames_to_validate:
+            hiker_results[filename] = validate_file(session, unvalidated_hikers_data_path, filename)
+            if manifest is not None:
+                written_paths = session.pop_written()
+                output_path = hiker_results[filename][3]
+                if written_paths is None or output_path is None or streaming:
+                    manifest.record(filename, fingerprints[filename], shelter_version, output_path=output_path)
+                else:
+                    unwritten_filenames.setdefault(output_path, []).append(filename)
+                record_written(manifest, fingerprints, shelter_version, unwritten_filenames, written_paths)
+        session.close()
+        if manifest is not None:
+            record_written(manifest, fingerprints, shelter_version, unwritten_filenames, session.pop_written())
+    if manifest is not None:
+        manifest.compact()
+        manifest.close()
+
+    # Merge the per-hiker results in directory listing order so the aggregate statistics don't depend on which worker
+    # finished first.
+    for filename in filenames_to_validate:
+        hiker_id, validated_journal, geovalidation_stats, output_path = hiker_results[filename]
+        # If the statistics flag was set to true during instantiation, retrieve the computed statistics:
+        if stats:
+            geocoding_stats[hiker_id] = geovalidation_stats
+        if len(validated_journal) > 0:
+            validated_journals[hiker_id] = validated_journal
+
     # If geocoding statistics are requested then perform analysis
     if stats:
         statistics = compute_geocoding_stats(validated_journals, geocoding_stats)
+    if instrumentation.enabled:
+        instrumentation.count('hikers_validated', len(filenames_to_validate))
+        instrumentation.record_time('run', time.perf_counter() - run_start)
+        print(instrumentation.summary())
+        if profile_path is not None:
+            instrumentation.dump_profile(profile_path)
+        instrumentation.disable()
+    return statistics
 
 if __name__ == '__main__':
-    main(stats=True,num_hikers_to_map=3)
+    parser = argparse.ArgumentParser(description="Maps hiker journal locations to validated AT shelters.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to validate hikers in parallel (default: 1).")
+    parser.add_argument('--num-hikers', type=int, default=3, help="Maximum number of hikers to validate.")
+    parser.add_argument('--no-cache', action='store_true', help="Don't use the on-disk resolution cache.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only validate new or changed hikers (and all hikers if newShelters.csv changed).")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read, validate, and write each journal one entry at a time (for very large journals).")
+    parser.add_argument('--search-radius', type=float, default=None, metavar='MILES',
+                        help="Prefer shelters within MILES of the hiker's previously resolved location.")
+    parser.add_argument('--instrument', action='store_true',
+                        help="Collect per-stage timings and counters and print a summary at the end of the run.")
+    parser.add_argument('--profile', metavar='PATH', help="Profile the run with cProfile and save the stats to PATH.")
+    parser.add_argument('--route-aware', action='store_true',
+                        help="Resolve each journal as a route along the trail centerline.")
+    parser.add_argument('--write-batch-size', type=int, default=None, metavar='N',
+                        help="Write validated hikers N at a time, syncing the directory once per batch.")
+    parser.add_argument('--background-writes', action='store_true',
+                        help="Write validated hikers on a background thread while the next hikers are validated.")
+    parser.add_argument('--top-k', type=int, default=0, metavar='K',
+                        help="Record the K best candidate shelters of every journal location in the statistics "
+                             "(off by default: ranking is an additional search for every unique location).")
+    parser.add_argument('--output-format', choices=('json', 'sqlite'), default='json',
+                        help="Write validated hikers as json files (default) or as rows of a single sqlite database.")
+    args = parser.parse_args()
+    main(stats=True, num_hikers_to_map=args.num_hikers, use_cache=not args.no_cache, workers=args.workers,
+         incremental=args.incremental, streaming=args.streaming, search_radius=args.search_radius,
+         instrument=args.instrument, profile_path=args.profile, route_aware=args.route_aware,
+         output_format=args.output_format, write_batch_size=args.write_batch_size,
+         background_writes=args.background_writes, top_k=args.top_k)
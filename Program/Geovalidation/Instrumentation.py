@@ -0,0 +1,194 @@
+"""
+Instrumentation.py
+Opt-in counters, per-stage timing histograms, and cProfile support for validation runs. Instrumentation is disabled
+    by default; while disabled a stage is a shared no-op context manager and a count is a single flag check.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import time
+import pstats
+import cProfile
+import threading
+import collections
+
+
+class StageTimer(object):
+    """
+    StageTimer(object) -Context manager that records the wall clock time of one execution of a stage.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.record_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullStage(object):
+    """
+    NullStage(object) -The context manager returned for every stage while instrumentation is disabled.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_STAGE = NullStage()
+
+
+class Instrumentation(object):
+    """
+    Instrumentation(object) -Collects named counters and a timing histogram for each named stage. Stage timings are
+        bucketed by powers of two microseconds, so the p50 and p99 reported in the summary are upper bounds accurate to
+        within a factor of two. Updates are guarded by a lock, since a background thread (see BatchedHikerWriter) may
+        record stages and counters while the main thread does.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profiler = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.counters = collections.Counter()
+        # Stage name -> [number of executions, total seconds, max seconds, Counter of histogram bucket -> executions].
+        self.timings = {}
+
+    """
+    enable -Starts collecting counters and stage timings.
+    :param profile: A boolean flag; if True then the run is also profiled with cProfile (see dump_profile).
+    """
+    def enable(self, profile=False):
+        self.enabled = True
+        if profile and self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def disable(self):
+        self.enabled = False
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    """
+    stage -Returns a context manager that times the enclosed block as an execution of the named stage.
+    """
+    def stage(self, name):
+        if self.enabled:
+            return StageTimer(self, name)
+        return NULL_STAGE
+
+    """
+    count -Adds to the named counter.
+    """
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += amount
+
+    def record_time(self, name, seconds):
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = [0, 0.0, 0.0, collections.Counter()]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+            # Bucket b holds the executions that took [2 ** (b - 1), 2 ** b) microseconds.
+            timing[3][int(seconds * 1e6).bit_length()] += 1
+
+    """
+    snapshot -Returns the counters and stage timings collected so far (in a picklable form), and optionally resets them.
+        Worker processes send snapshots back to the parent process, which combines them with merge.
+    """
+    def snapshot(self, reset=False):
+        with self.lock:
+            snapshot = {
+                'counters': dict(self.counters),
+                'timings': dict((name, [timing[0], timing[1], timing[2], dict(timing[3])])
+                                for name, timing in self.timings.items())
+            }
+            if reset:
+                self._clear()
+        return snapshot
+
+    def merge(self, snapshot):
+        with self.lock:
+            self.counters.update(snapshot['counters'])
+            for name, (num_executions, total, maximum, buckets) in snapshot['timings'].items():
+                timing = self.timings.get(name)
+                if timing is None:
+                    timing = self.timings[name] = [0, 0.0, 0.0, collections.Counter()]
+                timing[0] += num_executions
+                timing[1] += total
+                timing[2] = max(timing[2], maximum)
+                timing[3].update(buckets)
+
+    """
+    summary -Formats the stage timings and counters as a table.
+    """
+    def summary(self):
+        lines = ["%-28s %10s %10s %10s %10s %10s %10s"
+                 % ("stage", "count", "total s", "mean ms", "p50 ms", "p99 ms", "max ms")]
+        for name, (num_executions, total, maximum, buckets) in sorted(self.timings.items(),
+                                                                     key=lambda item: -item[1][1]):
+            lines.append("%-28s %10d %10.3f %10.3f %10.3f %10.3f %10.3f"
+                         % (name, num_executions, total, total / num_executions * 1000,
+                            bucket_percentile(buckets, num_executions, 0.50, maximum) * 1000,
+                            bucket_percentile(buckets, num_executions, 0.99, maximum) * 1000, maximum * 1000))
+        if self.counters:
+            lines.append("%-28s %10s" % ("counter", "value"))
+            for name, value in sorted(self.counters.items()):
+                lines.append("%-28s %10d" % (name, value))
+        return "\n".join(lines)
+
+    """
+    dump_profile -Writes the cProfile statistics of the run to a file readable by pstats.
+    :param path: The path of the profile file.
+    :param num_lines: The number of functions (by cumulative time) printed; 0 to print nothing.
+    """
+    def dump_profile(self, path, num_lines=20):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        if num_lines > 0:
+            pstats.Stats(path).sort_stats('cumulative').print_stats(num_lines)
+
+"""
+bucket_percentile -Estimates a percentile of a stage's timings from its histogram: the upper edge (capped at the
+    slowest execution) of the bucket containing the percentile.
+"""
+def bucket_percentile(buckets, num_executions, percentile, maximum):
+    target = percentile * num_executions
+    cumulative = 0
+    for bucket in sorted(buckets):
+        cumulative += buckets[bucket]
+        if cumulative >= target:
+            return min((1 << bucket) / 1e6, maximum)
+    return maximum
+
+# The instrumentation shared by every module of a validation run.
+instrumentation = Instrumentation()
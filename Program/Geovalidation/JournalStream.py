@@ -0,0 +1,233 @@
+"""
+JournalStream.py
+Incremental readers and writers for hiker json files, so that very long journals can be validated one entry at a time
+    instead of being loaded (and copied) into memory all at once.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import json
+
+
+class JournalReader(object):
+    """
+    JournalReader(object) -Iterative parser for a hiker json file ({"identifier": ..., "journal": {entry_num: entry}}).
+        The file is read in fixed size chunks and decoded a value at a time, so only the current journal entry (and the
+        unread remainder of the current chunk) is held in memory.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type JournalReader.
+    :param fp: A text mode file object positioned at the start of the hiker json file.
+    :param chunk_size: The number of characters read from the file at a time.
+    """
+    def __init__(self, fp, chunk_size=1 << 16):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    """
+    items -Yields the (key, value) pairs of the hiker object in file order. The value for the 'journal' key is a
+        generator of (entry_num, entry) pairs which must be consumed before the next pair is requested.
+    """
+    def items(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self._decode()
+            self._expect(':')
+            if key == 'journal' and self._peek() == '{':
+                self.pos += 1
+                yield (key, self._iter_journal())
+            else:
+                yield (key, self._decode())
+            if self._peek() == ',':
+                self.pos += 1
+            else:
+                self._expect('}')
+                return
+
+    def _iter_journal(self):
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            entry_num = self._decode()
+            self._expect(':')
+            yield (entry_num, self._decode())
+            if self._peek() == ',':
+                self.pos += 1
+            else:
+                self._expect('}')
+                return
+
+    def _fill(self):
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop everything that has already been decoded.
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        # Skip whitespace and return the next character ('' at the end of the file).
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Malformed hiker json: expected %r near character %d" % (char, self.pos))
+        self.pos += 1
+
+    def _decode(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                # The value continues past the end of the buffer.
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+class JournalLinesReader(object):
+    """
+    JournalLinesReader(object) -Reader for the json-lines journal format: the first line is the hiker object without a
+        journal and every following line is an [entry_num, entry] pair. Provides the same items() interface as
+        JournalReader (the journal is yielded last).
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def items(self):
+        header = json.loads(self.fp.readline())
+        for key, value in header.items():
+            yield (key, value)
+        yield ('journal', self._iter_journal())
+
+    def _iter_journal(self):
+        for line in iter(self.fp):
+            if line.strip():
+                entry_num, entry = json.loads(line)
+                yield (entry_num, entry)
+
+
+class JournalWriter(object):
+    """
+    JournalWriter(object) -Writes a hiker json file field by field and journal entry by journal entry. The output is
+        identical to json.dump of the equivalent hiker dictionary.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type JournalWriter.
+    :param fp: A text mode file object to write the hiker json file to.
+    :param default: An optional json default hook for objects that aren't otherwise serializable.
+    """
+    def __init__(self, fp, default=None):
+        self.fp = fp
+        self.default = default
+        self.num_fields = 0
+        self.fp.write('{')
+
+    def write_field(self, key, value):
+        self._next_field()
+        self.fp.write(json.dumps(key) + ': ' + json.dumps(value, default=self.default))
+
+    """
+    write_journal -Writes each (entry_num, entry) pair as it is produced by the provided iterable.
+    :return num_entries: The number of journal entries written.
+    """
+    def write_journal(self, entries, key='journal'):
+        self._next_field()
+        self.fp.write(json.dumps(key) + ': {')
+        num_entries = 0
+        for entry_num, entry in entries:
+            if num_entries > 0:
+                self.fp.write(', ')
+            self.fp.write(json.dumps(entry_num) + ': ' + json.dumps(entry, default=self.default))
+            num_entries += 1
+        self.fp.write('}')
+        return num_entries
+
+    def close(self):
+        self.fp.write('}')
+
+    def _next_field(self):
+        if self.num_fields > 0:
+            self.fp.write(', ')
+        self.num_fields += 1
+
+
+class JournalLinesWriter(object):
+    """
+    JournalLinesWriter(object) -Writes the json-lines journal format read by JournalLinesReader. Fields are buffered
+        until the journal is written since the header line must come first.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self, fp, default=None):
+        self.fp = fp
+        self.default = default
+        self.header = {}
+        self.journal_written = False
+
+    def write_field(self, key, value):
+        if self.journal_written:
+            raise ValueError("Every hiker field must be written before the journal in the json-lines format.")
+        self.header[key] = value
+
+    def write_journal(self, entries, key='journal'):
+        self.fp.write(json.dumps(self.header, default=self.default) + "\n")
+        self.journal_written = True
+        num_entries = 0
+        for entry_num, entry in entries:
+            self.fp.write(json.dumps([entry_num, entry], default=self.default) + "\n")
+            num_entries += 1
+        return num_entries
+
+    def close(self):
+        if not self.journal_written:
+            self.write_journal(())
+
+
+"""
+open_journal_reader -Returns the reader for a hiker file based on its extension (.jsonl is the json-lines format).
+"""
+def open_journal_reader(fp, filename):
+    if filename.endswith('.jsonl'):
+        return JournalLinesReader(fp)
+    return JournalReader(fp)
+
+"""
+open_journal_writer -Returns the writer for a hiker file based on its extension (.jsonl is the json-lines format).
+"""
+def open_journal_writer(fp, filename, default=None):
+    if filename.endswith('.jsonl'):
+        return JournalLinesWriter(fp, default=default)
+    return JournalWriter(fp, default=default)
@@ -0,0 +1,110 @@
+"""
+NameNormalizer.py
+Normalizes shelter names and hiker entered locations before they are compared, and keeps the alias table of normalized
+    strings that have already been resolved to a shelter.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import re
+
+# Bumped whenever normalize_name changes; resolutions made with another version of the normalization are stale.
+NORMALIZER_VERSION = 1
+# Abbreviations hikers (and some of the shelter data sets) use, expanded word by word after punctuation is stripped.
+WORD_EXPANSIONS = {
+    'mt': 'mount',
+    'mtn': 'mountain',
+    'mtns': 'mountains',
+    'shltr': 'shelter',
+    'shelt': 'shelter',
+    'shel': 'shelter',
+    'leanto': 'lean to',
+    'gp': 'gap'
+}
+# Apostrophes are dropped ("Neel's" is "neels"); every other character that isn't a letter or digit separates words.
+APOSTROPHES = re.compile(r"['\u2019`]")
+SEPARATORS = re.compile(r"[\W_]+")
+
+"""
+normalize_name -Returns the form of a shelter name or user entered location that is used for matching: case folded,
+    stripped of punctuation, with runs of whitespace collapsed and the Mt/Mtn/Shltr/Lean-to/Gap abbreviations expanded.
+    For example "Mt. Collins Shltr" and "mount collins shelter" both normalize to "mount collins shelter".
+:param name: The string to be normalized (anything that isn't a string is returned unchanged).
+:return normalized_name: The normalized string.
+"""
+def normalize_name(name):
+    if not isinstance(name, str):
+        return name
+    words = SEPARATORS.split(APOSTROPHES.sub('', name.casefold()))
+    return " ".join(WORD_EXPANSIONS.get(word, word) for word in words if word)
+
+
+class NameNormalizer(object):
+    """
+    NameNormalizer(object) -Memoizes normalize_name, so that every unique shelter name and user entered location is
+        normalized once no matter how many journals repeat it.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    def __init__(self):
+        self.normalized = {}
+
+    def normalize(self, name):
+        normalized_name = self.normalized.get(name)
+        if normalized_name is None:
+            normalized_name = normalize_name(name)
+            if name is not None:
+                self.normalized[name] = normalized_name
+        return normalized_name
+
+
+class AliasTable(object):
+    """
+    AliasTable(object) -Maps normalized strings to the shelter they resolved to, learned from past successful
+        resolutions. Each alias also stores a lower bound on the comparison ratio of its shelter; a shelter's ranking
+        doesn't depend on the comparison threshold, so an alias answers any lookup whose threshold is at most that bound
+        without any fuzzy string comparison.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    # Sentinel returned by get for strings without a usable alias (None is never stored as an alias).
+    MISS = object()
+
+    def __init__(self):
+        # Normalized string -> (SID, lower bound on the comparison ratio of the SID's shelter).
+        self.aliases = {}
+
+    def __len__(self):
+        return len(self.aliases)
+
+    """
+    learn -Records that a normalized string resolved to a shelter.
+    :param normalized_name: The normalized user entered string (or shelter name).
+    :param assoc_sid: The SID of the best matching shelter (ignored if None).
+    :param comp_ratio: The comparison ratio of the match, or the comparison threshold it was resolved with.
+    """
+    def learn(self, normalized_name, assoc_sid, comp_ratio):
+        if assoc_sid is None or not isinstance(normalized_name, str):
+            return
+        alias = self.aliases.get(normalized_name)
+        if alias is None or comp_ratio > alias[1]:
+            self.aliases[normalized_name] = (assoc_sid, comp_ratio)
+
+    """
+    get -Looks up the alias of a normalized string.
+    :param normalized_name: The normalized user entered string.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param allowed_sids: An optional collection of SIDs the search is restricted to; the alias is only used if its
+        shelter is allowed (the best match overall is then also the best of the allowed shelters).
+    :return alias: The (SID, comparison ratio bound) the string resolves to, or AliasTable.MISS if the string has to be
+        matched.
+    """
+    def get(self, normalized_name, comparison_threshold, allowed_sids=None):
+        alias = self.aliases.get(normalized_name)
+        if alias is None or alias[1] < comparison_threshold:
+            return AliasTable.MISS
+        if allowed_sids is not None and alias[0] not in allowed_sids:
+            return AliasTable.MISS
+        return alias
@@ -0,0 +1,127 @@
+"""
+ResolutionCache.py
+Persistent memo cache of user entered location strings that have already been resolved to a shelter SID.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from NameNormalizer import normalize_name
+
+"""
+shelter_dataset_checksum -Returns a checksum of the validated shelters CSV file. Any edit to the shelter data set
+    changes the checksum, which invalidates every resolution computed against the old data set.
+:param validated_shelters_path: The path to the CSV file containing the validated shelters.
+:return checksum: The hex SHA-1 digest of the file's contents.
+"""
+def shelter_dataset_checksum(validated_shelters_path):
+    sha1 = hashlib.sha1()
+    with open(validated_shelters_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class ResolutionCache(object):
+    """
+    ResolutionCache(object) -Maps (normalized string, comparison threshold, shelter data set checksum) to the SID the
+        string resolved to (or None if it could not be resolved). Resolutions are stored in a local sqlite database with
+        a bounded, least recently used, in-memory layer in front of it.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    # Sentinel returned by get for strings that have never been resolved (None is a valid cached resolution).
+    MISS = object()
+
+    """
+    __init__ -Constructor for objects of type ResolutionCache. Resolutions made against any other version of the shelter
+        data set are deleted when the cache is opened.
+    :param cache_path: The path to the sqlite database file (created if it doesn't exist).
+    :param dataset_checksum: The checksum of the shelter data set (see shelter_dataset_checksum).
+    :param max_memory_entries: The maximum number of resolutions held in the in-memory LRU layer.
+    """
+    def __init__(self, cache_path, dataset_checksum, max_memory_entries=10000):
+        self.cache_path = cache_path
+        self.dataset_checksum = dataset_checksum
+        self.max_memory_entries = max_memory_entries
+        self.memory = OrderedDict()
+        # Worker processes share the database file, so wait on locks held by other workers instead of failing.
+        self.connection = sqlite3.connect(cache_path, timeout=60)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS resolutions ("
+            "query TEXT NOT NULL, threshold REAL NOT NULL, checksum TEXT NOT NULL, sid TEXT, "
+            "PRIMARY KEY (query, threshold, checksum))")
+        # The shelter data set changed: everything resolved against the old version is stale.
+        self.connection.execute("DELETE FROM resolutions WHERE checksum != ?", (dataset_checksum,))
+        self.connection.commit()
+
+    """
+    normalize_query -Returns the form of the user entered string used as the cache key. Shelter matching is performed
+        on the normalized string (see NameNormalizer.normalize_name), so every spelling with the same normalized form
+        shares a resolution.
+    """
+    def normalize_query(self, query):
+        return normalize_name(query)
+
+    """
+    get -Looks up a previously resolved string; first in memory then on disk.
+    :param query: The user entered string.
+    :param threshold: The comparison threshold the string was resolved with.
+    :return sid: The cached SID (None if the string was unmappable) or ResolutionCache.MISS if it was never resolved.
+    """
+    def get(self, query, threshold):
+        if not isinstance(query, str):
+            return ResolutionCache.MISS
+        key = (self.normalize_query(query), threshold)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        row = self.connection.execute(
+            "SELECT sid FROM resolutions WHERE query = ? AND threshold = ? AND checksum = ?",
+            (key[0], threshold, self.dataset_checksum)).fetchone()
+        if row is None:
+            return ResolutionCache.MISS
+        self._remember(key, row[0])
+        return row[0]
+
+    """
+    put_many -Stores the resolutions of many strings with a single transaction.
+    :param resolutions: A dictionary of user entered string -> resolved SID (None if unmappable).
+    :param threshold: The comparison threshold the strings were resolved with.
+    """
+    def put_many(self, resolutions, threshold):
+        rows = []
+        for query, sid in resolutions.items():
+            if not isinstance(query, str):
+                continue
+            key = (self.normalize_query(query), threshold)
+            self._remember(key, sid)
+            rows.append((key[0], threshold, self.dataset_checksum, None if sid is None else str(sid)))
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)", rows)
+
+    """
+    successful_resolutions -Returns every resolution (of the current shelter data set) that mapped a string to a
+        shelter.
+    :return resolutions: A list of (normalized string, comparison threshold, SID) tuples.
+    """
+    def successful_resolutions(self):
+        return self.connection.execute(
+            "SELECT query, threshold, sid FROM resolutions WHERE checksum = ? AND sid IS NOT NULL",
+            (self.dataset_checksum,)).fetchall()
+
+    def put(self, query, sid, threshold):
+        self.put_many({query: sid}, threshold)
+
+    def _remember(self, key, sid):
+        self.memory[key] = sid
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_entries:
+            # Evict the least recently used resolution.
+            self.memory.popitem(last=False)
+
+    def close(self):
+        self.connection.close()
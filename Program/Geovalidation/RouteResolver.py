@@ -0,0 +1,228 @@
+"""
+RouteResolver.py
+Resolves a hiker's journal as a route rather than as independent entries: the locations a hiker writes move steadily
+    along the trail, so of the shelters a location could refer to, the one that fits the hiker's route is chosen.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import itertools
+import numpy as np
+from Instrumentation import instrumentation
+
+# The directions a hiker can be walking: +1 along increasing trail mileage (northbound), -1 southbound.
+DIRECTIONS = (1, -1)
+
+
+class RouteResolver(object):
+    """
+    RouteResolver(object) -Viterbi decoder over the candidate shelters (see ShelterMatcherIndex.match_within) of each
+        journal location. The journal's locations are the observations. A hidden state is a candidate shelter and
+        the direction the hiker is walking. The cost of a path is the sum of:
+        1. emission: 100 - the comparison ratio of each chosen candidate.
+        2. transition: a cost per mile moved beyond what the hiker could have walked in the elapsed days, a cost per
+            mile walked backwards (against the direction), and a fixed cost for turning around.
+        Costs are in comparison ratio points, so a candidate is only passed over for a worse match when the better
+        match would take the hiker far off their route. With no route information every location resolves to its best
+        match (ties keep the candidate ranked first).
+        A start_loc that repeats the previous entry's dest (as it usually does) is the same observation, and every
+        string is only ranked the first time any journal uses it, so most journal locations cost no fuzzy string
+        comparisons at all.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type RouteResolver.
+    :param matcher_index: The ShelterMatcherIndex the candidates of each location are ranked with.
+    :param location_mileage: The trail mile of each location: a TrailMileage.MileageIndex (or SID -> trail mile
+        dictionary). Locations without a (finite) trail mile add no transition costs.
+    :param k: The maximum number of candidates considered for each location. Many shelters share a name (or score 100
+        against the same string), so this needs to be well above the handful of candidates recorded in the statistics.
+    :param margin: The number of comparison ratio points a candidate may trail the location's best match by. With 0
+        only the shelters tied with the best match are candidates; a larger margin lets the route pick near misses, at
+        the cost of scoring every shelter that could come within the margin.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param max_daily_miles: The distance a hiker can cover in a day without any cost.
+    :param slack_miles: Movement allowed in any direction between two locations (covers the distance between a shelter
+        and the centerline point it was snapped to).
+    :param mile_penalty: The cost of each mile moved beyond max_daily_miles per elapsed day.
+    :param backtrack_penalty: The cost of each mile moved against the hiker's direction.
+    :param reversal_penalty: The cost of turning around (flip-flopping, or hiking a section again).
+    :param window: The number of journal entries decoded at a time; the route is carried from one window to the next, so
+        memory doesn't grow with the length of the journal.
+    """
+    def __init__(self, matcher_index, location_mileage, k=32, margin=0, comparison_threshold=90, max_daily_miles=30.0,
+                 slack_miles=1.0, mile_penalty=0.1, backtrack_penalty=0.5, reversal_penalty=20.0, window=256):
+        self.matcher_index = matcher_index
+        self.location_mileage = location_mileage
+        self.k = k
+        self.margin = margin
+        self.comparison_threshold = comparison_threshold
+        self.max_daily_miles = max_daily_miles
+        self.slack_miles = slack_miles
+        self.mile_penalty = mile_penalty
+        self.backtrack_penalty = backtrack_penalty
+        self.reversal_penalty = reversal_penalty
+        self.window = window
+        # The ranked candidates of every string seen in any journal.
+        self.ranked = {}
+
+    """
+    resolve_journal -Resolves a journal's entries as a route.
+    :param journal_entries: An iterable of (entry_num, entry) pairs in journal order.
+    :param tier_counts: An optional Counter of how each location was resolved: 'route' for strings ranked by the
+        matcher index, 'reused' for strings already ranked (or repeated from the previous entry's dest).
+    :return: A generator of (entry_num, entry, usl_assoc_sid, udl_assoc_sid) tuples.
+    """
+    def resolve_journal(self, journal_entries, tier_counts=None):
+        # The last resolved node of the previous window: (time, SID, trail mile, direction).
+        carried = None
+        time_offset = 0
+        window_entries = []
+        for entry_num, entry in journal_entries:
+            window_entries.append((entry_num, entry))
+            if len(window_entries) == self.window:
+                for resolved_entry in self.resolve_window(window_entries, time_offset, carried, tier_counts):
+                    carried = resolved_entry[4] or carried
+                    yield resolved_entry[:4]
+                time_offset += len(window_entries)
+                window_entries = []
+        for resolved_entry in self.resolve_window(window_entries, time_offset, carried, tier_counts):
+            yield resolved_entry[:4]
+
+    """
+    resolve_window -Decodes one window of journal entries.
+    :return: A list of (entry_num, entry, usl_assoc_sid, udl_assoc_sid, last_node) tuples, where last_node is the
+        (time, SID, trail mile, direction) of the entry's last resolved location (None if neither was resolved).
+    """
+    def resolve_window(self, window_entries, time_offset, carried, tier_counts):
+        # Each node is [time, candidate SIDs, emission costs, trail miles]; an entry's start_loc and dest refer to
+        # nodes by position (None for locations without any candidates).
+        nodes = []
+        entry_nodes = []
+        if carried is not None:
+            carried_time, carried_sid, carried_mile, carried_direction = carried
+            nodes.append([carried_time, [carried_sid], np.zeros(1), np.array([carried_mile])])
+        previous_dest = None
+        previous_dest_node = None
+        for entry_position, (entry_num, entry) in enumerate(window_entries):
+            entry_time = time_offset + entry_position
+            if entry['start_loc'] is not None and entry['start_loc'] == previous_dest:
+                # The hiker started where they stopped: the same observation as the previous destination.
+                start_node = previous_dest_node
+                instrumentation.count('route_reused')
+                if tier_counts is not None:
+                    tier_counts['reused'] += 1
+            else:
+                start_node = self.add_node(nodes, entry_time, entry['start_loc'], tier_counts)
+            dest_node = self.add_node(nodes, entry_time + 1, entry['dest'], tier_counts)
+            entry_nodes.append((start_node, dest_node))
+            previous_dest = entry['dest']
+            previous_dest_node = dest_node
+
+        with instrumentation.stage('route_decode'):
+            choices = self.decode(nodes, carried[3] if carried is not None else None)
+        resolved_entries = []
+        for (entry_num, entry), (start_node, dest_node) in zip(window_entries, entry_nodes):
+            assoc_sids = []
+            last_node = None
+            for node in (start_node, dest_node):
+                if node is None:
+                    assoc_sids.append(None)
+                    continue
+                candidate, direction = choices[node]
+                assoc_sids.append(nodes[node][1][candidate])
+                last_node = (nodes[node][0], nodes[node][1][candidate], float(nodes[node][3][candidate]), direction)
+            resolved_entries.append((entry_num, entry, assoc_sids[0], assoc_sids[1], last_node))
+        return resolved_entries
+
+    """
+    add_node -Adds the node of a journal location to the nodes being decoded.
+    :return node: The position of the new node (None if the location has no candidates).
+    """
+    def add_node(self, nodes, time, user_location, tier_counts):
+        if user_location is None:
+            return None
+        if user_location in self.ranked:
+            instrumentation.count('route_reused')
+            if tier_counts is not None:
+                tier_counts['reused'] += 1
+        else:
+            self.ranked[user_location] = self.rank(user_location)
+            if tier_counts is not None:
+                tier_counts['route'] += 1
+        candidates = self.ranked[user_location]
+        if not candidates:
+            return None
+        nodes.append([time, [assoc_sid for assoc_sid, comp_ratio in candidates],
+                      np.array([100.0 - comp_ratio for assoc_sid, comp_ratio in candidates]),
+                      np.array([self.location_mileage.get(assoc_sid, np.nan) for assoc_sid, comp_ratio in candidates],
+                               dtype=np.float64)])
+        return len(nodes) - 1
+
+    """
+    rank -Ranks the candidate shelters of a user entered location (see ShelterMatcherIndex.match_within). Without a
+        margin, a location that is a substring of shelter names (or the other way around) has every shelter scoring 100
+        as its candidates, which the substring index finds without scoring any other shelter.
+    :return candidates: A list of at most k (SID, comparison ratio) pairs, best match first.
+    """
+    def rank(self, user_location):
+        if self.margin == 0 and self.comparison_threshold <= 100:
+            candidates = [(assoc_sid, 100) for assoc_sid in
+                          itertools.islice(self.matcher_index.substring_matches(user_location), self.k)]
+            if candidates:
+                return candidates
+        return self.matcher_index.match_within(user_location, margin=self.margin,
+                                               comparison_threshold=self.comparison_threshold, max_matches=self.k)
+
+    """
+    decode -Finds the cheapest path through the nodes.
+    :param nodes: The nodes in journal order (see resolve_window).
+    :param initial_direction: The direction of the first node (None if either direction is possible).
+    :return choices: A list parallel to nodes of the (candidate position, direction) chosen for each node.
+    """
+    def decode(self, nodes, initial_direction=None):
+        if not nodes:
+            return []
+        directions = np.array(DIRECTIONS, dtype=np.float64)
+        # State (candidate, direction) is at position candidate * 2 + direction position.
+        costs = np.repeat(nodes[0][2], len(DIRECTIONS))
+        if initial_direction is not None:
+            costs[np.tile(directions, len(nodes[0][2])) != initial_direction] = np.inf
+        back_pointers = []
+        for previous, node in zip(nodes, nodes[1:]):
+            transition = self.transition_costs(previous[3], node[3], node[0] - previous[0], directions)
+            total = costs[:, np.newaxis] + transition
+            # argmin returns the first minimum, so ties keep the higher ranked candidate.
+            best_previous = np.argmin(total, axis=0)
+            costs = total[best_previous, np.arange(total.shape[1])] + np.repeat(node[2], len(DIRECTIONS))
+            back_pointers.append(best_previous)
+        state = int(np.argmin(costs))
+        states = [state]
+        for best_previous in reversed(back_pointers):
+            state = int(best_previous[state])
+            states.append(state)
+        states.reverse()
+        return [(state // len(DIRECTIONS), DIRECTIONS[state % len(DIRECTIONS)]) for state in states]
+
+    """
+    transition_costs -The cost of moving between every pair of states of two consecutive nodes.
+    :param previous_miles: The trail miles of the previous node's candidates.
+    :param miles: The trail miles of the node's candidates.
+    :param elapsed_days: The number of days between the two nodes.
+    :param directions: The array of DIRECTIONS.
+    :return costs: A (previous states, states) array.
+    """
+    def transition_costs(self, previous_miles, miles, elapsed_days, directions):
+        moved = np.repeat(np.repeat(miles[np.newaxis, :] - previous_miles[:, np.newaxis], len(directions), axis=0),
+                          len(directions), axis=1)
+        previous_directions = np.tile(directions, len(previous_miles))[:, np.newaxis]
+        next_directions = np.tile(directions, len(miles))[np.newaxis, :]
+        allowed_miles = self.max_daily_miles * max(elapsed_days, 0) + self.slack_miles
+        costs = self.mile_penalty * np.maximum(np.abs(moved) - allowed_miles, 0.0)
+        costs += self.backtrack_penalty * np.maximum(-next_directions * moved - self.slack_miles, 0.0)
+        # Locations that couldn't be placed on the trail give no information about the route.
+        costs[np.isnan(moved)] = 0.0
+        costs += self.reversal_penalty * (previous_directions != next_directions)
+        return costs
@@ -0,0 +1,421 @@
+"""
+ShelterMatcherIndex.py
+Precompiled index over the validated shelter names used to speed up fuzzy string matching of hiker entered locations.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import heapq
+from collections import Counter
+from fuzzywuzzy import fuzz
+import numpy as np
+from Instrumentation import instrumentation
+from NameNormalizer import NameNormalizer, AliasTable
+from SubstringIndex import SubstringIndex
+
+# fuzz.partial_ratio can round an imperfect match up to 100 once the shorter string is this long (a single edit then
+# costs less than half a percent), so only shorter queries are resolved by the substring tier.
+MAX_SUBSTRING_QUERY_LENGTH = 100
+
+
+class ShelterMatcherIndex(object):
+    """
+    ShelterMatcherIndex(object) -Built once from the output of get_validated_shelters. Shelter names and queries are
+        compared in their normalized form (see NameNormalizer.normalize_name). Each shelter name is broken into
+        character counts which are stored in an inverted index (character -> [(row, count), ...]). At query time the
+        inverted index yields, for every shelter, the number of characters the query and the shelter name have in
+        common. That overlap gives an upper bound on fuzz.partial_ratio, so only shelters whose bound meets the
+        comparison threshold are scored with the (expensive) exact fuzz.partial_ratio.
+        Queries are resolved in tiers, and only the last tier scores the query against many shelters:
+        1. exact: Queries that have been resolved before (every shelter name, strings resolved in this run, and strings
+            resolved by a previous run through learn_resolutions) are answered from an alias table. An alias is the
+            query's best match over every shelter, so aliases never change a result.
+        2. substring: A query that contains, or is contained in, a shelter name scores 100 against that shelter, which
+            no other shelter can beat. Every shelter that scores 100 is such a shelter, so the best match is the last
+            of them (found through a SubstringIndex).
+        3. fuzzy: Everything else is scored against the shelters that pass the candidate filter (see candidates).
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ShelterMatcherIndex.
+    :param validated_shelters: The dictionary of shelters returned by get_validated_shelters.
+    :param normalizer: An optional NameNormalizer shared with other consumers of the normalized names.
+    """
+    def __init__(self, validated_shelters, normalizer=None):
+        self.normalizer = normalizer if normalizer is not None else NameNormalizer()
+        self.aliases = AliasTable()
+        self.shelter_ids = []
+        self.shelter_names = []
+        self.name_lengths = []
+        self.name_counts = []
+        self.row_of_sid = {}
+        # Inverted index: character -> list of (row, number of occurrences of the character in the shelter name).
+        self.postings = {}
+        for row, (shelter_id, shelter_data) in enumerate(validated_shelters.items()):
+            shelter_name = self.normalizer.normalize(shelter_data['name'])
+            self.shelter_ids.append(shelter_id)
+            self.shelter_names.append(shelter_name)
+            self.name_lengths.append(len(shelter_name))
+            self.name_counts.append(Counter(shelter_name))
+            self.row_of_sid[shelter_id] = row
+            for char, count in self.name_counts[row].items():
+                self.postings.setdefault(char, []).append((row, count))
+        self.substring_index = SubstringIndex(self.shelter_names)
+        self.learn_shelter_names()
+
+    def __len__(self):
+        return len(self.shelter_ids)
+
+    """
+    candidates -Returns the rows of the shelters that could possibly reach the comparison threshold when compared to the
+        provided query with fuzz.partial_ratio.
+        partial_ratio compares the shorter string (length m) against windows (length w <= m) of the longer string, and
+        the number of matching characters M in the best window can never exceed the number of characters C the two
+        strings share (multiset intersection). Therefore partial_ratio <= 2 * min(C, w) / (m + w) <= 2C / (m + C). The
+        bound is rounded the same way fuzzywuzzy rounds its ratios, so no shelter that brute force would accept is
+        ever filtered out.
+    :param query: The user entered string to be matched.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param allowed_sids: An optional collection of SIDs; if provided only these shelters are considered (for example the
+        shelters near the hiker's previous location, see SpatialIndex).
+    :return rows: The ascending rows (positions in validated_shelters) of the shelters to be scored.
+    """
+    def candidates(self, query, comparison_threshold, allowed_sids=None):
+        return sorted(self.candidate_bounds(query, comparison_threshold, allowed_sids))
+
+    """
+    candidate_bounds -The shelters returned by candidates along with the upper bound of each shelter's
+        fuzz.partial_ratio (100 for shelters that couldn't be bounded).
+    :return bounds: A dictionary of row -> upper bound on the shelter's comparison ratio.
+    """
+    def candidate_bounds(self, query, comparison_threshold, allowed_sids=None):
+        query = self.normalizer.normalize(query)
+        if allowed_sids is None:
+            allowed_rows = None
+        else:
+            allowed_rows = sorted(self.row_of_sid[sid] for sid in allowed_sids if sid in self.row_of_sid)
+        if query is None and comparison_threshold > 0:
+            # fuzz.partial_ratio scores a missing string as 0.
+            return {}
+        if comparison_threshold <= 0 or not isinstance(query, str):
+            # Every shelter satisfies the threshold (or the query can't be bounded); scan them all.
+            return dict.fromkeys(range(len(self.shelter_ids)) if allowed_rows is None else allowed_rows, 100)
+        query_length = len(query)
+        query_counts = Counter(query)
+        overlaps = {}
+        if allowed_rows is None:
+            for char, query_count in query_counts.items():
+                for row, shelter_count in self.postings.get(char, ()):
+                    overlaps[row] = overlaps.get(row, 0) + min(query_count, shelter_count)
+        else:
+            # Few shelters to consider: intersect the character counts directly instead of walking the postings.
+            for row in allowed_rows:
+                overlap = sum((query_counts & self.name_counts[row]).values())
+                if overlap > 0:
+                    overlaps[row] = overlap
+
+        bounds = {}
+        for row, overlap in overlaps.items():
+            shorter_length = min(query_length, self.name_lengths[row])
+            upper_bound = int(round(100 * (2.0 * overlap) / (shorter_length + overlap)))
+            if upper_bound >= comparison_threshold:
+                bounds[row] = upper_bound
+        if query_length == 0:
+            # fuzz.partial_ratio returns 100 for equivalent strings before checking for empty strings.
+            for row, length in enumerate(self.name_lengths):
+                if length == 0 and (allowed_rows is None or row in allowed_rows):
+                    bounds[row] = 100
+        return bounds
+
+    """
+    best_match -Finds the shelter whose name best matches the provided query. Ties are resolved exactly as the
+        brute-force scan in HikerValidator.validate_entry_locations resolves them: the last shelter (in the order of
+        validated_shelters) with the maximum comparison ratio wins.
+    :param query: The user entered string to be matched.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param allowed_sids: An optional collection of SIDs to restrict the search to (see candidates).
+    :returns (assoc_sid, comp_ratio):
+        :return assoc_sid: The SID of the best matching shelter; None if no shelter met the comparison threshold.
+        :return comp_ratio: The comparison ratio of the best matching shelter (only a lower bound for aliases loaded
+            from a ResolutionCache, see learn_resolutions); -1 if no shelter met the threshold.
+    """
+    def best_match(self, query, comparison_threshold=90, allowed_sids=None, tier_counts=None):
+        assoc_sid, comp_ratio, tier = self.resolve(query, comparison_threshold, allowed_sids)
+        if tier_counts is not None:
+            tier_counts[tier] += 1
+        return (assoc_sid, comp_ratio)
+
+    """
+    resolve -best_match, also reporting the tier (see ShelterMatcherIndex) that resolved the query.
+    :param tier_counts: An optional collections.Counter of tier -> number of queries resolved by the tier.
+    :return (assoc_sid, comp_ratio, tier): The best_match and the tier ('exact', 'substring', or 'fuzzy').
+    """
+    def resolve(self, query, comparison_threshold=90, allowed_sids=None):
+        query = self.normalizer.normalize(query)
+        alias = self.aliases.get(query, comparison_threshold, allowed_sids)
+        if alias is not AliasTable.MISS:
+            instrumentation.count('exact_hits')
+            return alias + ('exact',)
+        if comparison_threshold <= 100:
+            assoc_sid = self.substring_match(query, allowed_sids)
+            if assoc_sid is not None:
+                instrumentation.count('substring_hits')
+                if allowed_sids is None:
+                    self.aliases.learn(query, assoc_sid, 100)
+                return (assoc_sid, 100, 'substring')
+        assoc_sid, comp_ratio = self._best_of_rows(
+            query, self.candidates(query, comparison_threshold, allowed_sids), comparison_threshold)
+        if allowed_sids is None:
+            self.aliases.learn(query, assoc_sid, comp_ratio)
+        return (assoc_sid, comp_ratio, 'fuzzy')
+
+    """
+    substring_match -Finds the last shelter whose name contains, or is contained in, the query and so scores 100.
+    :param query: The user entered string to be matched.
+    :param allowed_sids: An optional collection of SIDs to restrict the search to (see candidates).
+    :return assoc_sid: The SID of the best matching shelter; None if no shelter scores 100 (or the query is too long to
+        be resolved this way, see MAX_SUBSTRING_QUERY_LENGTH).
+    """
+    def substring_match(self, query, allowed_sids=None):
+        for assoc_sid in self.substring_matches(query, allowed_sids):
+            # The first (last in data set order) shelter to score 100 is the best match.
+            return assoc_sid
+        return None
+
+    """
+    substring_matches -Generates every shelter whose name contains, or is contained in, the query (and so scores 100),
+        ranked like match_topk (the later shelter first).
+    :return: A generator of SIDs (nothing if the query is too long, see MAX_SUBSTRING_QUERY_LENGTH).
+    """
+    def substring_matches(self, query, allowed_sids=None):
+        query = self.normalizer.normalize(query)
+        if not isinstance(query, str) or len(query) >= MAX_SUBSTRING_QUERY_LENGTH:
+            return
+        for row in self.substring_index.matching_rows(query):
+            if allowed_sids is not None and self.shelter_ids[row] not in allowed_sids:
+                continue
+            # Confirm the match with the comparison itself.
+            instrumentation.count('fuzzy_comparisons')
+            if fuzz.partial_ratio(query, self.shelter_names[row]) == 100:
+                yield self.shelter_ids[row]
+
+    """
+    learn_shelter_names -Adds every shelter's (normalized) name to the alias table, so that a hiker who enters a
+        shelter's name resolves with a single lookup. A name resolves to the last shelter whose name contains it (not
+        necessarily its own shelter), exactly as it would through fuzzy string comparison.
+    """
+    def learn_shelter_names(self):
+        for shelter_name in set(self.shelter_names):
+            self.aliases.learn(shelter_name, self.substring_match(shelter_name), 100)
+
+    """
+    learn_resolutions -Adds the successful resolutions of a ResolutionCache to the alias table.
+    :param resolutions: An iterable of (normalized string, comparison threshold, SID) resolutions; a string resolved
+        with a threshold has a best comparison ratio of at least that threshold.
+    """
+    def learn_resolutions(self, resolutions):
+        for normalized_query, threshold, assoc_sid in resolutions:
+            if assoc_sid in self.row_of_sid:
+                self.aliases.learn(normalized_query, assoc_sid, threshold)
+
+    """
+    match_topk -Finds the k shelters whose names best match the provided query. Shelters are scored in decreasing order
+        of their upper bound (see candidates) and the search stops as soon as no remaining shelter's bound can beat the
+        k-th best score found so far, so usually only a few shelters are scored. Ties are ranked like best_match (the
+        later shelter ranks higher), so the first match is always the best_match.
+    :param query: The user entered string to be matched.
+    :param k: The maximum number of matches to return.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param allowed_sids: An optional collection of SIDs to restrict the search to (see candidates).
+    :return matches: A list of at most k (SID, comparison ratio) pairs, best match first.
+    """
+    def match_topk(self, query, k=3, comparison_threshold=90, allowed_sids=None):
+        if k <= 0:
+            return []
+        query = self.normalizer.normalize(query)
+        bounds = self.candidate_bounds(query, comparison_threshold, allowed_sids)
+        matches = self._topk_of_bounds(query, bounds, k, comparison_threshold)
+        if matches and allowed_sids is None:
+            self.aliases.learn(query, matches[0][0], matches[0][1])
+        return matches
+
+    """
+    match_topk_batch -match_topk over many queries. The queries are normalized and deduplicated first, so the candidate
+        bounds (see candidate_bounds) and the ranking of each unique normalized query are computed once for the batch.
+    :param queries: A sequence of user entered strings.
+    :param k: The maximum number of matches to return for each query.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :return matches: A list parallel to queries of each query's match_topk list.
+    """
+    def match_topk_batch(self, queries, k=3, comparison_threshold=90):
+        if k <= 0:
+            return [[] for query in queries]
+        normalized_queries = [self.normalizer.normalize(query) for query in queries]
+        unique_matches = {}
+        for query in normalized_queries:
+            if query in unique_matches:
+                continue
+            bounds = self.candidate_bounds(query, comparison_threshold)
+            unique_matches[query] = self._topk_of_bounds(query, bounds, k, comparison_threshold)
+            if unique_matches[query]:
+                self.aliases.learn(query, unique_matches[query][0][0], unique_matches[query][0][1])
+        return [list(unique_matches[query]) for query in normalized_queries]
+
+    def _topk_of_bounds(self, query, bounds, k, comparison_threshold):
+        # Min-heap of the best (comparison ratio, row) pairs found so far; its root is the k-th best.
+        top_k = []
+        num_scored = 0
+        for row, upper_bound in sorted(bounds.items(), key=lambda item: (-item[1], -item[0])):
+            if len(top_k) == k and upper_bound < top_k[0][0]:
+                break
+            comparison_ratio = fuzz.partial_ratio(query, self.shelter_names[row])
+            num_scored += 1
+            if comparison_ratio < comparison_threshold:
+                continue
+            if len(top_k) < k:
+                heapq.heappush(top_k, (comparison_ratio, row))
+            elif (comparison_ratio, row) > top_k[0]:
+                heapq.heapreplace(top_k, (comparison_ratio, row))
+        instrumentation.count('fuzzy_comparisons', num_scored)
+        return [(self.shelter_ids[row], comparison_ratio) for comparison_ratio, row in sorted(top_k, reverse=True)]
+
+    """
+    match_within -Finds every shelter whose comparison ratio is within a margin of the best match's. Shelters are scored
+        in decreasing order of their upper bound (see candidates) and the search stops as soon as no remaining shelter's
+        bound can come within the margin of the best score found so far. Matches are ranked like match_topk.
+    :param query: The user entered string to be matched.
+    :param margin: The number of comparison ratio points a match may trail the best match by (0 for only the shelters
+        tied with the best match).
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param max_matches: An optional maximum number of matches to return.
+    :param allowed_sids: An optional collection of SIDs to restrict the search to (see candidates).
+    :return matches: A list of (SID, comparison ratio) pairs, best match first.
+    """
+    def match_within(self, query, margin=0, comparison_threshold=90, max_matches=None, allowed_sids=None):
+        query = self.normalizer.normalize(query)
+        bounds = self.candidate_bounds(query, comparison_threshold, allowed_sids)
+        best_ratio = -1
+        scored = []
+        num_scored = 0
+        for row, upper_bound in sorted(bounds.items(), key=lambda item: (-item[1], -item[0])):
+            if upper_bound < max(comparison_threshold, best_ratio - margin):
+                break
+            comparison_ratio = fuzz.partial_ratio(query, self.shelter_names[row])
+            num_scored += 1
+            if comparison_ratio >= comparison_threshold:
+                scored.append((comparison_ratio, row))
+                best_ratio = max(best_ratio, comparison_ratio)
+        instrumentation.count('fuzzy_comparisons', num_scored)
+        scored = sorted(((comparison_ratio, row) for comparison_ratio, row in scored
+                         if comparison_ratio >= best_ratio - margin), reverse=True)[:max_matches]
+        matches = [(self.shelter_ids[row], comparison_ratio) for comparison_ratio, row in scored]
+        if matches and allowed_sids is None:
+            self.aliases.learn(query, matches[0][0], matches[0][1])
+        return matches
+
+    """
+    score_matrix -Scores every query against every shelter in one cdist-style pass.
+    :param queries: A sequence of (unique) user entered strings.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :return scores: A (len(queries), len(shelters)) int16 array of fuzz.partial_ratio scores; shelters that were pruned
+        by the candidate filter (and so can't reach the threshold) are given a score of -1.
+    """
+    def score_matrix(self, queries, comparison_threshold=90):
+        scores = np.full((len(queries), len(self.shelter_ids)), -1, dtype=np.int16)
+        for query_num, query in enumerate(queries):
+            query = self.normalizer.normalize(query)
+            rows = self.candidates(query, comparison_threshold)
+            instrumentation.count('fuzzy_comparisons', len(rows))
+            for row in rows:
+                scores[query_num, row] = fuzz.partial_ratio(query, self.shelter_names[row])
+        return scores
+
+    """
+    best_matches -Vectorized best_match over many queries. Queries with an alias are resolved directly; the rest are
+        scored in chunks of unique normalized queries to bound memory when the queries span many hikers.
+    :param queries: A sequence of (unique) user entered strings.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :param chunk_size: The number of queries scored per score matrix.
+    :param tier_counts: An optional collections.Counter of tier -> number of queries resolved by the tier (see resolve).
+    :param tiers: An optional list that the tier of each query is appended to (parallel to queries).
+    :return assoc_sids: A list parallel to queries of the best matching SID for each query (None if no match).
+    """
+    def best_matches(self, queries, comparison_threshold=90, chunk_size=1024, tier_counts=None, tiers=None):
+        num_shelters = len(self.shelter_ids)
+        if num_shelters == 0:
+            return [None] * len(queries)
+        normalized_queries = [self.normalizer.normalize(query) for query in queries]
+        resolved = {}
+        query_tiers = {}
+        unresolved = []
+        for query in normalized_queries:
+            if query in resolved:
+                continue
+            alias = self.aliases.get(query, comparison_threshold)
+            if alias is not AliasTable.MISS:
+                instrumentation.count('exact_hits')
+                resolved[query], query_tiers[query] = alias[0], 'exact'
+                continue
+            assoc_sid = self.substring_match(query) if comparison_threshold <= 100 else None
+            if assoc_sid is not None:
+                instrumentation.count('substring_hits')
+                self.aliases.learn(query, assoc_sid, 100)
+                resolved[query], query_tiers[query] = assoc_sid, 'substring'
+                continue
+            unresolved.append(query)
+            # Placeholder so that repeated queries are only considered once.
+            resolved[query], query_tiers[query] = None, 'fuzzy'
+        for chunk_start in range(0, len(unresolved), chunk_size):
+            chunk = unresolved[chunk_start:chunk_start + chunk_size]
+            scores = self.score_matrix(chunk, comparison_threshold)
+            # Take the argmax of the reversed columns so that, like the brute-force scan, the last maximum wins.
+            best_rows = num_shelters - 1 - np.argmax(scores[:, ::-1], axis=1)
+            best_scores = scores[np.arange(len(best_rows)), best_rows]
+            for query, best_row, best_score in zip(chunk, best_rows, best_scores):
+                if best_score >= comparison_threshold:
+                    resolved[query] = self.shelter_ids[best_row]
+                    self.aliases.learn(query, resolved[query], int(best_score))
+        if tier_counts is not None:
+            for query in normalized_queries:
+                tier_counts[query_tiers[query]] += 1
+        if tiers is not None:
+            tiers.extend(query_tiers[query] for query in normalized_queries)
+        return [resolved[query] for query in normalized_queries]
+
+    """
+    brute_force_best_match -Reference implementation that scores the query against every shelter. Used to verify that
+        best_match returns identical results.
+    """
+    def brute_force_best_match(self, query, comparison_threshold=90):
+        query = self.normalizer.normalize(query)
+        return self._best_of_rows(query, range(len(self.shelter_ids)), comparison_threshold)
+
+    def _best_of_rows(self, query, rows, comparison_threshold):
+        max_comp_ratio = -1
+        assoc_sid = None
+        instrumentation.count('fuzzy_comparisons', len(rows))
+        for row in rows:
+            comparison_ratio = fuzz.partial_ratio(query, self.shelter_names[row])
+            # Perform comparison threshold check:
+            if comparison_ratio >= comparison_threshold:
+                if comparison_ratio >= max_comp_ratio:
+                    max_comp_ratio = comparison_ratio
+                    assoc_sid = self.shelter_ids[row]
+        return (assoc_sid, max_comp_ratio)
+
+    """
+    verify -Compares best_match against brute_force_best_match for every provided query.
+    :param queries: An iterable of user entered strings.
+    :param comparison_threshold: The threshold by which a match is considered valid during fuzzy string comparison.
+    :return mismatches: A dictionary of query -> (indexed result, brute force result) for every disagreement.
+    """
+    def verify(self, queries, comparison_threshold=90):
+        mismatches = {}
+        for query in set(queries):
+            indexed = self.best_match(query, comparison_threshold)
+            brute_force = self.brute_force_best_match(query, comparison_threshold)
+            if indexed != brute_force:
+                mismatches[query] = (indexed, brute_force)
+        return mismatches
@@ -0,0 +1,249 @@
+"""
+ShelterTable.py
+Columnar, array-backed store for the validated shelters data set.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import csv
+import sys
+import struct
+import zipfile
+import numpy as np
+from ResolutionCache import shelter_dataset_checksum
+from SpatialIndex import EARTH_RADIUS_MILES
+
+# The version of the CSV parsing (see ShelterTable.from_csv); binary copies saved by another version are rebuilt.
+CSV_FORMAT_VERSION = 2
+
+
+class ShelterTable(object):
+    """
+    ShelterTable(object) -The validated shelters stored column-wise: contiguous NumPy arrays for latitude and longitude,
+        an interned list of names, categorical codes for the data set and shelter type, and a SID -> row index. The
+        table also behaves like the {SID: {'name', 'dataset', 'type', 'lat', 'lon'}} dictionary previously returned by
+        get_validated_shelters, so existing code can index it by SID.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ShelterTable.
+    :param shelter_ids: The SID of every shelter (in data set order).
+    :param names: The name of every shelter.
+    :param dataset_categories: The distinct data set names; dataset_codes index into this list.
+    :param dataset_codes: An integer array of each shelter's data set code.
+    :param type_categories: The distinct shelter types; type_codes index into this list.
+    :param type_codes: An integer array of each shelter's type code.
+    :param lat: A float array of each shelter's latitude.
+    :param lon: A float array of each shelter's longitude.
+    """
+    def __init__(self, shelter_ids, names, dataset_categories, dataset_codes, type_categories, type_codes, lat, lon):
+        self.shelter_ids = [str(shelter_id) for shelter_id in shelter_ids]
+        self.names = [sys.intern(str(name)) for name in names]
+        self.dataset_categories = [str(category) for category in dataset_categories]
+        self.dataset_codes = np.asarray(dataset_codes)
+        self.type_categories = [str(category) for category in type_categories]
+        self.type_codes = np.asarray(type_codes)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.row_of_sid = {shelter_id: row for row, shelter_id in enumerate(self.shelter_ids)}
+
+    """
+    from_records -Builds a table from (shelter_id, name, data_set, lat, lon, type) records.
+    """
+    @classmethod
+    def from_records(cls, records):
+        shelter_ids, names, lats, lons = [], [], [], []
+        dataset_categories, dataset_codes, dataset_lookup = [], [], {}
+        type_categories, type_codes, type_lookup = [], [], {}
+        for shelter_id, name, data_set, lat, lon, shelter_type in records:
+            shelter_ids.append(shelter_id)
+            names.append(name)
+            lats.append(lat)
+            lons.append(lon)
+            if data_set not in dataset_lookup:
+                dataset_lookup[data_set] = len(dataset_categories)
+                dataset_categories.append(data_set)
+            dataset_codes.append(dataset_lookup[data_set])
+            if shelter_type not in type_lookup:
+                type_lookup[shelter_type] = len(type_categories)
+                type_categories.append(shelter_type)
+            type_codes.append(type_lookup[shelter_type])
+        return cls(shelter_ids, names, dataset_categories, np.array(dataset_codes, dtype=np.int16),
+                   type_categories, np.array(type_codes, dtype=np.int16), lats, lons)
+
+    """
+    from_csv -Parses the validated shelters CSV file (newShelters.csv: SID,name,data_set,lat,lon,shelter_type). Fields
+        are parsed as csv.writer quotes them (see ShelterMergePipeline.write_outputs), so a name may contain commas.
+    """
+    @classmethod
+    def from_csv(cls, validated_shelters_path):
+        def records():
+            with open(validated_shelters_path, 'r', newline='') as fp:
+                reader = csv.reader(fp)
+                next(reader, None)
+                for split_string in reader:
+                    if split_string:
+                        yield (split_string[0], split_string[1], split_string[2],
+                               float(split_string[3]), float(split_string[4]), split_string[5])
+        return cls.from_records(records())
+
+    """
+    from_dict -Builds a table from the {SID: {'name', 'dataset', 'type', 'lat', 'lon'}} dictionary of shelters.
+    """
+    @classmethod
+    def from_dict(cls, validated_shelters):
+        return cls.from_records(
+            (shelter_id, shelter['name'], shelter['dataset'], shelter['lat'], shelter['lon'], shelter['type'])
+            for shelter_id, shelter in validated_shelters.items())
+
+    """
+    save_npz -Saves the table as an uncompressed .npz archive; the arrays can then be memory-mapped by load_npz.
+    :param path: The path of the .npz file.
+    :param checksum: An optional checksum of the CSV file the table was parsed from.
+    """
+    def save_npz(self, path, checksum=''):
+        with open(path, 'wb') as fp:
+            np.savez(fp, shelter_ids=np.array(self.shelter_ids, dtype=np.str_),
+                     names=np.array(self.names, dtype=np.str_),
+                     dataset_categories=np.array(self.dataset_categories, dtype=np.str_),
+                     dataset_codes=self.dataset_codes,
+                     type_categories=np.array(self.type_categories, dtype=np.str_), type_codes=self.type_codes,
+                     lat=self.lat, lon=self.lon, checksum=np.array(checksum, dtype=np.str_))
+
+    """
+    load_npz -Loads a table saved by save_npz. The numeric arrays are memory-mapped straight out of the archive.
+    :param path: The path of the .npz file.
+    :returns (shelter_table, checksum): The table and the checksum it was saved with.
+    """
+    @classmethod
+    def load_npz(cls, path):
+        arrays = memory_map_npz(path)
+        table = cls(arrays['shelter_ids'].tolist(), arrays['names'].tolist(), arrays['dataset_categories'].tolist(),
+                    arrays['dataset_codes'], arrays['type_categories'].tolist(), arrays['type_codes'],
+                    arrays['lat'], arrays['lon'])
+        return (table, str(arrays['checksum']))
+
+    """
+    distances_from -Vectorized haversine distance from a point to every shelter.
+    :param lat: The latitude of the point in degrees.
+    :param lon: The longitude of the point in degrees.
+    :return distances: An array of the distance in miles from the point to each shelter (in row order).
+    """
+    def distances_from(self, lat, lon):
+        lat1 = np.radians(lat)
+        lat2 = np.radians(self.lat)
+        half_dlat = (lat2 - lat1) / 2.0
+        half_dlon = np.radians(self.lon - lon) / 2.0
+        a = np.sin(half_dlat) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(half_dlon) ** 2
+        return 2.0 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    """
+    within -Returns the SIDs of the shelters within the provided distance of a point.
+    """
+    def within(self, lat, lon, miles):
+        return [self.shelter_ids[row] for row in np.nonzero(self.distances_from(lat, lon) <= miles)[0]]
+
+    def record(self, row):
+        return {
+            'name': self.names[row], 'dataset': self.dataset_categories[self.dataset_codes[row]],
+            'type': self.type_categories[self.type_codes[row]], 'lat': float(self.lat[row]), 'lon': float(self.lon[row])
+        }
+
+    # Dictionary interface ({SID: shelter}) for compatibility with the output of get_validated_shelters.
+    def __getitem__(self, shelter_id):
+        return self.record(self.row_of_sid[shelter_id])
+
+    def __contains__(self, shelter_id):
+        return shelter_id in self.row_of_sid
+
+    def __iter__(self):
+        return iter(self.shelter_ids)
+
+    def __len__(self):
+        return len(self.shelter_ids)
+
+    def keys(self):
+        return list(self.shelter_ids)
+
+    def items(self):
+        for row, shelter_id in enumerate(self.shelter_ids):
+            yield (shelter_id, self.record(row))
+
+    def __getstate__(self):
+        # The SID -> row index is rebuilt on unpickling rather than being sent to worker processes.
+        state = self.__dict__.copy()
+        del state['row_of_sid']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.row_of_sid = {shelter_id: row for row, shelter_id in enumerate(self.shelter_ids)}
+
+"""
+memory_map_npz -Memory-maps every array stored in an uncompressed .npz archive (np.load ignores mmap_mode for .npz).
+    Each member of the archive is a .npy file stored without compression, so its data can be mapped at the member's
+    offset within the archive.
+:param path: The path of the .npz file.
+:return arrays: A dictionary of array name -> read-only np.memmap (or ndarray for empty arrays).
+"""
+def memory_map_npz(path):
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as fp:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # Skip the zip local file header to find the start of the .npy file.
+            fp.seek(info.header_offset)
+            local_header = fp.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            fp.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                         order='F' if fortran_order else 'C', offset=fp.tell())
+    return arrays
+
+"""
+load_shelter_table -Loads the validated shelters, preferring the binary copy saved next to the CSV file. The binary
+    copy is (re)built whenever it is missing or was saved from a different version of the CSV file.
+:param validated_shelters_path: The path to the CSV file containing the validated shelters.
+:return shelter_table: The ShelterTable of the validated shelters.
+"""
+def load_shelter_table(validated_shelters_path):
+    return load_cached_npz(os.path.splitext(validated_shelters_path)[0] + ".npz",
+                           "%s:format=%d" % (shelter_dataset_checksum(validated_shelters_path), CSV_FORMAT_VERSION),
+                           ShelterTable.load_npz,
+                           lambda: ShelterTable.from_csv(validated_shelters_path))
+
+"""
+load_cached_npz -Loads an object from its binary cache file (an .npz archive saved next to the data it was built from).
+    The cache file is (re)built whenever it is missing or was saved from a different version of the data.
+:param npz_path: The path of the .npz cache file.
+:param checksum: The checksum of the current version of the data.
+:param load_npz: Loads the cache file: a function of the path returning (object, the checksum it was saved with).
+:param build: Builds the object from the data: a function returning an object with a save_npz(path, checksum) method.
+:return obj: The loaded (or built) object.
+"""
+def load_cached_npz(npz_path, checksum, load_npz, build):
+    if os.path.exists(npz_path):
+        cached, saved_checksum = load_npz(npz_path)
+        if saved_checksum == checksum:
+            return cached
+    built = build()
+    # Write to a temporary file first so that concurrent workers never map a partially written archive.
+    temp_path = "%s.%d.tmp" % (npz_path, os.getpid())
+    built.save_npz(temp_path, checksum=checksum)
+    os.replace(temp_path, npz_path)
+    return built
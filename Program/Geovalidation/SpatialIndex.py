@@ -0,0 +1,169 @@
+"""
+SpatialIndex.py
+Spatial index over the validated shelters for nearest-shelter and within-radius lookups.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import heapq
+import numpy as np
+
+# Mean radius of the earth in miles.
+EARTH_RADIUS_MILES = 3958.8
+
+"""
+to_unit_sphere -Converts latitudes and longitudes (degrees) to (x, y, z) coordinates on the unit sphere. Straight-line
+    (chord) distance between unit sphere points increases monotonically with great-circle distance, so a KD-tree over
+    these points answers great-circle queries without any special handling near the poles or the antimeridian.
+"""
+def to_unit_sphere(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+"""
+miles_to_chord -Converts a great-circle distance in miles to the equivalent chord length on the unit sphere.
+"""
+def miles_to_chord(miles):
+    return 2.0 * np.sin(min(miles / EARTH_RADIUS_MILES, np.pi) / 2.0)
+
+"""
+chord_to_miles -Converts chord lengths on the unit sphere to great-circle (haversine) distances in miles.
+"""
+def chord_to_miles(chord):
+    return 2.0 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(np.asarray(chord) / 2.0, 1.0))
+
+
+class ShelterSpatialIndex(object):
+    """
+    ShelterSpatialIndex(object) -KD-tree over the shelters' 3D unit sphere coordinates. Exposes k-nearest and radius
+        queries that report haversine distances in miles.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ShelterSpatialIndex.
+    :param validated_shelters: The shelters returned by get_validated_shelters (a ShelterTable or SID -> shelter dict).
+    :param leaf_size: The maximum number of shelters stored in a leaf of the tree.
+    """
+    def __init__(self, validated_shelters, leaf_size=16):
+        self.shelter_ids = []
+        lats = []
+        lons = []
+        for shelter_id, shelter_data in validated_shelters.items():
+            self.shelter_ids.append(shelter_id)
+            lats.append(shelter_data['lat'])
+            lons.append(shelter_data['lon'])
+        self.points = to_unit_sphere(lats, lons).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        # Node arrays: for internal nodes (axis, split, left, right); for leaves axis is -1 and (left, right) is the
+        # [start, end) range of the leaf's rows within self.order.
+        self.node_axis = []
+        self.node_split = []
+        self.node_left = []
+        self.node_right = []
+        self.order = np.arange(len(self.shelter_ids))
+        if len(self.shelter_ids) > 0:
+            self._build(0, len(self.shelter_ids))
+
+    def _build(self, start, end):
+        node = len(self.node_axis)
+        self.node_axis.append(-1)
+        self.node_split.append(0.0)
+        self.node_left.append(start)
+        self.node_right.append(end)
+        if end - start <= self.leaf_size:
+            return node
+        rows = self.order[start:end]
+        points = self.points[rows]
+        # Split on the axis with the largest spread at the median point.
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        middle = (end - start) // 2
+        partition = np.argpartition(points[:, axis], middle)
+        self.order[start:end] = rows[partition]
+        self.node_axis[node] = axis
+        self.node_split[node] = float(self.points[self.order[start + middle], axis])
+        self.node_left[node] = self._build(start, start + middle)
+        self.node_right[node] = self._build(start + middle, end)
+        return node
+
+    """
+    query_radius -Finds every shelter within the provided great-circle distance of a point.
+    :param lat: The latitude of the point in degrees.
+    :param lon: The longitude of the point in degrees.
+    :param miles: The search radius in miles.
+    :return shelters: A list of (SID, distance in miles) sorted by distance.
+    """
+    def query_radius(self, lat, lon, miles):
+        rows, chords = self._rows_within(to_unit_sphere(lat, lon), miles_to_chord(miles))
+        distances = chord_to_miles(chords)
+        return sorted(((self.shelter_ids[row], float(distance)) for row, distance in zip(rows, distances)),
+                      key=lambda shelter: shelter[1])
+
+    """
+    sids_within -Returns the set of SIDs of the shelters within the provided distance of a point.
+    """
+    def sids_within(self, lat, lon, miles):
+        rows, chords = self._rows_within(to_unit_sphere(lat, lon), miles_to_chord(miles))
+        return set(self.shelter_ids[row] for row in rows)
+
+    def _rows_within(self, point, radius):
+        rows = []
+        chords = []
+        if not self.node_axis:
+            return (rows, chords)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            axis = self.node_axis[node]
+            if axis == -1:
+                leaf_rows = self.order[self.node_left[node]:self.node_right[node]]
+                leaf_chords = np.sqrt(((self.points[leaf_rows] - point) ** 2).sum(axis=1))
+                inside = leaf_chords <= radius
+                rows.extend(leaf_rows[inside].tolist())
+                chords.extend(leaf_chords[inside].tolist())
+                continue
+            offset = point[axis] - self.node_split[node]
+            if offset <= radius:
+                stack.append(self.node_left[node])
+            if offset >= -radius:
+                stack.append(self.node_right[node])
+        return (rows, chords)
+
+    """
+    query_knn -Finds the k shelters nearest to a point.
+    :param lat: The latitude of the point in degrees.
+    :param lon: The longitude of the point in degrees.
+    :param k: The number of shelters to return.
+    :return shelters: A list of (SID, distance in miles) sorted by distance.
+    """
+    def query_knn(self, lat, lon, k=1):
+        if not self.node_axis or k <= 0:
+            return []
+        point = to_unit_sphere(lat, lon)
+        # Max-heap (by negated chord length) of the k nearest shelters found so far.
+        nearest = []
+        # Min-heap of (lower bound on chord length, node) still to be searched.
+        frontier = [(0.0, 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(nearest) == k and bound > -nearest[0][0]:
+                break
+            axis = self.node_axis[node]
+            if axis == -1:
+                leaf_rows = self.order[self.node_left[node]:self.node_right[node]]
+                leaf_chords = np.sqrt(((self.points[leaf_rows] - point) ** 2).sum(axis=1))
+                for row, chord in zip(leaf_rows.tolist(), leaf_chords.tolist()):
+                    if len(nearest) < k:
+                        heapq.heappush(nearest, (-chord, row))
+                    elif chord < -nearest[0][0]:
+                        heapq.heapreplace(nearest, (-chord, row))
+                continue
+            offset = point[axis] - self.node_split[node]
+            near_node, far_node = (self.node_left[node], self.node_right[node]) if offset <= 0 else \
+                (self.node_right[node], self.node_left[node])
+            heapq.heappush(frontier, (bound, near_node))
+            heapq.heappush(frontier, (max(bound, abs(offset)), far_node))
+        return [(self.shelter_ids[row], float(chord_to_miles(-negated_chord)))
+                for negated_chord, row in sorted(nearest, reverse=True)]
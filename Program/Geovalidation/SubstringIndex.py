@@ -0,0 +1,74 @@
+"""
+SubstringIndex.py
+Substring index over the normalized shelter names: finds the shelters whose names contain a query, and the shelters
+    whose names are contained in a query, without comparing the query to every name.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import bisect
+
+
+class SubstringIndex(object):
+    """
+    SubstringIndex(object) -A sorted array of every suffix of every name (names containing the query are those with a
+        suffix that starts with the query, found by binary search) and a trie of the names (names contained in the query
+        are those the trie spells out starting at some position of the query).
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type SubstringIndex.
+    :param names: The (normalized) names, indexed by row.
+    """
+    def __init__(self, names):
+        suffixes = []
+        # Trie of the names: each node is a dict of character -> child node; the None key of a node holds the rows of
+        # the names that end at the node.
+        self.trie = {}
+        for row, name in enumerate(names):
+            if not name:
+                continue
+            for start in range(len(name)):
+                suffixes.append((name[start:], row))
+            node = self.trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(row)
+        suffixes.sort()
+        self.suffixes = [suffix for suffix, row in suffixes]
+        self.suffix_rows = [row for suffix, row in suffixes]
+
+    """
+    containing_rows -Returns the rows of the names that contain the query.
+    """
+    def containing_rows(self, query):
+        rows = set()
+        position = bisect.bisect_left(self.suffixes, query)
+        while position < len(self.suffixes) and self.suffixes[position].startswith(query):
+            rows.add(self.suffix_rows[position])
+            position += 1
+        return rows
+
+    """
+    contained_rows -Returns the rows of the names that are substrings of the query.
+    """
+    def contained_rows(self, query):
+        rows = set()
+        for start in range(len(query)):
+            node = self.trie
+            for char in query[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                rows.update(node.get(None, ()))
+        return rows
+
+    """
+    matching_rows -Returns the rows of the names that contain, or are contained in, the query in descending order.
+    """
+    def matching_rows(self, query):
+        if not query:
+            return []
+        return sorted(self.containing_rows(query) | self.contained_rows(query), reverse=True)
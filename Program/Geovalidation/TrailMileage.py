@@ -0,0 +1,290 @@
+"""
+TrailMileage.py
+Projects locations onto the trail: the trail mile of a location is the distance along the AT centerline from the
+    trail's southern terminus to the point of the centerline nearest the location. The trail miles of every validated
+    location are precomputed into a compact lookup file (see load_mileage_index), so that distances along the trail
+    are a subtraction at query time.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from SpatialIndex import to_unit_sphere, chord_to_miles
+from ResolutionCache import shelter_dataset_checksum
+from ShelterTable import memory_map_npz, load_cached_npz
+from Gazetteer import load_gazetteer, gazetteer_checksum
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'CartesianConverter')))
+from CartesianConverter import load_centerline
+
+CENTERLINE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..',
+                                               'Data/TrailCenterline/AT_Centerline_GIS.csv'))
+# The lookup file of the validated locations' trail miles, saved next to newShelters.csv.
+MILEAGE_INDEX_FILENAME = "location_mileage.npz"
+# The slack (as a fraction of a segment's length) allowed when pruning the segments a location can be snapped to.
+SNAP_TOLERANCE = 1e-6
+
+
+class TrailMileage(object):
+    """
+    TrailMileage(object) -The centerline as segments between consecutive points (as unit sphere coordinates) along with
+        the cumulative trail mileage of each point. Locations are snapped to the nearest point of the nearest segment.
+        Segments are short enough that the straight chord between two centerline points is indistinguishable from the
+        great circle arc between them.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type TrailMileage.
+    :param lat: The latitudes of the centerline points in trail order (degrees).
+    :param lon: The longitudes of the centerline points in trail order (degrees).
+    """
+    def __init__(self, lat, lon):
+        self.points = to_unit_sphere(lat, lon).reshape(-1, 3)
+        self.segment_vectors = np.diff(self.points, axis=0)
+        self.segment_chords = np.sqrt((self.segment_vectors ** 2).sum(axis=1))
+        self.segment_midpoints = self.points[:-1] + self.segment_vectors / 2.0
+        self.mileage = np.concatenate(([0.0], np.cumsum(chord_to_miles(self.segment_chords))))
+
+    """
+    from_csv -Loads the centerline CSV file read by CartesianConverter (lon,lat columns, in trail order).
+    """
+    @classmethod
+    def from_csv(cls, centerline_path=CENTERLINE_PATH):
+        lat, lon = load_centerline(centerline_path)
+        return cls(lat, lon)
+
+    def __len__(self):
+        return len(self.mileage)
+
+    """
+    snap -Finds the trail mile of each location by projecting it onto the nearest centerline segment. The nearest
+        centerline point bounds the distance to the nearest segment, and a segment can only be that close if its
+        midpoint is within the bound plus half the segment's length; so only those few segments (and always the two
+        segments that meet at the nearest point) are projected onto. The nearest point is found with a matrix product
+        over a chunk of locations; the distances the segments are pruned with are computed directly from the
+        coordinate differences, since the dot product identity loses far more precision than the centerline's spacing
+        leaves room for.
+    :param lat: The latitude(s) of the locations in degrees.
+    :param lon: The longitude(s) of the locations in degrees.
+    :param max_chunk_elements: The maximum size of the (locations, centerline points) matrices of a chunk.
+    :returns (mileage, off_trail_miles): Arrays of the trail mile of each location, and the distance in miles from each
+        location to the trail.
+    """
+    def snap(self, lat, lon, max_chunk_elements=1 << 22):
+        queries = to_unit_sphere(lat, lon).reshape(-1, 3)
+        mileage = np.full(len(queries), np.nan)
+        chords = np.full(len(queries), np.nan)
+        if len(self.points) == 0:
+            return (mileage, chords)
+        chunk_size = max(1, max_chunk_elements // len(self.points))
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            # Unit vectors: |q - p|^2 = 2 - 2 q.p, so the nearest point has the largest dot product.
+            nearest = np.argmax(chunk @ self.points.T, axis=1)
+            for query_num in range(len(chunk)):
+                point = chunk[query_num]
+                nearest_chord = np.sqrt(((point - self.points[nearest[query_num]]) ** 2).sum())
+                if len(self.segment_vectors) == 0:
+                    mileage[start + query_num] = self.mileage[nearest[query_num]]
+                    chords[start + query_num] = nearest_chord
+                    continue
+                midpoint_chords = np.sqrt(((point - self.segment_midpoints) ** 2).sum(axis=1))
+                # The tolerance covers the rounding of the chords, which is relative to the segment's length.
+                reachable = (midpoint_chords - self.segment_chords / 2.0
+                             <= nearest_chord + SNAP_TOLERANCE * self.segment_chords)
+                # The segments that meet at the nearest point can always reach it.
+                adjacent = np.clip([nearest[query_num] - 1, nearest[query_num]], 0, len(self.segment_vectors) - 1)
+                reachable[adjacent] = True
+                segments = np.nonzero(reachable)[0]
+                mileage[start + query_num], chords[start + query_num] = self.project(point, segments)
+        return (mileage, chord_to_miles(chords))
+
+    """
+    project -Projects a point onto the provided segments.
+    :returns (mileage, chord): The trail mile of the nearest projection, and its distance from the point (unit sphere
+        chord length).
+    """
+    def project(self, point, segments):
+        vectors = self.segment_vectors[segments]
+        lengths_squared = (vectors ** 2).sum(axis=1)
+        offsets = point - self.points[segments]
+        # The fraction of the way along each segment of the projection (repeated points have no length).
+        fractions = np.clip((offsets * vectors).sum(axis=1) / np.where(lengths_squared > 0, lengths_squared, 1.0),
+                            0.0, 1.0)
+        projection_chords = np.sqrt(((offsets - fractions[:, np.newaxis] * vectors) ** 2).sum(axis=1))
+        nearest = int(np.argmin(projection_chords))
+        segment = segments[nearest]
+        return (self.mileage[segment] + fractions[nearest] * (self.mileage[segment + 1] - self.mileage[segment]),
+                projection_chords[nearest])
+
+    """
+    location_mileage -Snaps every location of a gazetteer (or SID -> shelter dictionary) to the trail.
+    :return mileage_index: The MileageIndex of the locations.
+    """
+    def location_mileage(self, locations):
+        keys = []
+        lats = []
+        lons = []
+        for key, location in locations.items():
+            keys.append(key)
+            lats.append(location['lat'])
+            lons.append(location['lon'])
+        mileage, off_trail_miles = self.snap(lats, lons)
+        return MileageIndex(keys, mileage, off_trail_miles)
+
+
+class MileageIndex(object):
+    """
+    MileageIndex(object) -The trail mile of every validated location (and its distance from the trail) in two float
+        arrays, with a key -> row index. The distance along the trail between two locations (a hiker's daily distance)
+        is the difference of their trail miles.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type MileageIndex.
+    :param keys: The gazetteer key (SID) of every location.
+    :param mileage: A float array of each location's trail mile.
+    :param off_trail_miles: A float array of each location's distance from the trail in miles.
+    """
+    def __init__(self, keys, mileage, off_trail_miles):
+        self.keys = [str(key) for key in keys]
+        self.mileage = np.asarray(mileage, dtype=np.float64)
+        self.off_trail_miles = np.asarray(off_trail_miles, dtype=np.float64)
+        self.row_of_key = {key: row for row, key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.row_of_key
+
+    def __getitem__(self, key):
+        return float(self.mileage[self.row_of_key[key]])
+
+    """
+    get -Returns the trail mile of a location (default if the location isn't in the index).
+    """
+    def get(self, key, default=None):
+        row = self.row_of_key.get(key)
+        if row is None:
+            return default
+        return float(self.mileage[row])
+
+    """
+    miles_between -Returns the distance along the trail between two locations (None if either isn't in the index).
+    """
+    def miles_between(self, from_key, to_key):
+        from_row = self.row_of_key.get(from_key)
+        to_row = self.row_of_key.get(to_key)
+        if from_row is None or to_row is None:
+            return None
+        return abs(float(self.mileage[to_row] - self.mileage[from_row]))
+
+    """
+    save_npz -Saves the index as an uncompressed .npz archive; the arrays can then be memory-mapped by load_npz.
+    :param path: The path of the .npz file.
+    :param checksum: An optional checksum of the data sets the index was built from.
+    """
+    def save_npz(self, path, checksum=''):
+        with open(path, 'wb') as fp:
+            np.savez(fp, keys=np.array(self.keys, dtype=np.str_), mileage=self.mileage,
+                     off_trail_miles=self.off_trail_miles, checksum=np.array(checksum, dtype=np.str_))
+
+    """
+    load_npz -Loads an index saved by save_npz. The numeric arrays are memory-mapped straight out of the archive.
+    :returns (mileage_index, checksum): The index and the checksum it was saved with.
+    """
+    @classmethod
+    def load_npz(cls, path):
+        arrays = memory_map_npz(path)
+        return (cls(arrays['keys'].tolist(), arrays['mileage'], arrays['off_trail_miles']), str(arrays['checksum']))
+
+"""
+mileage_index_checksum -The checksum of the data sets a MileageIndex is built from: every gazetteer layer (see
+    gazetteer_checksum) and the centerline.
+"""
+def mileage_index_checksum(validated_shelter_data_path, centerline_path=CENTERLINE_PATH):
+    return "%s:centerline=%s" % (gazetteer_checksum(validated_shelter_data_path),
+                                 shelter_dataset_checksum(centerline_path))
+
+"""
+load_mileage_index -Loads the trail miles of every validated location from the lookup file saved next to
+    newShelters.csv. The lookup file is (re)built whenever it is missing or was built from a different version of the
+    location data sets or the centerline.
+:param validated_shelter_data_path: The directory containing newShelters.csv.
+:param centerline_path: The centerline CSV file.
+:param gazetteer: The Gazetteer loaded from validated_shelter_data_path (loaded here if not provided and the lookup
+    file needs to be built).
+:return mileage_index: The MileageIndex of the validated locations.
+"""
+def load_mileage_index(validated_shelter_data_path, centerline_path=CENTERLINE_PATH, gazetteer=None):
+    def build():
+        locations = gazetteer if gazetteer is not None else load_gazetteer(validated_shelter_data_path)
+        return TrailMileage.from_csv(centerline_path).location_mileage(locations)
+
+    return load_cached_npz(os.path.join(validated_shelter_data_path, MILEAGE_INDEX_FILENAME),
+                           mileage_index_checksum(validated_shelter_data_path, centerline_path), MileageIndex.load_npz,
+                           build)
+
+"""
+check_snapping -Snaps locations on and just off the vertices of a synthetic centerline (with the point spacing of the
+    real one, about 10 m) and compares them with projecting onto every segment.
+:param num_points: The number of centerline points.
+:param tolerance: The maximum difference in trail miles allowed.
+:return errors: A list of descriptions of the locations that were snapped incorrectly.
+"""
+def check_snapping(num_points=20000, tolerance=1e-6):
+    steps = np.arange(num_points)
+    # A winding line heading north-east from the southern terminus.
+    lat = 34.6266 + 1e-4 * steps
+    lon = -84.1939 + 1e-4 * steps + 5e-3 * np.sin(steps / 500.0)
+    trail_mileage = TrailMileage(lat, lon)
+    vertices = steps[::97]
+    errors = []
+    for offset in (0.0, 1e-7, -1e-7):
+        try:
+            mileage, off_trail_miles = trail_mileage.snap(lat[vertices] + offset, lon[vertices] - offset)
+        except ValueError as error:
+            errors.append("Snapping vertices offset by %g degrees failed: %s" % (offset, error))
+            continue
+        queries = to_unit_sphere(lat[vertices] + offset, lon[vertices] - offset).reshape(-1, 3)
+        all_segments = np.arange(len(trail_mileage.segment_vectors))
+        for vertex, query, snapped_mileage in zip(vertices, queries, mileage):
+            expected_mileage = trail_mileage.project(query, all_segments)[0]
+            if abs(snapped_mileage - expected_mileage) > tolerance:
+                errors.append("Vertex %d offset by %g degrees snapped to mile %r, expected %r"
+                              % (vertex, offset, snapped_mileage, expected_mileage))
+    return errors
+
+"""
+main -Builds (or refreshes) the trail mileage lookup file of the validated locations.
+"""
+def main(centerline_path=CENTERLINE_PATH):
+    validated_shelter_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..',
+                                                               'Data/TrailShelters/'))
+    start = time.perf_counter()
+    mileage_index = load_mileage_index(validated_shelter_data_path, centerline_path)
+    print("Trail miles of %d locations ready in %.3f s (%d more than a mile off the trail)."
+          % (len(mileage_index), time.perf_counter() - start, int((mileage_index.off_trail_miles > 1.0).sum())))
+    return mileage_index
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Snaps every validated location to the trail centerline.")
+    parser.add_argument('--centerline', default=CENTERLINE_PATH, help="Path of the centerline CSV file.")
+    parser.add_argument('--check', action='store_true',
+                        help="Only check snapping against a synthetic centerline and exit.")
+    args = parser.parse_args()
+    if args.check:
+        errors = check_snapping()
+        for error in errors:
+            print(error)
+        print("%d snapping errors." % len(errors))
+    else:
+        main(centerline_path=args.centerline)
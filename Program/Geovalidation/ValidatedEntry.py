@@ -0,0 +1,79 @@
+"""
+ValidatedEntry.py
+Compact representation of a validated hiker journal entry.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+"""
+get_validated_location -Builds the validated location (shelter name, SID, lat, lon, and type) of a shelter.
+:param validated_shelters: The dictionary of shelters returned by get_validated_shelters.
+:param assoc_sid: The SID of the shelter the user entered location was mapped to.
+:return validated_location: The validated location; None if the location wasn't mapped.
+"""
+def get_validated_location(validated_shelters, assoc_sid):
+    if assoc_sid is None or assoc_sid == -1:
+        # Geovalidation for the provided location was unsuccessful.
+        return None
+    return {
+        'shelter_name': validated_shelters[assoc_sid]['name'],
+        'SID': assoc_sid,
+        'lat': validated_shelters[assoc_sid]['lat'],
+        'lon': validated_shelters[assoc_sid]['lon'],
+        'type': validated_shelters[assoc_sid]['type']
+    }
+
+
+class ValidatedEntry(object):
+    """
+    ValidatedEntry(object) -A validated journal entry. Rather than deep copying the user's entry and embedding copies of
+        the shelter data, the entry holds the original journal entry by reference along with the SIDs its start_loc and
+        dest were mapped to. The dictionary form (the user's entry with start_loc and dest replaced by their validated
+        locations) is only built when the entry is serialized or indexed.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+    __slots__ = ('entry', 'start_sid', 'dest_sid', 'validated_shelters')
+
+    """
+    __init__ -Constructor for objects of type ValidatedEntry.
+    :param entry: The user's (unvalidated) journal entry.
+    :param start_sid: The SID the entry's start_loc was mapped to (None if it wasn't mappable).
+    :param dest_sid: The SID the entry's dest was mapped to (None if it wasn't mappable).
+    :param validated_shelters: The shelters the SIDs refer to.
+    """
+    def __init__(self, entry, start_sid, dest_sid, validated_shelters):
+        self.entry = entry
+        self.start_sid = start_sid
+        self.dest_sid = dest_sid
+        self.validated_shelters = validated_shelters
+
+    def __getitem__(self, key):
+        if key == 'start_loc':
+            return get_validated_location(self.validated_shelters, self.start_sid)
+        if key == 'dest':
+            return get_validated_location(self.validated_shelters, self.dest_sid)
+        return self.entry[key]
+
+    def __eq__(self, other):
+        if isinstance(other, ValidatedEntry):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    """
+    to_dict -Materializes the validated entry as the dictionary written to the validated hiker json file.
+    """
+    def to_dict(self):
+        validated_entry = dict(self.entry)
+        validated_entry['start_loc'] = self['start_loc']
+        validated_entry['dest'] = self['dest']
+        return validated_entry
+
+"""
+serialize_validated_entry -The default hook handed to json.dump so that ValidatedEntry objects are materialized at
+    serialization time.
+"""
+def serialize_validated_entry(obj):
+    if isinstance(obj, ValidatedEntry):
+        return obj.to_dict()
+    raise TypeError("Object of type %s is not JSON serializable" % type(obj).__name__)
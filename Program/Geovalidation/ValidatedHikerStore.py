@@ -0,0 +1,206 @@
+"""
+ValidatedHikerStore.py
+Columnar alternative to the per-hiker json files of validated hikers: every validated journal entry is a row of a single
+    sqlite database, and the validated locations the entries refer to are stored once and joined by SID.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import json
+import sqlite3
+import tempfile
+import numpy as np
+from Instrumentation import instrumentation
+
+# The name of the database within the HikerData directory.
+VALIDATED_HIKERS_DB_FILENAME = "validated_hikers.sqlite"
+# The columns of an entry row that are returned by read_columns, in order.
+ENTRY_COLUMNS = ('hiker_id', 'entry_num', 'start_sid', 'dest_sid', 'start_loc', 'dest')
+
+
+class ValidatedHikerStore(object):
+    """
+    ValidatedHikerStore(object) -An sqlite database of validated hikers with three tables:
+        1. locations: every validated location (SID, layer, name, dataset, type, lat, lon), written once per run.
+        2. hikers: one row per hiker; the hiker's fields other than its journal as a json object, and the name of the
+            unvalidated file the hiker was read from.
+        3. entries: one row per validated journal entry; the SIDs its start_loc and dest were mapped to (NULL if they
+            weren't mappable), the user entered strings, and the entry's other fields as a json object.
+        The validated_entries view joins the entries with the names and coordinates of their locations. The database is
+        opened with a memory-mapped I/O window so corpus-wide reads are served straight from the page cache.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ValidatedHikerStore; creates the database if it doesn't exist.
+    :param db_path: The path to the sqlite database file.
+    :param mmap_size: The maximum number of bytes of the database file memory-mapped by sqlite.
+    """
+    def __init__(self, db_path, mmap_size=1 << 30):
+        self.db_path = db_path
+        # Worker processes share the database file, so wait on locks held by other workers instead of failing.
+        self.connection = sqlite3.connect(db_path, timeout=60)
+        # Readers aren't blocked by a worker writing a hiker.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA mmap_size=%d" % int(mmap_size))
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS locations ("
+                "sid TEXT PRIMARY KEY, layer TEXT, name TEXT, dataset TEXT, type TEXT, lat REAL, lon REAL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS hikers (hiker_id TEXT PRIMARY KEY, filename TEXT, fields TEXT)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "hiker_id TEXT NOT NULL, entry_num TEXT NOT NULL, start_sid TEXT, dest_sid TEXT, start_loc TEXT, "
+                "dest TEXT, fields TEXT, PRIMARY KEY (hiker_id, entry_num))")
+            self.connection.execute(
+                "CREATE VIEW IF NOT EXISTS validated_entries AS SELECT "
+                "entries.hiker_id, entries.entry_num, entries.start_loc, entries.dest, "
+                "entries.start_sid, start.name AS start_name, start.lat AS start_lat, start.lon AS start_lon, "
+                "entries.dest_sid, dest.name AS dest_name, dest.lat AS dest_lat, dest.lon AS dest_lon "
+                "FROM entries LEFT JOIN locations AS start ON start.sid = entries.start_sid "
+                "LEFT JOIN locations AS dest ON dest.sid = entries.dest_sid")
+
+    """
+    write_locations -Stores every validated location the entries can refer to.
+    :param locations: A Gazetteer (or SID -> shelter dictionary) of the validated locations.
+    """
+    def write_locations(self, locations):
+        rows = []
+        for sid, location in locations.items():
+            layer = locations.layer_of(sid) if hasattr(locations, 'layer_of') else 'shelter'
+            rows.append((str(sid), layer, location['name'], location['dataset'], location['type'],
+                         float(location['lat']), float(location['lon'])))
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    """
+    open_writer -Returns a writer for a single hiker (see HikerRowWriter).
+    :param filename: The name of the unvalidated file the hiker was read from.
+    """
+    def open_writer(self, filename):
+        return HikerRowWriter(self, filename)
+
+    """
+    write_hiker -Writes a validated hiker (as returned by validate_hiker_file) in a single transaction.
+    :param hiker: The hiker object with its journal replaced by the validated journal of ValidatedEntry objects.
+    :param filename: The name of the unvalidated file the hiker was read from.
+    :return output_path: The path of the database.
+    """
+    def write_hiker(self, hiker, filename=None):
+        writer = self.open_writer(filename)
+        for key, value in hiker.items():
+            if key == 'journal':
+                writer.write_journal(value.items())
+            else:
+                writer.write_field(key, value)
+        writer.close()
+        return self.db_path
+
+    """
+    hiker_filenames -Returns the set of unvalidated file names of every hiker in the store.
+    """
+    def hiker_filenames(self):
+        return set(row[0] for row in self.connection.execute("SELECT filename FROM hikers WHERE filename IS NOT NULL"))
+
+    """
+    read_columns -Reads every validated entry with a single query.
+    :return columns: A dictionary of column name (see ENTRY_COLUMNS) -> object array, ordered by hiker and entry.
+    """
+    def read_columns(self):
+        rows = self.connection.execute(
+            "SELECT %s FROM entries ORDER BY hiker_id, rowid" % ", ".join(ENTRY_COLUMNS)).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(ENTRY_COLUMNS)
+        return dict((name, np.array(column, dtype=object)) for name, column in zip(ENTRY_COLUMNS, columns))
+
+    """
+    read_locations -Reads the validated locations the entries refer to.
+    :return locations: A dictionary of SID -> {'layer', 'name', 'dataset', 'type', 'lat', 'lon'}.
+    """
+    def read_locations(self):
+        locations = {}
+        for sid, layer, name, dataset, location_type, lat, lon in self.connection.execute("SELECT * FROM locations"):
+            locations[sid] = {'layer': layer, 'name': name, 'dataset': dataset, 'type': location_type, 'lat': lat,
+                              'lon': lon}
+        return locations
+
+    def close(self):
+        self.connection.close()
+
+
+class HikerRowWriter(object):
+    """
+    HikerRowWriter(object) -Writes a hiker to a ValidatedHikerStore field by field and journal entry by journal entry;
+        provides the same interface as JournalStream.JournalWriter so streaming validation can write to either. The
+        hiker's identifier may follow its journal, so the entry rows are spooled to a temporary file and inserted when
+        the writer is closed, in a single short transaction; worker processes sharing the database only wait on each
+        other for the inserts, not for the validation of a whole journal. An interrupted hiker leaves no rows behind.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type HikerRowWriter.
+    :param store: The ValidatedHikerStore the hiker is written to.
+    :param filename: The name of the unvalidated file the hiker was read from.
+    """
+    def __init__(self, store, filename):
+        self.store = store
+        self.filename = filename
+        self.fields = {}
+        # One json array per entry row (without the hiker's identifier).
+        self.spool = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.num_entries = 0
+
+    def write_field(self, key, value):
+        self.fields[key] = value
+
+    """
+    write_journal -Spools a row for each (entry_num, ValidatedEntry) pair as it is produced by the provided iterable.
+    :return num_entries: The number of journal entries written.
+    """
+    def write_journal(self, entries, key='journal'):
+        for entry_num, validated_entry in entries:
+            entry = validated_entry.entry
+            other_fields = dict((field, value) for field, value in entry.items() if field not in ('start_loc', 'dest'))
+            self.spool.write(json.dumps([str(entry_num), _sid_column(validated_entry.start_sid),
+                                         _sid_column(validated_entry.dest_sid), entry.get('start_loc'),
+                                         entry.get('dest'), json.dumps(other_fields)]) + "\n")
+            self.num_entries += 1
+        return self.num_entries
+
+    """
+    close -Inserts the hiker and its spooled entries (replacing any earlier validation of the hiker) in a single
+        transaction. A hiker without any validated entries isn't stored.
+    """
+    def close(self):
+        if self.num_entries == 0:
+            self.discard()
+            return
+        hiker_id = str(self.fields.get('identifier'))
+        self.spool.seek(0)
+        try:
+            with instrumentation.stage('sqlite_write'), self.store.connection:
+                self.store.connection.execute("DELETE FROM entries WHERE hiker_id = ?", (hiker_id,))
+                self.store.connection.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                                  ([hiker_id] + json.loads(line) for line in self.spool))
+                self.store.connection.execute("INSERT OR REPLACE INTO hikers VALUES (?, ?, ?)",
+                                              (hiker_id, self.filename, json.dumps(self.fields)))
+        finally:
+            self.discard()
+
+    """
+    discard -Drops every entry spooled so far.
+    """
+    def discard(self):
+        self.spool.close()
+        self.num_entries = 0
+
+"""
+_sid_column -The stored form of an SID (NULL for unmapped locations).
+"""
+def _sid_column(assoc_sid):
+    if assoc_sid is None or assoc_sid == -1:
+        return None
+    return str(assoc_sid)
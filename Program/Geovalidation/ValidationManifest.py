@@ -0,0 +1,110 @@
+"""
+ValidationManifest.py
+Records which hiker files have been validated, against which version of the shelter data set, and where the output was
+    written; used to drive incremental (and resumable) validation runs.
+:Author: Chris Campell
+:Version: 10/17/2026
+"""
+
+import os
+import json
+import hashlib
+
+
+class ValidationManifest(object):
+    """
+    ValidationManifest(object) -Maps each unvalidated hiker file to the fingerprint of its contents, the shelter data
+        set version it was validated against, and the path of the validated output. The manifest is an append-only
+        json-lines file: every validated hiker is appended (and flushed) as soon as it is done, so an interrupted run
+        resumes where it stopped. Later lines override earlier ones; compact() rewrites the file with one line per
+        hiker. The shelter data set is tracked as a single version: any change to it (or to the matching options folded
+        into the version) re-validates every hiker, not only the hikers whose resolved SIDs changed. Which hikers a
+        change affects isn't knowable from their SIDs alone, since an added or renamed shelter can become the best match
+        of any location, including locations that previously failed to map.
+    :Author: Chris Campell
+    :Version: 10/17/2026
+    """
+
+    """
+    __init__ -Constructor for objects of type ValidationManifest; loads the manifest if it exists.
+    :param manifest_path: The path to the json-lines manifest file.
+    """
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as fp:
+                for line in iter(fp):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A partially written line from an interrupted run; that hiker will be validated again.
+                        continue
+                    self.entries[record['filename']] = record
+        self.fp = open(manifest_path, 'a')
+
+    """
+    fingerprint -Returns the size, modification time, and content hash of a hiker file. The file is only re-hashed if
+        its size or modification time differ from the manifest.
+    :param filename: The name of the hiker's json file.
+    :param path: The path to the hiker's json file.
+    """
+    def fingerprint(self, filename, path):
+        stat = os.stat(path)
+        record = self.entries.get(filename)
+        if record is not None and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            content_hash = record['content_hash']
+        else:
+            sha1 = hashlib.sha1()
+            with open(path, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(1 << 16), b''):
+                    sha1.update(chunk)
+            content_hash = sha1.hexdigest()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'content_hash': content_hash}
+
+    """
+    needs_validation -Determines if a hiker is new, has changed, or was validated against a different shelter data set.
+    :param filename: The name of the hiker's json file.
+    :param fingerprint: The fingerprint of the hiker's json file (see fingerprint).
+    :param shelter_version: The checksum of the shelter data set the run validates against.
+    """
+    def needs_validation(self, filename, fingerprint, shelter_version):
+        record = self.entries.get(filename)
+        if record is None:
+            return True
+        return record['content_hash'] != fingerprint['content_hash'] or record['shelter_version'] != shelter_version
+
+    """
+    record -Appends a validated hiker to the manifest.
+    :param filename: The name of the hiker's json file.
+    :param fingerprint: The fingerprint of the hiker's json file (see fingerprint).
+    :param shelter_version: The checksum of the shelter data set the hiker was validated against.
+    :param output_path: The path the validated hiker was written to (None if nothing was written).
+    """
+    def record(self, filename, fingerprint, shelter_version, output_path):
+        record = {
+            'filename': filename,
+            'size': fingerprint['size'],
+            'mtime_ns': fingerprint['mtime_ns'],
+            'content_hash': fingerprint['content_hash'],
+            'shelter_version': shelter_version,
+            'output_path': output_path
+        }
+        self.entries[filename] = record
+        self.fp.write(json.dumps(record) + "\n")
+        self.fp.flush()
+
+    """
+    compact -Rewrites the manifest with a single line per hiker, atomically replacing the old file.
+    """
+    def compact(self):
+        self.fp.close()
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w') as fp:
+            for record in self.entries.values():
+                fp.write(json.dumps(record) + "\n")
+        os.replace(temp_path, self.manifest_path)
+        self.fp = open(self.manifest_path, 'a')
+
+    def close(self):
+        self.fp.close()